@@ -1,27 +1,117 @@
-from sqlalchemy import create_engine
+import asyncio
+import time
+from typing import AsyncIterator, Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from .utils.config import settings
 
+# Async drivers used for each database backend
+ASYNC_DRIVERS = {
+    "postgresql": "psycopg",
+    "sqlite": "aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Swap a plain database URL onto its async driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection"""
+
+    checkouts = 0
+    waits = 0
+    wait_seconds = 0.0
+    max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        waited = time.perf_counter() - started
+        cls = type(self)
+        cls.checkouts += 1
+        cls.wait_seconds += waited
+        cls.max_wait_seconds = max(cls.max_wait_seconds, waited)
+        if waited > 0.001:
+            cls.waits += 1
+        return connection
+
+
+def _engine_options(url: str) -> dict:
+    """Pool configuration for the configured backend"""
+    if make_url(url).database in (None, "", ":memory:"):
+        # In-memory SQLite lives inside a single connection
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS
+    }
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=10,
-    max_overflow=20
-)
+DATABASE_URL = async_database_url(settings.DATABASE_URL)
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create base class for models
 Base = declarative_base()
 
-def get_db():
+async def init_db():
+    """Create any missing tables (development and tests; deployments run alembic upgrade head)"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+async def ping_db():
+    """Round trip to the database on a pooled connection"""
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+async def warm_pool():
+    """Open the pool's steady-state connections up front so first requests don't pay for connecting"""
+    size = engine.pool.size() if isinstance(engine.pool, TimedQueuePool) else 1
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    for connection in connections:
+        await connection.execute(text("SELECT 1"))
+        await connection.close()
+
+async def close_db():
+    """Close pooled connections"""
+    await engine.dispose()
+
+async def get_db() -> AsyncIterator[AsyncSession]:
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def pool_stats() -> Dict[str, float]:
+    """Connection pool occupancy and checkout wait times"""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, TimedQueuePool):
+        checkouts = TimedQueuePool.checkouts
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checkouts": checkouts,
+            "waits": TimedQueuePool.waits,
+            "wait_seconds": round(TimedQueuePool.wait_seconds, 6),
+            "avg_wait_seconds": round(TimedQueuePool.wait_seconds / checkouts, 6) if checkouts else 0.0,
+            "max_wait_seconds": round(TimedQueuePool.max_wait_seconds, 6)
+        })
+    return stats
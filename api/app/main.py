@@ -1,17 +1,118 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+import asyncio
+import base64
+import logging
+import os
+import time
+
+# Everything imported below counts towards the reported import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 import uvicorn
 
-from .database import get_db, engine
-from .models import Base
-from .schemas import UserCreate, UserLogin, Token, User
-from .services import auth_service, crypto_service
+from .database import close_db, get_db, init_db, ping_db, pool_stats, warm_pool
+from .schemas import (
+    UserCreate, UserLogin, UserUpdate, Token, User, KeyCreate, KeyResponse, RefreshRequest, LogoutRequest,
+    BatchEncryptRequest, BatchDecryptRequest, BatchResponse, SignRequest, VerifyRequest, VerifyResponse,
+    VerifyBatchRequest, VerifyBatchResponse, AuditLogPage, UsageStatsResponse, RotationCreate, RotationResponse,
+    DeterministicEncryptRequest, DeterministicDecryptRequest, BlindIndexRequest, BlindIndexResponse,
+    BlindIndexBatchRequest, BlindIndexBatchResponse
+)
+from .services import audit_service, auth_service, cache_service, crypto_service, executor_service
+from .services.audit_log_service import audit_log_service
+from .services.auth_service import Principal
+from .services.datakey_service import datakey_service
+from .services.executor_service import ExecutorSaturatedError
+from .services.file_service import FileTooLargeError, file_service
+from .services.keypool_service import rsa_key_pool
+from .services.ratelimit_service import RateLimitedError, rate_limit_service
+from .services.revocation_service import revocation_service
+from .services.rotation_service import rotation_service
+from .services.key_service import ManagedKey, key_service
+from .services.stream_service import STREAM_ALGORITHMS, BodyStreamingResponse, StreamEncryptor, stream_service
+from .services.usage_service import usage_service
 from .utils.config import settings
+from .utils.envelope import BINARY_MEDIA_TYPE
+from .utils.metrics import (
+    AUTH_CACHE_HIT, AUTH_CACHE_MISS, CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics, stats_collector
+)
+
+logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Startup timings and readiness, reported by /ready and on /metrics
+startup_state = {
+    "import_seconds": 0.0,
+    "startup_seconds": 0.0,
+    "warmup_seconds": 0.0,
+    "ready": False
+}
+
+async def warm_up():
+    """Open DB connections, start pool workers, calibrate bcrypt and load token revocations, then report ready"""
+    started = time.perf_counter()
+    if settings.STARTUP_WARMUP:
+        await asyncio.gather(
+            warm_pool(),
+            cache_service.warm(),
+            executor_service.io.warm(),
+            crypto_service.warm()
+        )
+    # Calibration doubles as the password pool's warm-up
+    await auth_service.calibrate()
+    if settings.STARTUP_WARMUP:
+        await executor_service.password.warm()
+    # Retries in the background until the database answers
+    await revocation_service.wait_loaded()
+    startup_state["warmup_seconds"] = round(time.perf_counter() - started, 6)
+    startup_state["ready"] = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services, warm up behind /ready, and stop everything on shutdown"""
+    started = time.perf_counter()
+    if settings.DB_AUTO_CREATE:
+        await init_db()
+    revocation_service.start()
+    if settings.RSA_KEY_POOL_ENABLED:
+        rsa_key_pool.start()
+    audit_log_service.start()
+    audit_service.start()
+    cache_service.start()
+    rotation_service.start()
+    startup_state["startup_seconds"] = round(time.perf_counter() - started, 6)
+    
+    # Serve liveness probes while warming up; /ready stays 503 until this finishes
+    warmup = asyncio.get_running_loop().create_task(warm_up())
+    yield
+    
+    # Stop taking new traffic, then drain in dependency order
+    startup_state["ready"] = False
+    if not warmup.done():
+        warmup.cancel()
+    try:
+        await warmup
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        logger.warning("Warm-up failed", exc_info=True)
+    await rotation_service.stop()
+    await auth_service.stop()
+    await revocation_service.stop()
+    await audit_service.stop()
+    await audit_log_service.stop()
+    await cache_service.stop()
+    await close_db()
+    rsa_key_pool.stop()
+    executor_service.shutdown(wait=False)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -19,8 +120,10 @@ app = FastAPI(
     description="A modern cryptography and security toolkit API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
+startup_state["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 6)
 
 # CORS middleware
 app.add_middleware(
@@ -31,9 +134,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency metrics
+app.add_middleware(MetricsMiddleware)
+
+# Service state exposed on /metrics at scrape time
+stats_collector.register("db_pool", pool_stats)
+stats_collector.register("executor", executor_service.stats, label="pool")
+stats_collector.register("audit", audit_service.stats)
+stats_collector.register("audit_log", audit_log_service.stats)
+stats_collector.register("rsa_key_pool", rsa_key_pool.stats)
+stats_collector.register("revocation", revocation_service.stats)
+stats_collector.register("rotation", rotation_service.stats)
+stats_collector.register("data_key", datakey_service.stats)
+stats_collector.register("rate_limit", rate_limit_service.stats)
+stats_collector.register("startup", lambda: startup_state)
+
 # Security
 security = HTTPBearer()
 
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """Shed load with 503 when an executor pool queue is full"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(RateLimitedError)
+async def rate_limited_handler(request: Request, exc: RateLimitedError):
+    """Tell a client over its token bucket when to come back"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def _request_size(request: Request) -> int:
+    """Payload bytes a request carries, from its declared body length and its query string"""
+    try:
+        size = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        size = 0
+    return size + len(request.scope.get("query_string", b""))
+
+async def get_current_user(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Principal:
+    """Dependency that resolves the authenticated user, off the event loop on a cache miss,
+    and charges the request to the user's rate limit"""
+    started = time.perf_counter()
+    try:
+        principal = auth_service.get_cached_user(credentials.credentials)
+        if principal is not None:
+            AUTH_CACHE_HIT.observe(time.perf_counter() - started)
+        else:
+            principal = await auth_service.load_principal(db, credentials.credentials)
+            AUTH_CACHE_MISS.observe(time.perf_counter() - started)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    cost = rate_limit_service.cost(request.query_params.get("algorithm"), _request_size(request))
+    await rate_limit_service.charge(principal.id, cost)
+    # Endpoints that find the algorithms in the body surcharge on top of this
+    request.state.rate_limit_cost = cost
+    return principal
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -48,12 +218,71 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "CipherCanary API"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 while warming up or shutting down, or when the database does not answer"""
+    if not startup_state["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+    try:
+        await asyncio.wait_for(ping_db(), settings.READY_CHECK_TIMEOUT_SECONDS)
+    except Exception:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "database_unavailable"}
+        )
+    return {"status": "ready", **startup_state}
+
+@app.get("/health/db")
+async def db_health():
+    """Connection pool occupancy and checkout wait times"""
+    return pool_stats()
+
+@app.get("/health/executors")
+async def executor_health():
+    """Executor pool saturation metrics"""
+    return executor_service.stats()
+
+@app.get("/health/principal-cache")
+async def principal_cache_health():
+    """Authenticated-principal cache hit/miss/eviction counters"""
+    return auth_service.principal_cache.stats()
+
+@app.get("/health/cache")
+async def cache_health():
+    """Shared cache tier state and per-tier L1/L2 hit rates"""
+    return cache_service.stats()
+
+@app.get("/health/key-cache")
+async def key_cache_health():
+    """Key-material cache L1/L2 hit/miss/eviction counters"""
+    return key_service.key_cache.stats()
+
+@app.get("/health/audit")
+async def audit_health():
+    """Audit queue depth and writer counters"""
+    return audit_service.stats()
+
+@app.get("/health/keypool")
+async def key_pool_health():
+    """RSA key-pair pool depth and wait-time metrics"""
+    return rsa_key_pool.stats()
+
+@app.get("/health/ratelimit")
+async def rate_limit_health():
+    """Admitted and rate-limited request counters"""
+    return rate_limit_service.stats()
+
 # Authentication endpoints
 @app.post("/auth/register", response_model=User)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(request: Request, user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """User registration endpoint"""
     try:
-        user = auth_service.create_user(db, user_data)
+        user = await auth_service.create_user(db, user_data)
+        await audit_service.record_action(user.id, "user.register", "user", user.id, **_client_info(request))
         return user
     except ValueError as e:
         raise HTTPException(
@@ -62,10 +291,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """User login endpoint"""
     try:
-        token = auth_service.authenticate_user(db, user_credentials)
+        token = await auth_service.authenticate_user(db, user_credentials)
         return token
     except ValueError as e:
         raise HTTPException(
@@ -73,24 +302,142 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@app.post("/auth/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for a new access and refresh token"""
+    try:
+        return await auth_service.refresh_tokens(db, request.refresh_token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+
+@app.post("/auth/logout")
+async def logout(
+    request: Request,
+    logout_request: Optional[LogoutRequest] = None,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Revoke the current access token and optionally a refresh token"""
+    await auth_service.logout(db, user, logout_request.refresh_token if logout_request else None)
+    await audit_service.record_action(user.id, "user.logout", "user", user.id, **_client_info(request))
+    return {"status": "logged_out"}
+
+@app.patch("/auth/users/{user_id}", response_model=User)
+async def update_user(
+    request: Request,
+    user_id: UUID,
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Deactivate a user or change their role (admin only)"""
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required"
+        )
+    try:
+        updated = await auth_service.update_user(db, user_id, user_update.is_active, user_update.role)
+        await audit_service.record_action(
+            user.id, "user.update", "user", user_id,
+            user_update.model_dump(exclude_none=True), **_client_info(request)
+        )
+        return updated
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+def _client_info(request: Request) -> dict:
+    """Client address and user agent for audit records"""
+    return {
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent")
+    }
+
+def _size(value) -> Optional[int]:
+    """Byte length of a str or bytes payload, for the usage rollups"""
+    if value is None:
+        return None
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+async def _record_operation(user: Principal, operation_type: str, algorithm: str,
+                            managed_key=None, result: Optional[dict] = None, status: str = "completed",
+                            bytes_in: Optional[int] = None, bytes_out: Optional[int] = None):
+    """Queue an encryption_operations row for the audit writer"""
+    await audit_service.record_operation(
+        user.id, operation_type, algorithm,
+        key_id=managed_key.id if managed_key is not None else None,
+        input_hash=result.get("input_hash") if result else None,
+        output_hash=result.get("output_hash") if result else None,
+        status=status,
+        bytes_in=bytes_in,
+        bytes_out=bytes_out
+    )
+
 # Cryptography endpoints
+def _is_binary_request(request: Request) -> bool:
+    """True when the body is a raw application/octet-stream payload"""
+    return request.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE)
+
+def _wants_binary(request: Request) -> bool:
+    """True when the client asked for an application/octet-stream response"""
+    return BINARY_MEDIA_TYPE in request.headers.get("accept", "")
+
 @app.post("/api/v1/encrypt")
 async def encrypt_data(
-    data: str,
+    request: Request,
+    data: Optional[str] = None,
     algorithm: str = "aes-256-gcm",
     key_id: str = None,
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    data_key: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
 ):
-    """Encrypt data endpoint"""
+    """Encrypt data endpoint (JSON or binary envelope, negotiated by headers)
+
+    With ``data_key=true`` the key_id key acts as a master key: data is sealed
+    under a cached data key and the result is an envelope carrying it wrapped.
+    """
+    if _is_binary_request(request):
+        payload = await request.body()
+    elif data is not None:
+        payload = data
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="data is required"
+        )
+    
     try:
-        # Verify token and get user
-        user = auth_service.get_current_user(db, credentials.credentials)
+        managed_key = await key_service.resolve_async(db, key_id, user.id)
+        if _wants_binary(request):
+            if isinstance(payload, str):
+                payload = payload.encode('utf-8')
+            envelope, key = await crypto_service.encrypt_envelope_async(
+                payload, algorithm, key_id, user.id, managed_key, data_key
+            )
+            await _record_operation(
+                user, "encrypt", algorithm, managed_key, bytes_in=len(payload), bytes_out=len(envelope)
+            )
+            headers = {"X-Encryption-Key": base64.b64encode(key).decode('utf-8')} if key else {}
+            return Response(content=envelope, media_type=BINARY_MEDIA_TYPE, headers=headers)
         
         # Encrypt the data
-        result = crypto_service.encrypt_data(data, algorithm, key_id, user.id)
+        result = await crypto_service.encrypt_data_async(payload, algorithm, key_id, user.id, managed_key, data_key)
+        await _record_operation(
+            user, "encrypt", algorithm, managed_key, result,
+            bytes_in=_size(payload), bytes_out=_size(result.get("encrypted_data"))
+        )
         return result
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
+        await _record_operation(user, "encrypt", algorithm, status="failed")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -98,21 +445,772 @@ async def encrypt_data(
 
 @app.post("/api/v1/decrypt")
 async def decrypt_data(
-    encrypted_data: str,
+    request: Request,
+    encrypted_data: Optional[str] = None,
     algorithm: str = "aes-256-gcm",
     key_id: str = None,
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    data_key: bool = False,
+    x_encryption_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
 ):
-    """Decrypt data endpoint"""
+    """Decrypt data endpoint (JSON or binary envelope, negotiated by headers)
+
+    Binary data-key envelopes are recognised from their header; JSON ones
+    need ``data_key=true``.
+    """
+    if not _is_binary_request(request) and encrypted_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="encrypted_data is required"
+        )
+    
     try:
-        # Verify token and get user
-        user = auth_service.get_current_user(db, credentials.credentials)
+        if _is_binary_request(request):
+            body = await request.body()
+            if x_encryption_key:
+                key = crypto_service.decode_key(x_encryption_key)
+            else:
+                key = await key_service.resolve_async(db, key_id or crypto_service.envelope_key_id(body), user.id)
+            plaintext, algorithm, key_id = await crypto_service.decrypt_envelope_async(body, key, user.id)
+            await _record_operation(
+                user, "decrypt", algorithm, key if isinstance(key, ManagedKey) else None,
+                bytes_in=len(body), bytes_out=len(plaintext)
+            )
+            if _wants_binary(request):
+                return Response(content=plaintext, media_type=BINARY_MEDIA_TYPE)
+            return {
+                "decrypted_data": plaintext.decode('utf-8'),
+                "algorithm": algorithm,
+                "key_id": key_id,
+                "timestamp": datetime.utcnow().isoformat(),
+                "status": "success"
+            }
         
         # Decrypt the data
-        result = crypto_service.decrypt_data(encrypted_data, algorithm, key_id, user.id)
+        managed_key = await key_service.resolve_async(db, key_id, user.id)
+        result = await crypto_service.decrypt_data_async(
+            encrypted_data, algorithm, key_id, user.id, managed_key, data_key
+        )
+        await _record_operation(
+            user, "decrypt", algorithm, managed_key, result,
+            bytes_in=_size(encrypted_data), bytes_out=_size(result.get("decrypted_data"))
+        )
+        if _wants_binary(request):
+            return Response(content=result["decrypted_data"].encode('utf-8'), media_type=BINARY_MEDIA_TYPE)
+        return result
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        await _record_operation(user, "decrypt", algorithm, status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def _check_batch_size(size: int):
+    """Reject batches above the configured maximum"""
+    if size > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size {size} exceeds maximum of {settings.MAX_BATCH_SIZE}"
+        )
+
+def _batch_response(results: list) -> BatchResponse:
+    """Attach item indexes and success/failure counts"""
+    succeeded = sum(1 for item in results if item["status"] == "success")
+    return BatchResponse(
+        results=[{"index": index, **item} for index, item in enumerate(results)],
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
+
+@app.post("/api/v1/encrypt/batch", response_model=BatchResponse)
+async def encrypt_batch(
+    http_request: Request,
+    request: BatchEncryptRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Encrypt many items with a single authentication"""
+    _check_batch_size(len(request.items))
+    await rate_limit_service.surcharge(
+        user.id, ((item.algorithm, _size(item.data)) for item in request.items), http_request.state.rate_limit_cost
+    )
+    keys = await key_service.resolve_many_async(db, (item.key_id for item in request.items), user.id)
+    items = [
+        (item.data, item.algorithm, item.key_id, keys.get(item.key_id))
+        for item in request.items
+    ]
+    results = await crypto_service.encrypt_batch_async(items, user.id)
+    for (data, algorithm, _, managed_key), item in zip(items, results):
+        if not isinstance(managed_key, ManagedKey):
+            managed_key = None
+        result = item.get("result")
+        await _record_operation(
+            user, "encrypt", algorithm, managed_key, result,
+            "completed" if item["status"] == "success" else "failed",
+            bytes_in=_size(data), bytes_out=_size(result.get("encrypted_data")) if result else None
+        )
+    return _batch_response(results)
+
+@app.post("/api/v1/decrypt/batch", response_model=BatchResponse)
+async def decrypt_batch(
+    http_request: Request,
+    request: BatchDecryptRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Decrypt many items with a single authentication"""
+    _check_batch_size(len(request.items))
+    await rate_limit_service.surcharge(
+        user.id, ((item.algorithm, _size(item.encrypted_data)) for item in request.items),
+        http_request.state.rate_limit_cost
+    )
+    keys = await key_service.resolve_many_async(db, (item.key_id for item in request.items), user.id)
+    items = [
+        (item.encrypted_data, item.algorithm, item.key_id, keys.get(item.key_id))
+        for item in request.items
+    ]
+    results = await crypto_service.decrypt_batch_async(items, user.id)
+    for (encrypted_data, algorithm, _, managed_key), item in zip(items, results):
+        if not isinstance(managed_key, ManagedKey):
+            managed_key = None
+        result = item.get("result")
+        await _record_operation(
+            user, "decrypt", algorithm, managed_key, result,
+            "completed" if item["status"] == "success" else "failed",
+            bytes_in=_size(encrypted_data), bytes_out=_size(result.get("decrypted_data")) if result else None
+        )
+    return _batch_response(results)
+
+# Signature endpoints
+@app.post("/api/v1/sign")
+async def sign_data(
+    request: SignRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Sign data with a stored Ed25519 key"""
+    try:
+        managed_key = await key_service.resolve_async(db, request.key_id, user.id)
+        result = await crypto_service.sign_async(request.data, managed_key, request.key_id)
+        await _record_operation(
+            user, "sign", "ed25519", managed_key, result, bytes_in=_size(request.data), bytes_out=64
+        )
         return result
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        await _record_operation(user, "sign", "ed25519", status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+async def _public_keys(db: AsyncSession, items: List[VerifyRequest], user: Principal) -> list:
+    """Raw public key for each item, or the error resolving it; each distinct key is looked up once"""
+    keys = await key_service.resolve_many_async(db, (item.key_id for item in items), user.id)
+    decoded = {}
+    public_keys = []
+    for item in items:
+        try:
+            if item.key_id:
+                managed_key = keys[item.key_id]
+                if isinstance(managed_key, Exception):
+                    raise managed_key
+                public_key = crypto_service.public_key_for(managed_key)
+            elif item.public_key:
+                public_key = decoded.get(item.public_key)
+                if public_key is None:
+                    public_key = decoded[item.public_key] = crypto_service.decode_public_key(item.public_key)
+            else:
+                raise ValueError("key_id or public_key is required")
+        except ValueError as e:
+            public_key = e
+        public_keys.append(public_key)
+    return public_keys
+
+@app.post("/api/v1/verify", response_model=VerifyResponse)
+async def verify_signature(
+    request: VerifyRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Verify an Ed25519 signature against a stored key or a supplied public key"""
+    try:
+        public_key = (await _public_keys(db, [request], user))[0]
+        if isinstance(public_key, Exception):
+            raise public_key
+        valid = await crypto_service.verify_async(request.message, request.signature, public_key)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await _record_operation(
+        user, "verify", "ed25519", status="completed" if valid else "invalid", bytes_in=_size(request.message)
+    )
+    return VerifyResponse(valid=valid, key_id=request.key_id)
+
+@app.post("/api/v1/verify/batch", response_model=VerifyBatchResponse)
+async def verify_batch(
+    http_request: Request,
+    request: VerifyBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Verify many Ed25519 signatures with a single authentication"""
+    if len(request.items) > settings.MAX_VERIFY_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size {len(request.items)} exceeds maximum of {settings.MAX_VERIFY_BATCH_SIZE}"
+        )
+    public_keys = await _public_keys(db, request.items, user)
+    results = await crypto_service.verify_batch_async([
+        (item.message, item.signature, public_key) for item, public_key in zip(request.items, public_keys)
+    ])
+    
+    valid = sum(1 for item in results if item["valid"])
+    failed = sum(1 for item in results if item["status"] != "success")
+    # One audit entry per batch; a row per signature would swamp the audit writer
+    await audit_service.record_action(
+        user.id, "crypto.verify_batch", details={"items": len(results), "valid": valid, "failed": failed},
+        **_client_info(http_request)
+    )
+    return VerifyBatchResponse(
+        results=[{"index": index, **item} for index, item in enumerate(results)],
+        valid=valid,
+        invalid=len(results) - valid - failed,
+        failed=failed
+    )
+
+# Searchable encryption endpoints
+@app.post("/api/v1/encrypt/deterministic")
+async def encrypt_deterministic(
+    request: DeterministicEncryptRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Encrypt a field value with AES-SIV so equal values can be matched without decrypting"""
+    try:
+        managed_key = await key_service.resolve_async(db, request.key_id, user.id)
+        result = await crypto_service.encrypt_deterministic_async(request.data, managed_key, request.field)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        await _record_operation(user, "encrypt", "aes-256-siv", status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await _record_operation(
+        user, "encrypt", "aes-256-siv", managed_key, result,
+        bytes_in=_size(request.data), bytes_out=_size(result["encrypted_data"])
+    )
+    return result
+
+@app.post("/api/v1/decrypt/deterministic")
+async def decrypt_deterministic(
+    request: DeterministicDecryptRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Decrypt a value from /api/v1/encrypt/deterministic"""
+    try:
+        managed_key = await key_service.resolve_async(db, request.key_id, user.id)
+        result = await crypto_service.decrypt_deterministic_async(request.encrypted_data, managed_key, request.field)
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
+        await _record_operation(user, "decrypt", "aes-256-siv", status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await _record_operation(
+        user, "decrypt", "aes-256-siv", managed_key, result,
+        bytes_in=_size(request.encrypted_data), bytes_out=_size(result["decrypted_data"])
+    )
+    return result
+
+@app.post("/api/v1/blind-index", response_model=BlindIndexResponse)
+async def blind_index(
+    request: BlindIndexRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Keyed hash of a value for equality lookups on encrypted fields"""
+    try:
+        managed_key = await key_service.resolve_async(db, request.key_id, user.id)
+        index = await crypto_service.blind_index_async(request.value, managed_key, request.field)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await _record_operation(
+        user, "blind_index", "hmac-sha256", managed_key, bytes_in=_size(request.value), bytes_out=len(index)
+    )
+    return BlindIndexResponse(blind_index=index, key_id=request.key_id, field=request.field)
+
+@app.post("/api/v1/blind-index/batch", response_model=BlindIndexBatchResponse)
+async def blind_index_batch(
+    http_request: Request,
+    request: BlindIndexBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Blind indexes for many values of one field, for backfilling an index column"""
+    if len(request.values) > settings.MAX_BLIND_INDEX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size {len(request.values)} exceeds maximum of {settings.MAX_BLIND_INDEX_BATCH_SIZE}"
+        )
+    try:
+        managed_key = await key_service.resolve_async(db, request.key_id, user.id)
+        indexes = await crypto_service.blind_index_batch_async(request.values, managed_key, request.field)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # One audit entry per batch, as for verify/batch
+    await audit_service.record_action(
+        user.id, "crypto.blind_index_batch", "encryption_key", managed_key.id,
+        {"items": len(indexes), "field": request.field}, **_client_info(http_request)
+    )
+    return BlindIndexBatchResponse(blind_indexes=indexes, key_id=request.key_id, field=request.field)
+
+# Key management endpoints
+@app.post("/api/v1/keys", response_model=KeyResponse)
+async def create_key(
+    request: Request,
+    key_data: KeyCreate,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Generate and store a new key"""
+    await rate_limit_service.surcharge(
+        user.id, [(key_data.algorithm, 0)], request.state.rate_limit_cost, "keygen"
+    )
+    try:
+        db_key = await key_service.create_key(db, user.id, key_data)
+        await audit_service.record_action(
+            user.id, "key.create", "encryption_key", db_key.id,
+            {"algorithm": db_key.algorithm}, **_client_info(request)
+        )
+        return db_key
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/keys", response_model=List[KeyResponse])
+async def list_keys(
+    include_inactive: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """List the caller's keys"""
+    return await key_service.list_keys(db, user.id, include_inactive)
+
+@app.delete("/api/v1/keys/{key_id}", response_model=KeyResponse)
+async def deactivate_key(
+    request: Request,
+    key_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Deactivate a key and evict it from the key cache"""
+    try:
+        db_key = await key_service.deactivate_key(db, key_id, user.id)
+        await audit_service.record_action(
+            user.id, "key.deactivate", "encryption_key", db_key.id, **_client_info(request)
+        )
+        return db_key
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+# Key rotation endpoints
+@app.post("/api/v1/rotations", response_model=RotationResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_rotation(
+    request: Request,
+    rotation: RotationCreate,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Queue a background re-encryption of a configured target from one key to another"""
+    try:
+        job = await rotation_service.create(
+            db, user.id, rotation.old_key_id, rotation.new_key_id, rotation.target, rotation.reason
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await audit_service.record_action(
+        user.id, "key.rotate", "key_rotation", job.id,
+        {"old_key_id": str(job.old_key_id), "new_key_id": str(job.new_key_id), "target": job.target},
+        **_client_info(request)
+    )
+    return rotation_service.progress(job)
+
+@app.get("/api/v1/rotations", response_model=List[RotationResponse])
+async def list_rotations(
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """List the caller's rotations with their progress"""
+    return [rotation_service.progress(job) for job in await rotation_service.list_jobs(db, user.id)]
+
+@app.get("/api/v1/rotations/{job_id}", response_model=RotationResponse)
+async def get_rotation(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Progress and ETA of one rotation"""
+    try:
+        return rotation_service.progress(await rotation_service.get(db, job_id, user.id))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/rotations/{job_id}/cancel", response_model=RotationResponse)
+async def cancel_rotation(
+    request: Request,
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Stop a rotation after its current batch; rows already rewritten keep the new key"""
+    try:
+        job = await rotation_service.cancel(db, job_id, user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await audit_service.record_action(
+        user.id, "key.rotate_cancel", "key_rotation", job.id, **_client_info(request)
+    )
+    return rotation_service.progress(job)
+
+# Streaming endpoints
+async def _audited_stream(chunks, user: Principal, operation_type: str, stream_info: dict, managed_key=None):
+    """Record a streaming operation once the stream completes or fails"""
+    operation_status = "failed"
+    bytes_out = 0
+    try:
+        async for chunk in chunks:
+            bytes_out += len(chunk)
+            yield chunk
+        operation_status = "completed"
+    finally:
+        if stream_info["algorithm"] is not None:
+            await _record_operation(
+                user, operation_type, stream_info["algorithm"], managed_key, status=operation_status,
+                bytes_out=bytes_out
+            )
+
+@app.post("/api/v1/encrypt/stream")
+async def encrypt_stream(
+    request: Request,
+    algorithm: str = "aes-256-gcm",
+    key_id: str = None,
+    x_encryption_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Encrypt the raw request body as a stream of authenticated segments"""
+    headers = {"X-Stream-Algorithm": algorithm}
+    try:
+        if key_id:
+            managed_key = await key_service.resolve_async(db, key_id, user.id)
+            key = stream_service.managed_key_material(managed_key, algorithm)
+        else:
+            key = stream_service.resolve_key(x_encryption_key)
+            headers["X-Encryption-Key"] = base64.b64encode(key).decode('utf-8')
+        encryptor = StreamEncryptor(algorithm, key, stream_service.segment_size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # The session would otherwise hold a pooled connection until the stream ends
+    await db.close()
+    
+    return BodyStreamingResponse(
+        _audited_stream(
+            stream_service.encrypt_stream(request.stream(), encryptor),
+            user, "encrypt", {"algorithm": algorithm}, managed_key if key_id else None
+        ),
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+@app.post("/api/v1/decrypt/stream")
+async def decrypt_stream(
+    request: Request,
+    key_id: str = None,
+    x_encryption_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Decrypt a segmented stream; a bad segment aborts the response mid-stream"""
+    try:
+        if key_id:
+            managed_key = await key_service.resolve_async(db, key_id, user.id)
+            key = stream_service.managed_key_material(managed_key)
+        else:
+            key = stream_service.resolve_key(x_encryption_key, generate=False)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await db.close()
+    
+    stream_info = {"algorithm": managed_key.algorithm if key_id else None}
+    return BodyStreamingResponse(
+        _audited_stream(
+            stream_service.decrypt_stream(
+                request.stream(), key,
+                on_header=lambda decryptor: stream_info.update(algorithm=decryptor.algorithm)
+            ),
+            user, "decrypt", stream_info, managed_key if key_id else None
+        ),
+        media_type="application/octet-stream"
+    )
+
+def _check_file_size(request: Request):
+    """Reject a declared body over FILE_MAX_BYTES before spooling any of it"""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.FILE_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Body exceeds the maximum of {settings.FILE_MAX_BYTES} bytes"
+        )
+
+@app.post("/api/v1/encrypt/file")
+async def encrypt_file(
+    request: Request,
+    algorithm: str = "aes-256-gcm",
+    key_id: str = None,
+    x_encryption_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Encrypt the raw request body into the stream format, sealing segments across the process pool
+
+    The body is staged on disk first, so the response starts once the whole
+    file is sealed; /api/v1/encrypt/stream starts sooner but uses one core.
+    """
+    _check_file_size(request)
+    headers = {"X-Stream-Algorithm": algorithm}
+    managed_key = None
+    try:
+        if algorithm not in STREAM_ALGORITHMS:
+            raise ValueError(f"Unsupported streaming algorithm: {algorithm}")
+        if key_id:
+            managed_key = await key_service.resolve_async(db, key_id, user.id)
+            key = stream_service.managed_key_material(managed_key, algorithm)
+        else:
+            key = stream_service.resolve_key(x_encryption_key)
+            headers["X-Encryption-Key"] = base64.b64encode(key).decode('utf-8')
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # Spooling and sealing can take minutes; don't hold a pooled connection through them
+    await db.close()
+
+    source = target = None
+    try:
+        source = await file_service.spool(request.stream())
+        target = file_service.temp_path()
+        size = await file_service.encrypt_file_async(source, target, algorithm, key)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        file_service.remove(target)
+        await _record_operation(user, "encrypt", algorithm, managed_key, status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except BaseException:
+        file_service.remove(target)
+        raise
+    finally:
+        file_service.remove(source)
+    await _record_operation(
+        user, "encrypt", algorithm, managed_key, bytes_in=size, bytes_out=os.path.getsize(target)
+    )
+    return FileResponse(
+        target, media_type=BINARY_MEDIA_TYPE, headers=headers, background=BackgroundTask(file_service.remove, target)
+    )
+
+@app.post("/api/v1/decrypt/file")
+async def decrypt_file(
+    request: Request,
+    key_id: str = None,
+    x_encryption_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Decrypt a stream-format body across the process pool
+
+    Every segment is authenticated before any plaintext is returned, so a
+    tampered or truncated file gets a 400 rather than a partial response.
+    """
+    _check_file_size(request)
+    managed_key = None
+    try:
+        if key_id:
+            managed_key = await key_service.resolve_async(db, key_id, user.id)
+            key = stream_service.managed_key_material(managed_key)
+        else:
+            key = stream_service.resolve_key(x_encryption_key, generate=False)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await db.close()
+
+    source = target = None
+    try:
+        source = await file_service.spool(request.stream())
+        target = file_service.temp_path()
+        sealed_size = os.path.getsize(source)
+        size, algorithm = await file_service.decrypt_file_async(source, target, key)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        file_service.remove(target)
+        if managed_key is not None:
+            await _record_operation(user, "decrypt", managed_key.algorithm, managed_key, status="failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except BaseException:
+        file_service.remove(target)
+        raise
+    finally:
+        file_service.remove(source)
+    await _record_operation(user, "decrypt", algorithm, managed_key, bytes_in=sealed_size, bytes_out=size)
+    return FileResponse(
+        target, media_type=BINARY_MEDIA_TYPE, background=BackgroundTask(file_service.remove, target)
+    )
+
+# Audit log endpoints
+async def audit_filters(
+    user_id: Optional[UUID] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: Principal = Depends(get_current_user)
+) -> dict:
+    """Audit query filters; only admins may read other users' entries"""
+    if user.role != "admin":
+        if user_id is not None and user_id != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Admin role required"
+            )
+        user_id = user.id
+    return {
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "since": since,
+        "until": until
+    }
+
+@app.get("/api/v1/audit", response_model=AuditLogPage)
+async def list_audit_logs(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.AUDIT_PAGE_SIZE, ge=1, le=settings.AUDIT_MAX_PAGE_SIZE),
+    filters: dict = Depends(audit_filters),
+    db: AsyncSession = Depends(get_db)
+):
+    """Page through audit entries, newest first; pass next_cursor back to continue"""
+    try:
+        return await audit_log_service.page(db, filters, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/audit/export")
+async def export_audit_logs(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1),
+    filters: dict = Depends(audit_filters),
+    user: Principal = Depends(get_current_user)
+):
+    """Stream every matching audit entry as NDJSON, newest first"""
+    await audit_service.record_action(
+        user.id, "audit.export",
+        details={key: str(value) for key, value in filters.items() if value is not None},
+        **_client_info(request)
+    )
+    return StreamingResponse(audit_log_service.export(filters, limit), media_type="application/x-ndjson")
+
+# Usage statistics
+@app.get("/api/v1/stats", response_model=UsageStatsResponse)
+async def usage_stats(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    user_id: Optional[UUID] = None,
+    algorithm: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user)
+):
+    """Daily operation counts from the usage rollups (UTC days, both ends inclusive)
+
+    Defaults to the last 30 days. Users see their own usage; admins see every
+    user's combined usage, or one user's with user_id.
+    """
+    if user.role != "admin":
+        if user_id is not None and user_id != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Admin role required"
+            )
+        user_id = user.id
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=29)
+    try:
+        return await usage_service.usage(db, since, until, user_id, algorithm)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -125,8 +1223,11 @@ async def get_algorithms():
         "algorithms": [
             {"name": "AES-256-GCM", "value": "aes-256-gcm", "type": "symmetric"},
             {"name": "ChaCha20-Poly1305", "value": "chacha20-poly1305", "type": "symmetric"},
+            {"name": "AES-256-SIV", "value": "aes-256-siv", "type": "symmetric",
+             "description": "Deterministic, for searchable fields, via /api/v1/encrypt/deterministic"},
             {"name": "RSA-4096", "value": "rsa-4096", "type": "asymmetric"},
-            {"name": "Ed25519", "value": "ed25519", "type": "asymmetric"}
+            {"name": "Ed25519", "value": "ed25519", "type": "asymmetric",
+             "description": "Signatures only, via /api/v1/sign and /api/v1/verify"}
         ]
     }
 
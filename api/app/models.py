@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger, Column, Date, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index,
+    PrimaryKeyConstraint, Uuid
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -9,7 +11,7 @@ from .database import Base
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
@@ -25,7 +27,7 @@ class User(Base):
 class EncryptionKey(Base):
     __tablename__ = "encryption_keys"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False)
     key_type = Column(String(20), nullable=False)
     key_material = Column(Text, nullable=False)  # Base64 encoded
@@ -34,16 +36,21 @@ class EncryptionKey(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True))
-    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     
     # Relationships
     owner = relationship("User", back_populates="encryption_keys")
+    
+    __table_args__ = (
+        # Key resolution filters by owner and active status on every cache miss
+        Index("idx_encryption_keys_owner_active", "owner_id", "is_active"),
+    )
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     action = Column(String(100), nullable=False)
     resource_type = Column(String(50))
     resource_id = Column(String(100))
@@ -54,21 +61,87 @@ class AuditLog(Base):
     
     # Relationships
     user = relationship("User", back_populates="audit_logs")
+    
+    __table_args__ = (
+        # The audit query API filters on one of these and pages by (timestamp, id)
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp"),
+        Index("ix_audit_logs_resource_timestamp", "resource_type", "resource_id", "timestamp"),
+    )
 
 class EncryptionOperation(Base):
     __tablename__ = "encryption_operations"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     operation_type = Column(String(20), nullable=False)  # encrypt, decrypt
     algorithm = Column(String(50), nullable=False)
-    key_id = Column(UUID(as_uuid=True), ForeignKey("encryption_keys.id"))
-    input_hash = Column(String(64))  # SHA-256 hash of input
-    output_hash = Column(String(64))  # SHA-256 hash of output
+    key_id = Column(Uuid, ForeignKey("encryption_keys.id"))
+    input_hash = Column(String(64))  # Audit digest of input (AUDIT_DIGEST_ALGORITHM)
+    output_hash = Column(String(64))  # Audit digest of output (AUDIT_DIGEST_ALGORITHM)
     status = Column(String(20), nullable=False, default="completed")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    bytes_in = Column(BigInteger)
+    bytes_out = Column(BigInteger)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     completed_at = Column(DateTime(timezone=True))
     
     # Relationships
     user = relationship("User")
     key = relationship("EncryptionKey")
+
+class KeyRotation(Base):
+    __tablename__ = "key_rotations"
+    
+    # A re-encryption job over one ROTATION_TARGETS column, run by RotationService
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    old_key_id = Column(Uuid, ForeignKey("encryption_keys.id"), nullable=False)
+    new_key_id = Column(Uuid, ForeignKey("encryption_keys.id"), nullable=False)
+    rotation_reason = Column(String(100))
+    rotated_by = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    rotated_at = Column(DateTime(timezone=True), server_default=func.now())
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed, cancelled
+    target = Column(String(255), nullable=False)
+    last_id = Column(Text)  # checkpoint: every row up to this id has been processed
+    rows_total = Column(BigInteger)
+    rows_done = Column(BigInteger, nullable=False, default=0)
+    rows_skipped = Column(BigInteger, nullable=False, default=0)
+    rows_failed = Column(BigInteger, nullable=False, default=0)
+    error = Column(Text)
+    worker = Column(String(100))
+    heartbeat_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # Runners poll for pending and stale running jobs
+        Index("ix_key_rotations_status", "status"),
+    )
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    
+    # Either one token (jti) or every token issued to a user before revoked_at
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    jti = Column(String(64), index=True)
+    user_id = Column(Uuid, ForeignKey("users.id"), index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # purged after this
+
+class UsageRollup(Base):
+    __tablename__ = "usage_rollups"
+    
+    # Per-day counters over encryption_operations, upserted by the audit writer as rows are flushed
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)  # UTC
+    algorithm = Column(String(50), nullable=False)
+    operation_type = Column(String(20), nullable=False)
+    operations = Column(BigInteger, nullable=False, default=0)
+    failed = Column(BigInteger, nullable=False, default=0)
+    bytes_in = Column(BigInteger, nullable=False, default=0)
+    bytes_out = Column(BigInteger, nullable=False, default=0)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "day", "algorithm", "operation_type"),
+        # Cross-user dashboards read a day range for everyone
+        Index("ix_usage_rollups_day", "day"),
+    )
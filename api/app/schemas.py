@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from uuid import UUID
 
 # User schemas
@@ -25,13 +25,24 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    role: Optional[str] = Field(None, max_length=20)
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     expires_in: int
     user: User
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -60,6 +71,98 @@ class DecryptionResponse(BaseModel):
     timestamp: datetime
     status: str = "success"
 
+# Batch schemas
+class BatchEncryptItem(BaseModel):
+    data: str = Field(..., description="Data to encrypt")
+    algorithm: str = Field(default="aes-256-gcm", description="Encryption algorithm")
+    key_id: Optional[str] = Field(None, description="Specific key ID to use")
+
+class BatchEncryptRequest(BaseModel):
+    items: List[BatchEncryptItem] = Field(..., min_length=1)
+
+class BatchDecryptItem(BaseModel):
+    encrypted_data: str = Field(..., description="Encrypted data to decrypt")
+    algorithm: str = Field(default="aes-256-gcm", description="Encryption algorithm used")
+    key_id: Optional[str] = Field(None, description="Key ID used for encryption")
+
+class BatchDecryptRequest(BaseModel):
+    items: List[BatchDecryptItem] = Field(..., min_length=1)
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+# Signature schemas
+class SignRequest(BaseModel):
+    data: str = Field(..., description="Data to sign")
+    key_id: str = Field(..., description="Ed25519 key to sign with")
+
+class VerifyRequest(BaseModel):
+    message: str = Field(..., description="Signed data")
+    signature: str = Field(..., description="Base64 Ed25519 signature")
+    key_id: Optional[str] = Field(None, description="Stored Ed25519 key to verify against")
+    public_key: Optional[str] = Field(None, description="Base64 raw Ed25519 public key, when not using key_id")
+
+class VerifyResponse(BaseModel):
+    valid: bool
+    algorithm: str = "ed25519"
+    key_id: Optional[str] = None
+
+class VerifyBatchRequest(BaseModel):
+    items: List[VerifyRequest] = Field(..., min_length=1)
+
+class VerifyItemResult(BaseModel):
+    index: int
+    status: str
+    valid: bool
+    error: Optional[str] = None
+
+class VerifyBatchResponse(BaseModel):
+    results: List[VerifyItemResult]
+    valid: int
+    invalid: int
+    failed: int
+
+# Searchable encryption schemas
+class DeterministicEncryptRequest(BaseModel):
+    data: str = Field(..., min_length=1, description="Field value to encrypt")
+    key_id: str = Field(..., description="aes-256-siv key to encrypt with")
+    field: str = Field(..., min_length=1, max_length=100, description="Field name; each field gets its own subkey")
+
+class DeterministicDecryptRequest(BaseModel):
+    encrypted_data: str = Field(..., description="Ciphertext from /api/v1/encrypt/deterministic")
+    key_id: str = Field(..., description="aes-256-siv key it was encrypted with")
+    field: str = Field(..., min_length=1, max_length=100, description="Field name it was encrypted for")
+
+class BlindIndexRequest(BaseModel):
+    value: str = Field(..., description="Value to index")
+    key_id: str = Field(..., description="Symmetric key to derive the field's index key from")
+    field: str = Field(..., min_length=1, max_length=100, description="Field name; each field gets its own subkey")
+
+class BlindIndexResponse(BaseModel):
+    blind_index: str
+    key_id: str
+    field: str
+    algorithm: str = "hmac-sha256"
+
+class BlindIndexBatchRequest(BaseModel):
+    values: List[str] = Field(..., min_length=1)
+    key_id: str = Field(..., description="Symmetric key to derive the field's index key from")
+    field: str = Field(..., min_length=1, max_length=100, description="Field name; each field gets its own subkey")
+
+class BlindIndexBatchResponse(BaseModel):
+    blind_indexes: List[str]
+    key_id: str
+    field: str
+    algorithm: str = "hmac-sha256"
+
 # Key management schemas
 class KeyCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -79,6 +182,34 @@ class KeyResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Key rotation schemas
+class RotationCreate(BaseModel):
+    old_key_id: str = Field(..., description="Key the stored ciphertexts are encrypted with; may be inactive")
+    new_key_id: str = Field(..., description="Active key to re-encrypt them with")
+    target: str = Field(..., description="One of the configured ROTATION_TARGETS")
+    reason: Optional[str] = Field(None, max_length=100)
+
+class RotationResponse(BaseModel):
+    id: UUID
+    old_key_id: UUID
+    new_key_id: UUID
+    target: str
+    status: str
+    rotation_reason: Optional[str] = None
+    rotated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    rows_total: Optional[int] = None
+    rows_done: int = 0
+    rows_skipped: int = 0
+    rows_failed: int = 0
+    rows_processed: int = 0
+    percent_complete: Optional[float] = None
+    rows_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+
 # Algorithm schemas
 class AlgorithmInfo(BaseModel):
     name: str
@@ -90,15 +221,42 @@ class AlgorithmInfo(BaseModel):
 # Audit log schemas
 class AuditLogResponse(BaseModel):
     id: int
+    user_id: Optional[UUID] = None
     action: str
     resource_type: Optional[str] = None
     resource_id: Optional[str] = None
+    details: Optional[dict] = None
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
     timestamp: datetime
-    user: User
     
     class Config:
         from_attributes = True
 
+class AuditLogPage(BaseModel):
+    items: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
+
+# Usage statistics schemas
+class UsageCounters(BaseModel):
+    operations: int
+    failed: int
+    bytes_in: int
+    bytes_out: int
+
+class UsageDay(UsageCounters):
+    day: date
+    algorithm: str
+    operation_type: str
+
+class UsageStatsResponse(BaseModel):
+    since: date
+    until: date
+    user_id: Optional[UUID] = None
+    days: List[UsageDay]
+    by_algorithm: Dict[str, UsageCounters]
+    totals: UsageCounters
+
 # Health check schemas
 class HealthCheck(BaseModel):
     status: str
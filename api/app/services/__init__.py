@@ -1,4 +1,8 @@
+from .audit_service import audit_service
 from .auth_service import auth_service
+from .cache_service import cache_service
 from .crypto_service import crypto_service
+from .executor_service import executor_service
+from .key_service import key_service
 
-__all__ = ["auth_service", "crypto_service"]
+__all__ = ["audit_service", "auth_service", "cache_service", "crypto_service", "executor_service", "key_service"]
@@ -0,0 +1,225 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .audit_service import _json_default
+from ..database import SessionLocal, engine
+from ..models import AuditLog
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+AUDIT_COLUMNS = (
+    AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.resource_type, AuditLog.resource_id,
+    AuditLog.details, AuditLog.ip_address, AuditLog.user_agent, AuditLog.timestamp
+)
+FILTER_COLUMNS = ("user_id", "action", "resource_type", "resource_id")
+
+# pg_advisory_xact_lock key, so only one worker maintains partitions at a time
+PARTITION_LOCK_ID = 0x41756469
+PARTITION_BOUND = re.compile(r"TO \('([^']+)'\)")
+MONTHLY_PARTITION = re.compile(r"^audit_logs_p\d{6}$")
+
+Cursor = Tuple[datetime, int]
+
+
+def _month_start(value: datetime, offset: int = 0) -> datetime:
+    """First instant (UTC) of the month ``offset`` months from ``value``"""
+    month = value.year * 12 + value.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc)
+    return value
+
+
+class AuditLogService:
+    """Reads and maintains the audit_logs table that AuditService writes
+
+    Queries page by keyset on (timestamp, id), newest first, so a page costs
+    the same however deep into the log it is. On PostgreSQL the table is
+    range-partitioned by month (migration 0002): the time filters prune
+    partitions, and retention drops whole partitions instead of deleting rows.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+        # Maintenance metrics
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.rows_deleted = 0
+        self.maintenance_errors = 0
+
+    def encode_cursor(self, timestamp: datetime, row_id: int) -> str:
+        raw = f"{timestamp.isoformat()}|{row_id}".encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Cursor:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode('ascii')
+            timestamp, row_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(timestamp), int(row_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError("Invalid cursor")
+
+    def _query(self, filters: Dict[str, Any], after: Optional[Cursor], limit: int):
+        query = select(*AUDIT_COLUMNS)
+        for name in FILTER_COLUMNS:
+            if filters.get(name) is not None:
+                query = query.where(getattr(AuditLog, name) == filters[name])
+        if filters.get("since") is not None:
+            query = query.where(AuditLog.timestamp >= _utc(filters["since"]))
+        if filters.get("until") is not None:
+            query = query.where(AuditLog.timestamp < _utc(filters["until"]))
+        if after is not None:
+            timestamp, row_id = after
+            # The plain bound lets PostgreSQL prune partitions; the row comparison breaks ties
+            query = query.where(
+                AuditLog.timestamp <= timestamp,
+                tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(timestamp, row_id)
+            )
+        return query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit)
+
+    async def page(self, db: AsyncSession, filters: Dict[str, Any], cursor: Optional[str],
+                   limit: int) -> Dict[str, Any]:
+        """One page of matching rows, newest first, with the cursor for the next page"""
+        after = self.decode_cursor(cursor) if cursor else None
+        rows = (await db.execute(self._query(filters, after, limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1].timestamp, rows[-1].id)
+        return {"items": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+    async def export(self, filters: Dict[str, Any], limit: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Matching rows as NDJSON, newest first
+
+        Rows are fetched in AUDIT_EXPORT_BATCH_SIZE keyset pages, each on its
+        own short-lived session, so a long export holds no connection or
+        transaction open while the client reads.
+        """
+        after = None
+        sent = 0
+        while limit is None or sent < limit:
+            size = settings.AUDIT_EXPORT_BATCH_SIZE if limit is None else min(
+                settings.AUDIT_EXPORT_BATCH_SIZE, limit - sent
+            )
+            async with SessionLocal() as db:
+                rows = (await db.execute(self._query(filters, after, size))).all()
+            if not rows:
+                return
+            yield "".join(
+                json.dumps(row._asdict(), default=_json_default, separators=(",", ":")) + "\n" for row in rows
+            ).encode('utf-8')
+            sent += len(rows)
+            if len(rows) < size:
+                return
+            after = (rows[-1].timestamp, rows[-1].id)
+
+    def start(self):
+        """Run partition and retention maintenance now and every AUDIT_MAINTENANCE_INTERVAL_SECONDS"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.maintain()
+            except Exception:
+                self.maintenance_errors += 1
+                logger.warning("Audit log maintenance failed", exc_info=True)
+            await asyncio.sleep(settings.AUDIT_MAINTENANCE_INTERVAL_SECONDS)
+
+    async def maintain(self):
+        """Create upcoming monthly partitions and apply AUDIT_RETENTION_MONTHS"""
+        now = datetime.now(timezone.utc)
+        cutoff = _month_start(now, -settings.AUDIT_RETENTION_MONTHS) if settings.AUDIT_RETENTION_MONTHS else None
+        if engine.dialect.name == "postgresql":
+            await self._maintain_partitions(now, cutoff)
+        elif cutoff is not None:
+            await self._delete_before(cutoff)
+
+    async def _maintain_partitions(self, now: datetime, cutoff: Optional[datetime]):
+        async with engine.begin() as connection:
+            await connection.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": PARTITION_LOCK_ID})
+            partitioned = await connection.scalar(
+                text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('audit_logs')")
+            )
+            if not partitioned:
+                # Tables created by create_all (DB_AUTO_CREATE) are not partitioned
+                if cutoff is not None:
+                    await self._delete_before(cutoff)
+                return
+
+            result = await connection.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'audit_logs'::regclass"
+            ))
+            upper_bounds = {}
+            for name, bound in result.all():
+                match = PARTITION_BOUND.search(bound or "")
+                if match:
+                    upper_bounds[name] = datetime.fromisoformat(match.group(1))
+
+            covered_until = max(upper_bounds.values(), default=None)
+            for offset in range(settings.AUDIT_PARTITION_PREMAKE_MONTHS + 1):
+                start, end = _month_start(now, offset), _month_start(now, offset + 1)
+                if covered_until is not None and start < covered_until:
+                    continue
+                await connection.execute(text(
+                    f"CREATE TABLE audit_logs_p{start:%Y%m} PARTITION OF audit_logs "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                self.partitions_created += 1
+
+            if cutoff is None:
+                return
+            for name, upper_bound in upper_bounds.items():
+                if upper_bound <= cutoff and (MONTHLY_PARTITION.match(name) or name == "audit_logs_legacy"):
+                    # Detach and drop are catalog operations: no rows are scanned or deleted
+                    await connection.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{name}"'))
+                    await connection.execute(text(f'DROP TABLE "{name}"'))
+                    self.partitions_dropped += 1
+                    logger.info("Dropped audit partition %s", name)
+
+    async def _delete_before(self, cutoff: datetime):
+        """Row-by-row retention for unpartitioned tables, in bounded batches"""
+        while True:
+            async with engine.begin() as connection:
+                result = await connection.execute(delete(AuditLog).where(AuditLog.id.in_(
+                    select(AuditLog.id).where(AuditLog.timestamp < cutoff).limit(settings.AUDIT_EXPORT_BATCH_SIZE)
+                )))
+            self.rows_deleted += result.rowcount
+            if result.rowcount < settings.AUDIT_EXPORT_BATCH_SIZE:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "rows_deleted": self.rows_deleted,
+            "maintenance_errors": self.maintenance_errors
+        }
+
+# Create service instance
+audit_log_service = AuditLogService()
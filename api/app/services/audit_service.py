@@ -0,0 +1,337 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+from .usage_service import usage_service
+from ..database import engine
+from ..models import AuditLog, EncryptionOperation
+from ..utils.config import settings
+from ..utils.metrics import ALGORITHMS
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLES = {
+    "encryption_operations": EncryptionOperation.__table__,
+    "audit_logs": AuditLog.__table__,
+}
+OVERFLOW_POLICIES = ("block", "drop", "spill")
+# Recorded in place of an algorithm name the API does not support, which may be any client string
+UNKNOWN_ALGORITHM = "unknown"
+
+AuditRecord = Tuple[str, Dict[str, Any]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class AuditService:
+    """Bounded in-memory audit queue flushed to the database by a background task
+
+    Request handlers only enqueue; the writer groups records per table and
+    writes them with one COPY (PostgreSQL) or one multi-row INSERT per flush,
+    whenever AUDIT_BATCH_SIZE records are pending or AUDIT_FLUSH_INTERVAL_SECONDS
+    have passed. The same transaction adds flushed operations to the usage
+    rollups. If a batch fails, its records are retried one savepoint each, so
+    a row the database rejects is dropped alone instead of taking the rest of
+    the batch with it.
+    """
+
+    def __init__(self):
+        if settings.AUDIT_OVERFLOW_POLICY not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {settings.AUDIT_OVERFLOW_POLICY}")
+        self.enabled = settings.AUDIT_ENABLED
+        self.policy = settings.AUDIT_OVERFLOW_POLICY
+        self.batch_size = settings.AUDIT_BATCH_SIZE
+        self.flush_interval = settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.spill_path = settings.AUDIT_SPILL_PATH
+        self._queue: "asyncio.Queue[AuditRecord]" = asyncio.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Writer metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.spilled = 0
+        self.flushes = 0
+        self.write_errors = 0
+        self.rollup_errors = 0
+        self.blocked_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+    def start(self):
+        """Start the writer task, which first replays any spilled records"""
+        if not self.enabled or self._task is not None:
+            return
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Drain the queue, flush it and stop the writer"""
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(
+                self._task, timeout if timeout is not None else settings.AUDIT_SHUTDOWN_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.error("Audit writer did not drain in time; %d records lost", self._queue.qsize())
+        self._task = None
+
+    async def record(self, table: str, row: Dict[str, Any]):
+        """Enqueue one row, applying the overflow policy when the queue is full"""
+        if not self.enabled:
+            return
+        item = (table, row)
+        try:
+            self._queue.put_nowait(item)
+            self.enqueued += 1
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "block":
+            # Back-pressure the request until the writer frees a slot
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._queue.put(item), settings.AUDIT_BLOCK_TIMEOUT_SECONDS)
+                self.enqueued += 1
+            except asyncio.TimeoutError:
+                self.dropped += 1
+            self.blocked_seconds += time.monotonic() - started
+        elif self.policy == "spill" and self.spill_path:
+            self._spill([item])
+        else:
+            self.dropped += 1
+
+    async def record_operation(self, user_id: Any, operation_type: str, algorithm: str,
+                               key_id: Any = None, input_hash: Optional[str] = None,
+                               output_hash: Optional[str] = None, status: str = "completed",
+                               bytes_in: Optional[int] = None, bytes_out: Optional[int] = None):
+        """Queue an EncryptionOperation row"""
+        now = _utcnow()
+        await self.record("encryption_operations", {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "operation_type": operation_type,
+            "algorithm": algorithm if algorithm in ALGORITHMS else UNKNOWN_ALGORITHM,
+            "key_id": key_id,
+            "input_hash": input_hash,
+            "output_hash": output_hash,
+            "status": status,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "created_at": now,
+            "completed_at": now
+        })
+
+    async def record_action(self, user_id: Any, action: str, resource_type: Optional[str] = None,
+                            resource_id: Any = None, details: Optional[dict] = None,
+                            ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+        """Queue an AuditLog row"""
+        await self.record("audit_logs", {
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": str(resource_id) if resource_id is not None else None,
+            "details": details,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "timestamp": _utcnow()
+        })
+
+    async def _run(self):
+        await self._replay_spill()
+        while True:
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
+            elif self._stopping:
+                break
+
+    async def _collect(self) -> List[AuditRecord]:
+        """Wait for a full batch or the flush interval, whichever comes first"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._stopping:
+                # Draining: take whatever is queued without waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                # Wake periodically so a stop request is noticed promptly
+                batch.append(await asyncio.wait_for(self._queue.get(), min(remaining, 0.1)))
+            except asyncio.TimeoutError:
+                continue
+        return batch
+
+    async def _flush(self, batch: List[AuditRecord]):
+        rows_by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for table, row in batch:
+            rows_by_table.setdefault(table, []).append(row)
+
+        started = time.perf_counter()
+        try:
+            async with engine.begin() as connection:
+                for table, rows in rows_by_table.items():
+                    await self._write_rows(connection, AUDIT_TABLES[table], rows)
+                await self._apply_rollups(connection, rows_by_table.get("encryption_operations"))
+        except Exception:
+            self.write_errors += 1
+            logger.exception("Audit flush of %d records failed", len(batch))
+            if len(batch) > 1 and await self._flush_isolated(batch):
+                return
+            if self.spill_path:
+                self._spill(batch)
+            else:
+                self.dropped += len(batch)
+            return
+        self.last_flush_seconds = time.perf_counter() - started
+        self.flushes += 1
+        self.written += len(batch)
+
+    async def _flush_isolated(self, batch: List[AuditRecord]) -> bool:
+        """Write a failed batch one record per savepoint; False if the database itself is failing"""
+        written = []
+        rejected = 0
+        try:
+            async with engine.begin() as connection:
+                for table, row in batch:
+                    try:
+                        async with connection.begin_nested():
+                            await self._write_rows(connection, AUDIT_TABLES[table], [row])
+                    except DBAPIError:
+                        if connection.invalidated:
+                            raise
+                        rejected += 1
+                        logger.warning("Audit %s row rejected by the database", table, exc_info=True)
+                        continue
+                    written.append((table, row))
+                await self._apply_rollups(
+                    connection, [row for table, row in written if table == "encryption_operations"]
+                )
+        except Exception:
+            logger.exception("Audit flush of %d records failed again record by record", len(batch))
+            return False
+        self.flushes += 1
+        self.written += len(written)
+        self.rejected += rejected
+        return True
+
+    async def _write_rows(self, connection, table, rows: List[Dict[str, Any]]):
+        """COPY on PostgreSQL, a single executemany INSERT elsewhere"""
+        if connection.dialect.name == "postgresql" and settings.AUDIT_USE_COPY:
+            columns = [column.name for column in table.columns if column.name in rows[0]]
+            raw_connection = await connection.get_raw_connection()
+            cursor = raw_connection.driver_connection.cursor()
+            async with cursor.copy(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    await copy.write_row([
+                        json.dumps(row[column]) if isinstance(row[column], dict) else row[column]
+                        for column in columns
+                    ])
+            return
+        await connection.execute(insert(table), rows)
+
+    async def _apply_rollups(self, connection, rows: Optional[List[Dict[str, Any]]]):
+        """Update usage rollups in a savepoint, so a rollup failure never loses audit rows"""
+        if not rows:
+            return
+        try:
+            async with connection.begin_nested():
+                await usage_service.apply(connection, rows)
+        except Exception:
+            # The rollups fall behind until the next backfill; the audit rows are still written
+            self.rollup_errors += 1
+            logger.exception("Usage rollup update for %d operations failed", len(rows))
+
+    def _spill(self, batch: List[AuditRecord]):
+        """Append records to the local spill file as JSON lines"""
+        with open(self.spill_path, "a", encoding="utf-8") as spill:
+            for table, row in batch:
+                spill.write(json.dumps({"table": table, "row": row}, default=_json_default) + "\n")
+        self.spilled += len(batch)
+
+    async def _replay_spill(self):
+        """Write back records spilled by a previous run"""
+        if not self.spill_path:
+            return
+        replay_path = f"{self.spill_path}.replay"
+        # A leftover replay file means the last replay was interrupted; finish it first
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spill_path):
+                return
+            os.replace(self.spill_path, replay_path)
+        batch = []
+        with open(replay_path, encoding="utf-8") as spill:
+            for line in spill:
+                try:
+                    record = json.loads(line)
+                    batch.append((record["table"], self._restore_row(record["table"], record["row"])))
+                except (ValueError, KeyError, TypeError):
+                    self.dropped += 1
+                    continue
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch)
+                    batch = []
+        if batch:
+            await self._flush(batch)
+        os.remove(replay_path)
+
+    def _restore_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert JSON-decoded values back to column types"""
+        columns = AUDIT_TABLES[table].columns
+        for name, value in row.items():
+            if value is None:
+                continue
+            python_type = columns[name].type.python_type if name in columns else None
+            if python_type is datetime:
+                row[name] = datetime.fromisoformat(value)
+            elif python_type is uuid.UUID:
+                row[name] = uuid.UUID(value)
+        return row
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and writer counters"""
+        return {
+            "enabled": self.enabled,
+            "policy": self.policy,
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "spilled": self.spilled,
+            "flushes": self.flushes,
+            "write_errors": self.write_errors,
+            "rollup_errors": self.rollup_errors,
+            "blocked_seconds": round(self.blocked_seconds, 6),
+            "last_flush_seconds": round(self.last_flush_seconds, 6)
+        }
+
+# Create service instance
+audit_service = AuditService()
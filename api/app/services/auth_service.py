@@ -1,30 +1,87 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Set
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import hashlib
+import logging
+import threading
+import time
 import uuid
 
+from .cache_service import NEGATIVE, cache_service
+from .executor_service import ExecutorSaturatedError, executor_service
+from .revocation_service import revocation_service
+from ..database import SessionLocal
 from ..models import User
 from ..schemas import UserCreate, UserLogin, Token, TokenData
+from ..utils import passwords
+from ..utils.cache import TTLCache
 from ..utils.config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight snapshot of an authenticated user and their token claims"""
+    id: uuid.UUID
+    username: str
+    is_active: bool
+    role: str
+    claims: Dict[str, Any]
 
 class AuthService:
     def __init__(self):
         self.secret_key = settings.SECRET_KEY
         self.algorithm = settings.ALGORITHM
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        
+        # Authenticated principals keyed by token digest, indexed by user for invalidation
+        self.principal_cache = TTLCache(
+            maxsize=settings.PRINCIPAL_CACHE_SIZE,
+            ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+            on_evict=self._forget_token
+        )
+        self._tokens_by_user: Dict[str, set] = {}
+        self._index_lock = threading.Lock()
+        
+        # User snapshots shared across workers; invalidating one drops that user's principals everywhere
+        self.user_cache = cache_service.tier(
+            "user",
+            TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS),
+            ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+            on_invalidate=self.invalidate_user
+        )
+        
+        # bcrypt cost for new hashes; raised by calibrate() and applied to old hashes on login
+        self.bcrypt_rounds = settings.PASSWORD_BCRYPT_ROUNDS
+        self._background: Set[asyncio.Task] = set()
+    
+    async def calibrate(self):
+        """Pick the bcrypt cost that meets the target verify time on this machine"""
+        if not settings.PASSWORD_CALIBRATE:
+            return
+        # Not subject to the queue timeout; this also spawns the first worker
+        self.bcrypt_rounds = await asyncio.wrap_future(executor_service.password.submit(
+            passwords.calibrate_rounds, settings.PASSWORD_TARGET_VERIFY_SECONDS,
+            settings.PASSWORD_MIN_ROUNDS, settings.PASSWORD_MAX_ROUNDS
+        ))
+        logger.info("bcrypt cost calibrated to %d rounds", self.bcrypt_rounds)
+    
+    async def stop(self):
+        """Let pending last-login and rehash writes finish"""
+        if self._background:
+            await asyncio.wait(self._background, timeout=settings.PASSWORD_QUEUE_TIMEOUT_SECONDS)
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the password pool"""
+        return await executor_service.password.run(passwords.verify_password, plain_password, hashed_password)
     
-    def get_password_hash(self, password: str) -> str:
-        """Generate password hash"""
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        """Generate password hash on the password pool"""
+        return await executor_service.password.run(passwords.hash_password, password, self.bcrypt_rounds)
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
@@ -34,71 +91,141 @@ class AuthService:
         else:
             expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
         
-        to_encode.update({"exp": expire})
+        # jti identifies the token for revocation; a fractional iat orders it against per-user revocations
+        to_encode.setdefault("typ", "access")
+        to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
-    def verify_token(self, token: str) -> Optional[TokenData]:
-        """Verify and decode JWT token"""
+    def _issue_tokens(self, user: User) -> Token:
+        """Access and refresh token pair for a user"""
+        access_token = self.create_access_token(
+            data={"sub": user.username, "uid": str(user.id), "role": user.role}
+        )
+        refresh_token = self.create_access_token(
+            data={"sub": user.username, "uid": str(user.id), "typ": "refresh"},
+            expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        return Token(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_type="bearer",
+            expires_in=self.access_token_expire_minutes * 60,
+            user=user
+        )
+    
+    def decode_token(self, token: str, token_type: str = "access") -> Optional[dict]:
+        """Verify a JWT of the given type and return its claims"""
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            username: str = payload.get("sub")
-            if username is None:
-                return None
-            token_data = TokenData(username=username)
-            return token_data
         except JWTError:
             return None
+        if payload.get("sub") is None:
+            return None
+        # Tokens issued before refresh tokens existed carry no typ and are access tokens
+        if payload.get("typ", "access") != token_type:
+            return None
+        return payload
     
-    def get_user(self, db: Session, username: str) -> Optional[User]:
+    def verify_token(self, token: str) -> Optional[TokenData]:
+        """Verify and decode JWT token"""
+        payload = self.decode_token(token)
+        if payload is None:
+            return None
+        return TokenData(username=payload["sub"])
+    
+    async def get_user(self, db: AsyncSession, username: str) -> Optional[User]:
         """Get user by username"""
-        return db.query(User).filter(User.username == username).first()
+        return await db.scalar(select(User).where(User.username == username))
     
-    def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email"""
-        return db.query(User).filter(User.email == email).first()
+        return await db.scalar(select(User).where(User.email == email))
     
-    def authenticate_user(self, db: Session, user_credentials: UserLogin) -> Token:
+    async def authenticate_user(self, db: AsyncSession, user_credentials: UserLogin) -> Token:
         """Authenticate user and return JWT token"""
-        user = self.get_user(db, user_credentials.username)
+        user = await self.get_user(db, user_credentials.username)
         if not user:
             raise ValueError("Invalid username or password")
         
-        if not self.verify_password(user_credentials.password, user.password_hash):
+        if not await self.verify_password(user_credentials.password, user.password_hash):
             raise ValueError("Invalid username or password")
         
         if not user.is_active:
             raise ValueError("User account is disabled")
         
-        # Update last login
+        # Record the login, and upgrade an outdated hash, after the response
         user.last_login = datetime.utcnow()
-        db.commit()
+        rehash = passwords.needs_update(user.password_hash, self.bcrypt_rounds)
+        self._in_background(self._after_login(
+            user.id, user.last_login, user.password_hash, user_credentials.password if rehash else None
+        ))
         
-        # Create access token
-        access_token_expires = timedelta(minutes=self.access_token_expire_minutes)
-        access_token = self.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
-        )
+        return self._issue_tokens(user)
+    
+    async def refresh_tokens(self, db: AsyncSession, refresh_token: str) -> Token:
+        """Exchange a refresh token for a new token pair, revoking the old refresh token"""
+        claims = self.decode_token(refresh_token, token_type="refresh")
+        if claims is None or "uid" not in claims:
+            raise ValueError("Invalid refresh token")
+        if await revocation_service.is_revoked(db, claims):
+            raise ValueError("Refresh token has been revoked")
         
-        return Token(
-            access_token=access_token,
-            token_type="bearer",
-            expires_in=self.access_token_expire_minutes * 60,
-            user=user
-        )
+        user = await db.get(User, uuid.UUID(claims["uid"]))
+        if user is None or not user.is_active:
+            raise ValueError("User account is disabled")
+        
+        await revocation_service.revoke_token(db, claims)
+        return self._issue_tokens(user)
+    
+    async def logout(self, db: AsyncSession, principal: Principal, refresh_token: Optional[str] = None):
+        """Revoke the caller's access token and, if given, their refresh token"""
+        await revocation_service.revoke_token(db, principal.claims)
+        if refresh_token is not None:
+            claims = self.decode_token(refresh_token, token_type="refresh")
+            if claims is not None and claims.get("uid") == principal.claims.get("uid"):
+                await revocation_service.revoke_token(db, claims)
     
-    def create_user(self, db: Session, user_data: UserCreate) -> User:
+    def _in_background(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _after_login(self, user_id: uuid.UUID, last_login: datetime, old_hash: str,
+                           password: Optional[str]):
+        """Write last_login and, given the password, replace a hash below the current cost"""
+        new_hash = None
+        if password is not None:
+            try:
+                new_hash = await self.get_password_hash(password)
+            except ExecutorSaturatedError:
+                pass  # try again on the next login
+        try:
+            async with SessionLocal() as db:
+                await db.execute(update(User).where(User.id == user_id).values(last_login=last_login))
+                if new_hash is not None:
+                    # Skip if the password changed meanwhile
+                    await db.execute(
+                        update(User)
+                        .where(User.id == user_id, User.password_hash == old_hash)
+                        .values(password_hash=new_hash)
+                    )
+                await db.commit()
+        except Exception:
+            logger.warning("Could not record login for user %s", user_id, exc_info=True)
+    
+    async def create_user(self, db: AsyncSession, user_data: UserCreate) -> User:
         """Create new user"""
         # Check if username already exists
-        if self.get_user(db, user_data.username):
+        if await self.get_user(db, user_data.username):
             raise ValueError("Username already registered")
         
         # Check if email already exists
-        if self.get_user_by_email(db, user_data.email):
+        if await self.get_user_by_email(db, user_data.email):
             raise ValueError("Email already registered")
         
         # Create new user
-        hashed_password = self.get_password_hash(user_data.password)
+        hashed_password = await self.get_password_hash(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -106,24 +233,146 @@ class AuthService:
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
+        # Drop any cached "no such user" entry for this username
+        await self.user_cache.invalidate(db_user.username)
         return db_user
     
-    def get_current_user(self, db: Session, token: str) -> User:
-        """Get current user from JWT token"""
-        token_data = self.verify_token(token)
-        if token_data is None:
+    async def get_current_user(self, db: AsyncSession, token: str) -> Principal:
+        """Get current user from JWT token, hitting the database only on a cache miss"""
+        principal = self.get_cached_user(token)
+        if principal is None:
+            principal = await self.load_principal(db, token)
+        return principal
+    
+    def get_cached_user(self, token: str) -> Optional[Principal]:
+        """Return the cached principal for a token without touching the database
+        
+        Returns None when the principal is not cached or its revocation
+        status needs an exact check.
+        """
+        principal = self.principal_cache.get(self._token_digest(token))
+        if principal is None:
+            return None
+        if not principal.is_active:
+            raise ValueError("User account is disabled")
+        revoked = revocation_service.check(principal.claims)
+        if revoked:
+            raise ValueError("Token has been revoked")
+        return principal if revoked is False else None
+    
+    async def load_principal(self, db: AsyncSession, token: str) -> Principal:
+        """Decode a token, check revocation and cache the resulting principal
+        
+        Tokens carry the user's ID and role, so this only reaches the
+        database to confirm a revocation filter hit. Older tokens without
+        them fall back to a user lookup.
+        """
+        claims = self.decode_token(token)
+        if claims is None:
             raise ValueError("Invalid token")
+        if await revocation_service.is_revoked(db, claims):
+            raise ValueError("Token has been revoked")
+        
+        if "uid" in claims:
+            # Deactivation revokes the user's tokens, so an unrevoked token belongs to an active user
+            principal = Principal(
+                id=uuid.UUID(claims["uid"]),
+                username=claims["sub"],
+                is_active=True,
+                role=claims.get("role", "user"),
+                claims=claims
+            )
+        else:
+            snapshot = await self.get_user_snapshot(db, claims["sub"])
+            if snapshot is None:
+                raise ValueError("User not found")
+            principal = Principal(
+                id=uuid.UUID(snapshot["id"]),
+                username=snapshot["username"],
+                is_active=snapshot["is_active"],
+                role=snapshot["role"],
+                claims=claims
+            )
+        self._remember_token(self._token_digest(token), principal)
+        
+        if not principal.is_active:
+            raise ValueError("User account is disabled")
         
-        user = self.get_user(db, username=token_data.username)
+        return principal
+    
+    async def get_user_snapshot(self, db: AsyncSession, username: str) -> Optional[dict]:
+        """Identity fields of a user from the shared cache, falling back to the database"""
+        snapshot = await self.user_cache.get(username)
+        if snapshot is NEGATIVE:
+            return None
+        if snapshot is None:
+            user = await self.get_user(db, username)
+            if user is None:
+                await self.user_cache.set_negative(username)
+                return None
+            snapshot = {
+                "id": str(user.id),
+                "username": user.username,
+                "is_active": bool(user.is_active),
+                "role": user.role
+            }
+            await self.user_cache.set(username, snapshot)
+        return snapshot
+    
+    def _token_digest(self, token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def _remember_token(self, digest: bytes, principal: Principal):
+        """Cache a principal for no longer than its token stays valid"""
+        ttl = principal.claims["exp"] - time.time() if "exp" in principal.claims else None
+        if ttl is not None and ttl <= 0:
+            return
+        with self._index_lock:
+            self._tokens_by_user.setdefault(principal.username, set()).add(digest)
+        self.principal_cache.set(digest, principal, ttl=ttl)
+    
+    def _forget_token(self, digest: bytes, principal: Principal):
+        """Drop an evicted token from the per-user index"""
+        if digest in self.principal_cache:
+            # Replaced by a fresh principal for the same token, which is still indexed
+            return
+        with self._index_lock:
+            digests = self._tokens_by_user.get(principal.username)
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._tokens_by_user[principal.username]
+    
+    def invalidate_user(self, username: str):
+        """Drop every cached principal for a user in this worker"""
+        with self._index_lock:
+            digests = list(self._tokens_by_user.get(username, ()))
+        for digest in digests:
+            self.principal_cache.pop(digest)
+    
+    async def update_user(self, db: AsyncSession, user_id: uuid.UUID, is_active: Optional[bool] = None,
+                          role: Optional[str] = None) -> User:
+        """Change a user's status or role and invalidate their cached principals"""
+        user = await db.get(User, user_id)
         if user is None:
             raise ValueError("User not found")
         
-        if not user.is_active:
-            raise ValueError("User account is disabled")
+        # Tokens carry the role and imply an active account, so either change invalidates them
+        revoke = (is_active is False and user.is_active) or (role is not None and role != user.role)
+        if is_active is not None:
+            user.is_active = is_active
+        if role is not None:
+            user.role = role
+        await db.commit()
+        await db.refresh(user)
+        if revoke:
+            await revocation_service.revoke_user(db, user.id)
         
+        # Clears the snapshot in L2 and every worker's principals via pub/sub
+        await self.user_cache.invalidate(user.username)
         return user
 
 # Create service instance
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from ..utils.cache import TTLCache
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stored in place of a value to remember that a lookup found nothing
+NEGATIVE = object()
+_NEGATIVE_MARKER = {"__negative__": True}
+# How long the invalidation listener waits for a message before polling again
+_LISTEN_POLL_SECONDS = 1.0
+
+
+class TwoLevelCache:
+    """Per-process L1 in front of a shared Redis L2, with negative caching
+
+    L1 holds ready-to-use objects; L2 holds a JSON form produced by ``dumps``
+    and turned back into an L1 object by ``loads``. Invalidations delete the
+    L2 entry and are broadcast so every worker drops its L1 copy.
+    """
+
+    def __init__(self, service: "CacheService", namespace: str, l1: TTLCache, ttl: float,
+                 negative_ttl: float, loads: Callable[[Any], Any] = lambda value: value,
+                 on_invalidate: Optional[Callable[[str], None]] = None):
+        self.service = service
+        self.namespace = namespace
+        self.l1 = l1
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.loads = loads
+        self.on_invalidate = on_invalidate
+
+        # L2 metrics; L1 counters live on the TTLCache
+        self.l2_hits = 0
+        self.l2_misses = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value, NEGATIVE for a cached miss, or None"""
+        return (await self.get_many([key]))[key]
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Look keys up in L1, then fetch all L1 misses from L2 in one pipeline"""
+        results = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.l1.get(key)
+            results[key] = value
+            if value is None:
+                missing.append(key)
+        if not missing:
+            return results
+
+        raw_values = await self.service.l2_get_many([self._redis_key(key) for key in missing])
+        for key, raw in zip(missing, raw_values):
+            if raw is None:
+                self.l2_misses += 1
+                continue
+            self.l2_hits += 1
+            document = json.loads(raw)
+            if document == _NEGATIVE_MARKER:
+                self.l1.set(key, NEGATIVE, ttl=self.negative_ttl)
+                results[key] = NEGATIVE
+                continue
+            try:
+                value = self.loads(document)
+            except (ValueError, KeyError, TypeError):
+                # Unreadable entry, e.g. written by an older release; treat as a miss
+                continue
+            self.l1.set(key, value)
+            results[key] = value
+        return results
+
+    async def set(self, key: str, value: Any, shared: Any = None, ttl: Optional[float] = None):
+        """Cache a value in L1 and its JSON form (``shared``, default ``value``) in L2"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self.l1.set(key, value, ttl=ttl)
+        await self.service.l2_set(self._redis_key(key), shared if shared is not None else value, ttl)
+
+    async def set_negative(self, key: str):
+        """Remember that a key does not exist"""
+        self.l1.set(key, NEGATIVE, ttl=self.negative_ttl)
+        await self.service.l2_set(self._redis_key(key), _NEGATIVE_MARKER, self.negative_ttl)
+
+    async def invalidate(self, key: str):
+        """Drop a key from L2 and from L1 in every worker"""
+        self.invalidate_local(key)
+        await self.service.l2_delete(self._redis_key(key))
+        await self.service.publish_invalidation(self.namespace, key)
+
+    def invalidate_local(self, key: str):
+        self.l1.pop(key)
+        if self.on_invalidate is not None:
+            self.on_invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        l2_lookups = self.l2_hits + self.l2_misses
+        return {
+            "l1": self.l1.stats(),
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_hit_ratio": round(self.l2_hits / l2_lookups, 4) if l2_lookups else 0.0
+        }
+
+
+class CacheService:
+    """Shared Redis cache tier and the pub/sub channel that keeps L1 caches coherent"""
+
+    def __init__(self):
+        self.enabled = settings.CACHE_L2_ENABLED and bool(settings.REDIS_URL)
+        self.channel = f"{settings.CACHE_KEY_PREFIX}:invalidate"
+        self.tiers: Dict[str, TwoLevelCache] = {}
+        self._redis: Optional[aioredis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+        # Skip L2 for a while after an error so a Redis outage costs one timeout, not one per request
+        self._retry_at = 0.0
+
+        # L2 metrics
+        self.errors = 0
+        self.published = 0
+        self.received = 0
+
+    def tier(self, namespace: str, l1: TTLCache, ttl: float, negative_ttl: Optional[float] = None,
+             loads: Callable[[Any], Any] = lambda value: value,
+             on_invalidate: Optional[Callable[[str], None]] = None) -> TwoLevelCache:
+        """Register a named cache tier"""
+        cache = TwoLevelCache(
+            self, namespace, l1, ttl,
+            settings.CACHE_NEGATIVE_TTL_SECONDS if negative_ttl is None else negative_ttl,
+            loads, on_invalidate
+        )
+        self.tiers[namespace] = cache
+        return cache
+
+    @property
+    def redis(self) -> Optional[aioredis.Redis]:
+        if not self.enabled or time.monotonic() < self._retry_at:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.CACHE_L2_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.CACHE_L2_TIMEOUT_SECONDS
+            )
+        return self._redis
+
+    def _failed(self, operation: str):
+        self.errors += 1
+        self._retry_at = time.monotonic() + settings.CACHE_L2_RETRY_SECONDS
+        logger.warning("Redis %s failed; bypassing L2 for %ss", operation, settings.CACHE_L2_RETRY_SECONDS,
+                       exc_info=True)
+
+    async def l2_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        redis = self.redis
+        if redis is None:
+            return [None] * len(keys)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                return await pipe.execute()
+        except (RedisError, OSError):
+            self._failed("get")
+            return [None] * len(keys)
+
+    async def l2_set(self, key: str, value: Any, ttl: float):
+        redis = self.redis
+        if redis is None:
+            return
+        try:
+            await redis.set(key, json.dumps(value, default=str), px=max(int(ttl * 1000), 1))
+        except (RedisError, OSError):
+            self._failed("set")
+
+    async def l2_delete(self, key: str):
+        redis = self.redis
+        if redis is None:
+            return
+        try:
+            await redis.delete(key)
+        except (RedisError, OSError):
+            self._failed("delete")
+
+    async def publish_invalidation(self, namespace: str, key: str):
+        redis = self.redis
+        if redis is None:
+            return
+        try:
+            await redis.publish(self.channel, json.dumps({"namespace": namespace, "key": key}))
+            self.published += 1
+        except (RedisError, OSError):
+            self._failed("publish")
+
+    def start(self):
+        """Subscribe to invalidations from other workers"""
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def warm(self):
+        """Open the Redis connection before the first request needs it"""
+        redis = self.redis
+        if redis is None:
+            return
+        try:
+            await redis.ping()
+        except (RedisError, OSError):
+            self._failed("ping")
+
+    async def stop(self):
+        """Stop listening and close the Redis connection pool"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _listen(self):
+        while True:
+            redis = self.redis
+            if redis is None:
+                await asyncio.sleep(settings.CACHE_L2_RETRY_SECONDS)
+                continue
+            try:
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Anything published while we were disconnected was missed
+                    for cache in self.tiers.values():
+                        cache.l1.clear()
+                    while True:
+                        # A read timeout here just means nobody published; listen() would
+                        # surface the client's short socket_timeout as a failure instead
+                        message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                           timeout=_LISTEN_POLL_SECONDS)
+                        if message is not None:
+                            self._apply_invalidation(message["data"])
+            except (RedisError, OSError):
+                self._failed("subscribe")
+
+    def _apply_invalidation(self, data: bytes):
+        try:
+            message = json.loads(data)
+            cache = self.tiers[message["namespace"]]
+        except (ValueError, KeyError, TypeError):
+            return
+        self.received += 1
+        cache.invalidate_local(message["key"])
+
+    def stats(self) -> Dict[str, Any]:
+        """L2 connection state and per-tier hit rates"""
+        return {
+            "l2_enabled": self.enabled,
+            "l2_available": self.enabled and time.monotonic() >= self._retry_at,
+            "errors": self.errors,
+            "invalidations_published": self.published,
+            "invalidations_received": self.received,
+            "tiers": {namespace: cache.stats() for namespace, cache in self.tiers.items()}
+        }
+
+# Create service instance
+cache_service = CacheService()
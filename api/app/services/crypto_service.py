@@ -1,191 +1,673 @@
+import asyncio
 import base64
-import hashlib
+import binascii
+import functools
+import hmac
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional, Tuple, Union
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import serialization as crypto_serialization
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
 import os
 
+from .datakey_service import datakey_service
+from .executor_service import ExecutorSaturatedError, executor_service
+from .key_service import DETERMINISTIC_KEY_CLASSES, ManagedKey
+from .keypool_service import rsa_key_pool
+from ..utils.config import settings
+from ..utils.digest import AuditDigest
+from ..utils.envelope import Buffer, pack_envelope, parse_envelope
+from ..utils.metrics import DIGEST_DURATION, MIXED, crypto_metrics, error_metrics
+
+# (payload, algorithm, key_id, resolved key or the error resolving it)
+BatchItem = Tuple[str, str, Optional[str], Union[ManagedKey, Exception, None]]
+
+# (message, base64 signature, raw Ed25519 public key or the error resolving it)
+VerifyItem = Tuple[str, str, Union[bytes, Exception]]
+
+# One-shot AEAD constructors for algorithms that can be opened with a raw key
+AEAD_CIPHERS = {
+    "aes-256-gcm": AESGCM,
+    "chacha20-poly1305": ChaCha20Poly1305
+}
+
+class _ScratchBuffer(threading.local):
+    """Per-thread output buffer reused by small one-shot AEAD calls"""
+    
+    def __init__(self):
+        self.view = memoryview(bytearray(settings.CRYPTO_SCRATCH_BUFFER_BYTES))
+    
+    def take(self, size: int) -> memoryview:
+        return self.view[:size]
+
+_scratch = _ScratchBuffer()
+
+def _fits_scratch(algorithm: str, size: int) -> bool:
+    return algorithm in AEAD_CIPHERS and size <= settings.CRYPTO_SCRATCH_BUFFER_BYTES
+
+@functools.lru_cache(maxsize=settings.VERIFY_KEY_CACHE_SIZE)
+def _verify_key(public_key: bytes) -> VerifyKey:
+    """Parsed Ed25519 public key, cached per worker"""
+    return VerifyKey(public_key)
+
 class CryptoService:
+    # Algorithms dominated by CPU-bound work run in worker processes; rsa-4096
+    # draws pre-generated keys from rsa_key_pool so it stays on the thread pool
+    process_algorithms = set()
+    
     def __init__(self):
         self.supported_algorithms = {
             "aes-256-gcm": self._encrypt_aes_256_gcm,
             "chacha20-poly1305": self._encrypt_chacha20_poly1305,
-            "rsa-4096": self._encrypt_rsa_4096,
-            "ed25519": self._encrypt_ed25519
+            "rsa-4096": self._encrypt_rsa_4096
         }
         
         self.decrypt_algorithms = {
             "aes-256-gcm": self._decrypt_aes_256_gcm,
             "chacha20-poly1305": self._decrypt_chacha20_poly1305,
-            "rsa-4096": self._decrypt_rsa_4096,
-            "ed25519": self._decrypt_ed25519
+            "rsa-4096": self._decrypt_rsa_4096
         }
+        
+        # Signature algorithms are served by sign/verify, not encrypt/decrypt
+        self.signature_algorithms = ("ed25519",)
     
-    def encrypt_data(self, data: str, algorithm: str, key_id: Optional[str], user_id: str) -> dict:
-        """Encrypt data using specified algorithm"""
+    def _pool_for(self, algorithm: str, size: int):
+        """Pick the executor pool for an operation"""
+        if algorithm in self.process_algorithms or size >= settings.CRYPTO_PROCESS_THRESHOLD_BYTES:
+            return executor_service.cpu
+        return executor_service.crypto
+    
+    async def warm(self):
+        """Start the pools' workers, importing this module and initialising OpenSSL in each child process"""
+        await asyncio.gather(executor_service.crypto.warm(), executor_service.cpu.warm(_warm_job))
+    
+    async def encrypt_data_async(self, data: str, algorithm: str, key_id: Optional[str], user_id: str,
+                                 key: Optional[ManagedKey] = None, data_key: bool = False) -> dict:
+        """Encrypt data on the executor pools without blocking the event loop"""
         if algorithm not in self.supported_algorithms:
             raise ValueError(f"Unsupported algorithm: {algorithm}")
+        pool = self._pool_for(algorithm, len(data))
+        started = time.perf_counter()
+        try:
+            result, digest_seconds = await pool.run(_encrypt_job, data, algorithm, key_id, user_id, key, data_key)
+        except Exception as e:
+            error_metrics.observe("encrypt", e)
+            raise
+        DIGEST_DURATION.observe(digest_seconds)
+        crypto_metrics.observe(
+            "encrypt", algorithm, time.perf_counter() - started, len(data), len(result["encrypted_data"])
+        )
+        return result
+    
+    async def decrypt_data_async(self, encrypted_data: str, algorithm: str, key_id: Optional[str], user_id: str,
+                                 key: Optional[ManagedKey] = None, data_key: bool = False) -> dict:
+        """Decrypt data on the executor pools without blocking the event loop"""
+        if algorithm not in self.decrypt_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        pool = self._pool_for(algorithm, len(encrypted_data))
+        started = time.perf_counter()
+        try:
+            result, digest_seconds = await pool.run(
+                _decrypt_job, encrypted_data, algorithm, key_id, user_id, key, data_key
+            )
+        except Exception as e:
+            error_metrics.observe("decrypt", e)
+            raise
+        DIGEST_DURATION.observe(digest_seconds)
+        crypto_metrics.observe(
+            "decrypt", algorithm, time.perf_counter() - started, len(encrypted_data), len(result["decrypted_data"])
+        )
+        return result
+    
+    async def encrypt_envelope_async(self, data: bytes, algorithm: str, key_id: Optional[str], user_id: str,
+                                     key: Optional[ManagedKey] = None,
+                                     data_key: bool = False) -> Tuple[bytes, Optional[bytes]]:
+        """Encrypt into a binary envelope on the executor pools"""
+        if algorithm not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        pool = self._pool_for(algorithm, len(data))
+        started = time.perf_counter()
+        try:
+            envelope, generated_key = await pool.run(
+                _encrypt_envelope_job, data, algorithm, key_id, user_id, key, data_key
+            )
+        except Exception as e:
+            error_metrics.observe("encrypt", e)
+            raise
+        crypto_metrics.observe("encrypt", algorithm, time.perf_counter() - started, len(data), len(envelope))
+        return envelope, generated_key
+    
+    async def decrypt_envelope_async(self, data: bytes, key: Union[bytes, ManagedKey, None],
+                                     user_id: str) -> Tuple[bytes, str, Optional[str]]:
+        """Decrypt a binary envelope on the executor pools"""
+        pool = self._pool_for("", len(data))
+        started = time.perf_counter()
+        try:
+            plaintext, algorithm, key_id = await pool.run(_decrypt_envelope_job, data, key, user_id)
+        except Exception as e:
+            error_metrics.observe("decrypt", e)
+            raise
+        crypto_metrics.observe("decrypt", algorithm, time.perf_counter() - started, len(data), len(plaintext))
+        return plaintext, algorithm, key_id
+    
+    async def encrypt_batch_async(self, items: List[BatchItem], user_id: str) -> List[dict]:
+        """Encrypt (data, algorithm, key_id, key) items in parallel, preserving order"""
+        return await self._run_batch(_encrypt_batch_job, items, user_id, "encrypt_batch", "encrypted_data")
+    
+    async def decrypt_batch_async(self, items: List[BatchItem], user_id: str) -> List[dict]:
+        """Decrypt (encrypted_data, algorithm, key_id, key) items in parallel, preserving order"""
+        return await self._run_batch(_decrypt_batch_job, items, user_id, "decrypt_batch", "decrypted_data")
+    
+    async def sign_async(self, data: str, key: Optional[ManagedKey], key_id: Optional[str]) -> dict:
+        """Sign data with a managed Ed25519 key on the crypto pool"""
+        started = time.perf_counter()
+        try:
+            result = await executor_service.crypto.run(self.sign, data, key, key_id)
+        except Exception as e:
+            error_metrics.observe("sign", e)
+            raise
+        crypto_metrics.observe("sign", "ed25519", time.perf_counter() - started, len(data), 64)
+        return result
+    
+    async def verify_async(self, message: str, signature: str, public_key: bytes) -> bool:
+        """Verify one Ed25519 signature on the crypto pool"""
+        started = time.perf_counter()
+        try:
+            valid = await executor_service.crypto.run(self.verify, message, signature, public_key)
+        except Exception as e:
+            error_metrics.observe("verify", e)
+            raise
+        crypto_metrics.observe("verify", "ed25519", time.perf_counter() - started, len(message), 0)
+        return valid
+    
+    async def verify_batch_async(self, items: List[VerifyItem]) -> List[dict]:
+        """Verify (message, signature, public key) items in parallel, preserving order
         
-        # Convert string to bytes
-        data_bytes = data.encode('utf-8')
+        Chunks go to the crypto thread pool: libsodium runs without the GIL,
+        so threads verify on every core without pickling the batch into
+        worker processes.
+        """
+        chunk_size = max(1, settings.VERIFY_CHUNK_SIZE)
+        started = time.perf_counter()
+        futures = self._submit_all(
+            (executor_service.crypto, _verify_batch_job, items[start:start + chunk_size])
+            for start in range(0, len(items), chunk_size)
+        )
+        chunks = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        results = [result for chunk in chunks for result in chunk]
+        crypto_metrics.observe(
+            "verify_batch", "ed25519", time.perf_counter() - started, sum(len(item[0]) for item in items), 0
+        )
+        return results
+    
+    async def encrypt_deterministic_async(self, data: str, key: Optional[ManagedKey], field: str) -> dict:
+        """Deterministically encrypt a field value on the crypto pool"""
+        started = time.perf_counter()
+        try:
+            result = await executor_service.crypto.run(self.encrypt_deterministic, data, key, field)
+        except Exception as e:
+            error_metrics.observe("encrypt", e)
+            raise
+        crypto_metrics.observe(
+            "encrypt", key.algorithm, time.perf_counter() - started, len(data), len(result["encrypted_data"])
+        )
+        return result
+    
+    async def decrypt_deterministic_async(self, encrypted_data: str, key: Optional[ManagedKey], field: str) -> dict:
+        """Decrypt a deterministic ciphertext on the crypto pool"""
+        started = time.perf_counter()
+        try:
+            result = await executor_service.crypto.run(self.decrypt_deterministic, encrypted_data, key, field)
+        except Exception as e:
+            error_metrics.observe("decrypt", e)
+            raise
+        crypto_metrics.observe(
+            "decrypt", key.algorithm, time.perf_counter() - started, len(encrypted_data),
+            len(result["decrypted_data"])
+        )
+        return result
+    
+    async def blind_index_async(self, value: str, key: Optional[ManagedKey], field: str) -> str:
+        """Blind index of one value on the crypto pool"""
+        started = time.perf_counter()
+        try:
+            index = await executor_service.crypto.run(self.blind_index, value, key, field)
+        except Exception as e:
+            error_metrics.observe("blind_index", e)
+            raise
+        crypto_metrics.observe("blind_index", "hmac-sha256", time.perf_counter() - started, len(value), len(index))
+        return index
+    
+    async def blind_index_batch_async(self, values: List[str], key: Optional[ManagedKey], field: str) -> List[str]:
+        """Blind indexes of many values for one field, preserving order"""
+        chunk_size = max(1, settings.BLIND_INDEX_CHUNK_SIZE)
+        started = time.perf_counter()
+        futures = self._submit_all(
+            (executor_service.crypto, self.blind_indexes, values[start:start + chunk_size], key, field)
+            for start in range(0, len(values), chunk_size)
+        )
+        chunks = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        indexes = [index for chunk in chunks for index in chunk]
+        crypto_metrics.observe(
+            "blind_index_batch", "hmac-sha256", time.perf_counter() - started,
+            sum(len(value) for value in values), sum(len(index) for index in indexes)
+        )
+        return indexes
+    
+    def _submit_all(self, jobs) -> list:
+        """Submit (pool, func, *args) jobs, cancelling every queued job if a pool is saturated"""
+        futures = []
+        try:
+            for pool, func, *args in jobs:
+                futures.append(pool.submit(func, *args))
+        except ExecutorSaturatedError:
+            # Reject the whole batch rather than returning a partial result
+            for future in futures:
+                future.cancel()
+            raise
+        return futures
+    
+    async def _run_batch(self, job, items: List[BatchItem], user_id: str,
+                         operation: str, output_field: str) -> List[dict]:
+        """Fan batch items out across the executor pools in chunks"""
+        chunk_size = max(1, settings.BATCH_CHUNK_SIZE)
+        started = time.perf_counter()
+        jobs = []
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            algorithm = next(
+                (item[1] for item in chunk if item[1] in self.process_algorithms), chunk[0][1]
+            )
+            size = sum(len(item[0]) for item in chunk)
+            jobs.append((self._pool_for(algorithm, size), job, chunk, user_id))
+        futures = self._submit_all(jobs)
         
-        # Generate hash for audit
-        input_hash = hashlib.sha256(data_bytes).hexdigest()
+        chunks = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        results = [result for chunk, _ in chunks for result in chunk]
+        DIGEST_DURATION.observe(sum(digest_seconds for _, digest_seconds in chunks))
         
-        # Encrypt data
-        encrypted_result = self.supported_algorithms[algorithm](data_bytes)
+        algorithms = {item[1] for item in items}
+        crypto_metrics.observe(
+            operation, algorithms.pop() if len(algorithms) == 1 else MIXED, time.perf_counter() - started,
+            sum(len(item[0]) for item in items),
+            sum(len(result["result"][output_field]) for result in results if result["status"] == "success")
+        )
+        return results
+    
+    def decode_key(self, encoded_key: str) -> bytes:
+        """Decode a base64 256-bit key supplied by a client"""
+        try:
+            key = base64.b64decode(encoded_key, validate=True)
+        except binascii.Error:
+            raise ValueError("Encryption key is not valid base64")
+        if len(key) != 32:
+            raise ValueError("Encryption key must be 32 bytes")
+        return key
+    
+    def _check_key(self, algorithm: str, key: Optional[ManagedKey]):
+        """Ensure a managed key matches the requested algorithm"""
+        if key is not None and key.algorithm != algorithm:
+            raise ValueError(f"Key {key.id} is a {key.algorithm} key, not {algorithm}")
+    
+    def encrypt_envelope(self, data: Buffer, algorithm: str, key_id: Optional[str], user_id: str,
+                         key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[bytes, Optional[bytes]]:
+        """Encrypt data into a binary envelope, returning it with any ephemeral key
+        
+        With ``data_key``, ``key`` is a master key: the data is sealed under a
+        cached data key, which the envelope carries wrapped by the master key.
+        """
+        if algorithm not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        if data_key:
+            if key is None:
+                raise ValueError("key_id is required for data-key encryption")
+            cipher, wrapped_key = datakey_service.encryption_key(key, algorithm, len(data))
+            nonce = os.urandom(12)
+            return pack_envelope(
+                algorithm, str(key.id), nonce, cipher.encrypt(nonce, data, None), 16, wrapped_key
+            ), None
+        self._check_key(algorithm, key)
+        
+        encrypted_result = self.supported_algorithms[algorithm](data, key)
+        envelope = pack_envelope(
+            algorithm,
+            key_id,
+            encrypted_result.get('nonce', b""),
+            encrypted_result['encrypted_data'],
+            encrypted_result.get('tag_size', 0)
+        )
+        return envelope, encrypted_result.get('key')
+    
+    def decrypt_envelope(self, data: Buffer, key: Union[bytes, ManagedKey, None],
+                         user_id: str) -> Tuple[bytes, str, Optional[str]]:
+        """Decrypt a binary envelope with a managed or raw key, returning plaintext, algorithm and key ID"""
+        envelope = parse_envelope(data)
+        if key is None:
+            raise ValueError("Decryption key is required")
+        
+        if envelope.wrapped_key is not None:
+            if not isinstance(key, ManagedKey):
+                raise ValueError("Data-key envelopes are decrypted with the managed key that wrapped them")
+            cipher = datakey_service.decryption_key(key, envelope.algorithm, envelope.wrapped_key)
+        elif isinstance(key, ManagedKey):
+            self._check_key(envelope.algorithm, key)
+            if envelope.algorithm == "rsa-4096":
+                return self._rsa_decrypt(envelope.sealed, key), envelope.algorithm, envelope.key_id
+            cipher = key.cipher
+        elif envelope.algorithm in AEAD_CIPHERS:
+            cipher = AEAD_CIPHERS[envelope.algorithm](key)
+        else:
+            raise ValueError(f"Binary decryption is not supported for {envelope.algorithm}")
+        
+        try:
+            plaintext = cipher.decrypt(envelope.nonce, envelope.sealed, None)
+        except InvalidTag:
+            raise ValueError("Decryption failed: authentication tag mismatch")
+        return plaintext, envelope.algorithm, envelope.key_id
+    
+    def envelope_key_id(self, data: Buffer) -> Optional[str]:
+        """Read the key ID from an envelope header without decrypting"""
+        return parse_envelope(data).key_id
+    
+    def encrypt_data(self, data: Union[str, Buffer], algorithm: str, key_id: Optional[str], user_id: str,
+                     key: Optional[ManagedKey] = None, data_key: bool = False) -> dict:
+        """Encrypt data using specified algorithm"""
+        return self._encrypt(data, algorithm, key_id, user_id, key, data_key)[0]
+    
+    def decrypt_data(self, encrypted_data: Union[str, Buffer], algorithm: str, key_id: Optional[str], user_id: str,
+                     key: Optional[ManagedKey] = None, data_key: bool = False) -> dict:
+        """Decrypt data using specified algorithm"""
+        return self._decrypt(encrypted_data, algorithm, key_id, user_id, key, data_key)[0]
+    
+    def rewrap(self, encrypted_data: Union[str, Buffer], old_key: ManagedKey, new_key: ManagedKey) -> Union[str, bytes]:
+        """Re-encrypt a managed-key ciphertext under another key
+        
+        Base64 text, as /api/v1/encrypt returns it, comes back as base64 text;
+        raw bytes come back as raw bytes.
+        """
+        if old_key.algorithm not in self.decrypt_algorithms or new_key.algorithm not in self.supported_algorithms:
+            raise ValueError("Only encryption keys can be rotated")
+        raw = base64.b64decode(encrypted_data, validate=True) if isinstance(encrypted_data, str) else encrypted_data
+        plaintext = self.decrypt_algorithms[old_key.algorithm](raw, old_key)
+        encrypted = self.supported_algorithms[new_key.algorithm](plaintext, new_key)
+        rewrapped = encrypted.get('nonce', b"") + encrypted['encrypted_data']
+        return base64.b64encode(rewrapped).decode('ascii') if isinstance(encrypted_data, str) else rewrapped
+    
+    def _digest_in_pass(self, algorithm: str, size: int, digest: AuditDigest) -> bool:
+        """Whether to hash inside the chunked cipher pass rather than in separate passes"""
+        return algorithm == "aes-256-gcm" and digest.enabled and size > settings.AUDIT_DIGEST_CHUNK_SIZE
+    
+    def _encrypt(self, data: Union[str, Buffer], algorithm: str, key_id: Optional[str], user_id: str,
+                 key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[dict, float]:
+        """encrypt_data, also returning the seconds spent on audit digests"""
+        if algorithm not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        if not data_key:
+            self._check_key(algorithm, key)
+        
+        # Convert string to bytes
+        data_bytes = data.encode('utf-8') if isinstance(data, str) else data
+        input_digest = AuditDigest()
+        output_digest = AuditDigest()
         
-        # Generate output hash
-        output_bytes = base64.b64encode(encrypted_result['encrypted_data'])
-        output_hash = hashlib.sha256(output_bytes).hexdigest()
+        if data_key:
+            # The JSON form of a data-key ciphertext is the base64 binary envelope
+            input_digest.update(data_bytes)
+            encrypted_data, _ = self.encrypt_envelope(data_bytes, algorithm, key_id, user_id, key, data_key=True)
+            output_digest.update(encrypted_data)
+            metadata = {"format": "envelope"}
+        elif self._digest_in_pass(algorithm, len(data_bytes), input_digest):
+            encrypted_data, metadata = self._encrypt_aes_gcm_digested(data_bytes, key, input_digest, output_digest)
+        elif _fits_scratch(algorithm, len(data_bytes) + 28):
+            # Ciphertext lands in this thread's scratch buffer; only the base64 text is allocated
+            input_digest.update(data_bytes)
+            encrypted_data, metadata = self._encrypt_aead_into(algorithm, data_bytes, key)
+            output_digest.update(encrypted_data)
+        else:
+            input_digest.update(data_bytes)
+            encrypted_result = self.supported_algorithms[algorithm](data_bytes, key)
+            encrypted_data = encrypted_result['encrypted_data']
+            if key is not None:
+                # Managed-key ciphertexts carry their nonce so decrypt needs only the key ID
+                encrypted_data = encrypted_result.get('nonce', b"") + encrypted_data
+            # Audit the raw ciphertext, not its base64 transport form
+            output_digest.update(encrypted_data)
+            metadata = encrypted_result.get('metadata', {})
         
         return {
-            "encrypted_data": base64.b64encode(encrypted_result['encrypted_data']).decode('utf-8'),
+            "encrypted_data": base64.b64encode(encrypted_data).decode('ascii'),
             "algorithm": algorithm,
             "key_id": key_id,
             "timestamp": datetime.utcnow().isoformat(),
             "status": "success",
-            "input_hash": input_hash,
-            "output_hash": output_hash,
-            "metadata": encrypted_result.get('metadata', {})
-        }
+            "input_hash": input_digest.hexdigest(),
+            "output_hash": output_digest.hexdigest(),
+            "metadata": metadata
+        }, input_digest.seconds + output_digest.seconds
     
-    def decrypt_data(self, encrypted_data: str, algorithm: str, key_id: Optional[str], user_id: str) -> dict:
-        """Decrypt data using specified algorithm"""
+    def _decrypt(self, encrypted_data: Union[str, Buffer], algorithm: str, key_id: Optional[str], user_id: str,
+                 key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[dict, float]:
+        """decrypt_data, also returning the seconds spent on audit digests"""
         if algorithm not in self.decrypt_algorithms:
             raise ValueError(f"Unsupported algorithm: {algorithm}")
+        if key is None:
+            raise ValueError("key_id is required for decryption")
+        if not data_key:
+            self._check_key(algorithm, key)
         
         try:
             # Decode base64 encrypted data
             encrypted_bytes = base64.b64decode(encrypted_data)
+            input_digest = AuditDigest()
+            output_digest = AuditDigest()
             
-            # Generate input hash for audit
-            input_hash = hashlib.sha256(encrypted_bytes).hexdigest()
-            
-            # Decrypt data
-            decrypted_data = self.decrypt_algorithms[algorithm](encrypted_bytes, key_id)
-            
-            # Generate output hash
-            output_hash = hashlib.sha256(decrypted_data).hexdigest()
+            if data_key:
+                input_digest.update(encrypted_bytes)
+                decrypted_data, algorithm, _ = self.decrypt_envelope(encrypted_bytes, key, user_id)
+                output_digest.update(decrypted_data)
+            elif self._digest_in_pass(algorithm, len(encrypted_bytes), input_digest):
+                decrypted_data = self._decrypt_aes_gcm_digested(encrypted_bytes, key, input_digest, output_digest)
+            elif key is not None and _fits_scratch(algorithm, len(encrypted_bytes)):
+                input_digest.update(encrypted_bytes)
+                decrypted_data = self._decrypt_aead_into(encrypted_bytes, key)
+                output_digest.update(decrypted_data)
+            else:
+                input_digest.update(encrypted_bytes)
+                decrypted_data = self.decrypt_algorithms[algorithm](encrypted_bytes, key)
+                output_digest.update(decrypted_data)
             
             return {
-                "decrypted_data": decrypted_data.decode('utf-8'),
+                "decrypted_data": str(decrypted_data, 'utf-8'),
                 "algorithm": algorithm,
                 "key_id": key_id,
                 "timestamp": datetime.utcnow().isoformat(),
                 "status": "success",
-                "input_hash": input_hash,
-                "output_hash": output_hash
-            }
+                "input_hash": input_digest.hexdigest(),
+                "output_hash": output_digest.hexdigest()
+            }, input_digest.seconds + output_digest.seconds
         except Exception as e:
             raise ValueError(f"Decryption failed: {str(e)}")
     
-    def _encrypt_aes_256_gcm(self, data: bytes) -> dict:
-        """Encrypt data using AES-256-GCM"""
-        # Generate random key and IV
-        key = os.urandom(32)  # 256 bits
-        iv = os.urandom(12)   # 96 bits for GCM
+    def _encrypt_aes_gcm_digested(self, data: bytes, key: Optional[ManagedKey], input_digest: AuditDigest,
+                                  output_digest: AuditDigest) -> Tuple[bytearray, dict]:
+        """AES-256-GCM in one chunked pass, hashing each chunk while it is still in cache
         
-        # Create cipher
-        cipher = Cipher(algorithms.AES(key), modes.GCM(iv))
-        encryptor = cipher.encryptor()
+        Produces the same bytes as the one-shot path: nonce || ciphertext || tag
+        for managed keys, ciphertext || tag with the key in metadata otherwise.
+        """
+        nonce = os.urandom(12)
+        raw_key = key.copy_material() if key is not None else os.urandom(32)
+        encryptor = Cipher(algorithms.AES(raw_key), modes.GCM(nonce)).encryptor()
+        prefix = len(nonce) if key is not None else 0
         
-        # Encrypt data
-        encrypted_data = encryptor.update(data) + encryptor.finalize()
+        # The 16 tag bytes at the end double as the slack update_into needs
+        output = bytearray(prefix + len(data) + 16)
+        out_view = memoryview(output)
+        if prefix:
+            out_view[:prefix] = nonce
+            output_digest.update(nonce)
         
-        # Get authentication tag
-        tag = encryptor.tag
+        data_view = memoryview(data)
+        chunk_size = settings.AUDIT_DIGEST_CHUNK_SIZE
+        position = prefix
+        for start in range(0, len(data_view), chunk_size):
+            chunk = data_view[start:start + chunk_size]
+            input_digest.update(chunk)
+            written = encryptor.update_into(chunk, out_view[position:position + len(chunk) + 15])
+            output_digest.update(out_view[position:position + written])
+            position += written
+        encryptor.finalize()
+        out_view[position:position + 16] = encryptor.tag
+        output_digest.update(out_view[position:position + 16])
+        out_view.release()
         
-        # Combine encrypted data and tag
-        result = encrypted_data + tag
+        if key is not None:
+            return output, {}
+        return output, self._ephemeral_metadata("aes-256-gcm", raw_key, nonce, encryptor.tag)
+    
+    def _decrypt_aes_gcm_digested(self, encrypted_data: bytes, key: ManagedKey, input_digest: AuditDigest,
+                                  output_digest: AuditDigest) -> bytearray:
+        """Chunked AES-256-GCM decryption of nonce || ciphertext || tag that feeds both digests"""
+        view = memoryview(encrypted_data)
+        if len(view) < 28:
+            raise ValueError("ciphertext is too short")
+        nonce, body, tag = view[:12], view[12:-16], view[-16:]
+        decryptor = Cipher(algorithms.AES(key.copy_material()), modes.GCM(bytes(nonce))).decryptor()
+        input_digest.update(nonce)
         
-        return {
-            "encrypted_data": result,
-            "metadata": {
-                "key": base64.b64encode(key).decode('utf-8'),
-                "iv": base64.b64encode(iv).decode('utf-8'),
+        output = bytearray(len(body) + 15)
+        out_view = memoryview(output)
+        chunk_size = settings.AUDIT_DIGEST_CHUNK_SIZE
+        position = 0
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            input_digest.update(chunk)
+            written = decryptor.update_into(chunk, out_view[position:position + len(chunk) + 15])
+            output_digest.update(out_view[position:position + written])
+            position += written
+        input_digest.update(tag)
+        try:
+            decryptor.finalize_with_tag(bytes(tag))
+        except InvalidTag:
+            raise ValueError("authentication tag mismatch")
+        out_view.release()
+        del output[position:]
+        return output
+    
+    def _encrypt_aead_into(self, algorithm: str, data: Buffer,
+                           key: Optional[ManagedKey]) -> Tuple[memoryview, dict]:
+        """One-shot AEAD into the scratch buffer, laid out like the copying path"""
+        nonce = os.urandom(12)
+        if key is not None:
+            output = _scratch.take(12 + len(data) + 16)
+            output[:12] = nonce
+            key.cipher.encrypt_into(nonce, data, None, output[12:])
+            return output, {}
+        
+        ephemeral_key = os.urandom(32)
+        output = _scratch.take(len(data) + 16)
+        AEAD_CIPHERS[algorithm](ephemeral_key).encrypt_into(nonce, data, None, output)
+        return output, self._ephemeral_metadata(algorithm, ephemeral_key, nonce, output[-16:])
+    
+    def _decrypt_aead_into(self, encrypted_data: Buffer, key: ManagedKey) -> memoryview:
+        """Decrypt nonce || ciphertext || tag into the scratch buffer"""
+        view = memoryview(encrypted_data)
+        if len(view) < 28:
+            raise ValueError("ciphertext is too short")
+        output = _scratch.take(len(view) - 28)
+        try:
+            key.cipher.decrypt_into(view[:12], view[12:], None, output)
+        except InvalidTag:
+            raise ValueError("authentication tag mismatch")
+        return output
+    
+    def _ephemeral_metadata(self, algorithm: str, ephemeral_key: bytes, nonce: bytes, tag: Buffer) -> dict:
+        """Key material returned to the client when no managed key was used"""
+        if algorithm == "aes-256-gcm":
+            # Keep the IV/tag metadata shape of earlier responses
+            return {
+                "key": base64.b64encode(ephemeral_key).decode('utf-8'),
+                "iv": base64.b64encode(nonce).decode('utf-8'),
                 "tag": base64.b64encode(tag).decode('utf-8')
             }
+        return {
+            "key": base64.b64encode(ephemeral_key).decode('utf-8'),
+            "nonce": base64.b64encode(nonce).decode('utf-8')
         }
     
-    def _decrypt_aes_256_gcm(self, encrypted_data: bytes, key_id: Optional[str]) -> bytes:
-        """Decrypt data using AES-256-GCM"""
-        # For demo purposes, we'll use a hardcoded key
-        # In production, this would be retrieved from the key management system
-        key = base64.b64decode("your-hardcoded-key-here")  # 32 bytes
-        iv = base64.b64decode("your-hardcoded-iv-here")    # 12 bytes
-        
-        # Extract tag (last 16 bytes)
-        tag = encrypted_data[-16:]
-        ciphertext = encrypted_data[:-16]
-        
-        # Create cipher
-        cipher = Cipher(algorithms.AES(key), modes.GCM(iv, tag))
-        decryptor = cipher.decryptor()
-        
-        # Decrypt data
-        decrypted_data = decryptor.update(ciphertext) + decryptor.finalize()
-        
-        return decrypted_data
-    
-    def _encrypt_chacha20_poly1305(self, data: bytes) -> dict:
-        """Encrypt data using ChaCha20-Poly1305"""
-        # Generate random key and nonce
-        key = os.urandom(32)  # 256 bits
+    def _encrypt_aead(self, algorithm: str, key: Optional[ManagedKey], data: Buffer) -> dict:
+        """Encrypt with a one-shot AEAD using a managed or ephemeral key"""
         nonce = os.urandom(12)  # 96 bits
+        if key is not None:
+            return {
+                "encrypted_data": key.cipher.encrypt(nonce, data, None),
+                "nonce": nonce,
+                "tag_size": 16,
+                "metadata": {}
+            }
         
-        # Create cipher
-        cipher = Cipher(algorithms.ChaCha20(key, nonce), modes.Poly1305())
-        encryptor = cipher.encryptor()
-        
-        # Encrypt data
-        encrypted_data = encryptor.update(data) + encryptor.finalize()
+        # Generate random key
+        ephemeral_key = os.urandom(32)  # 256 bits
         
+        # Encrypt data (ciphertext with the 16-byte tag appended)
+        encrypted_data = AEAD_CIPHERS[algorithm](ephemeral_key).encrypt(nonce, data, None)
         return {
             "encrypted_data": encrypted_data,
-            "metadata": {
-                "key": base64.b64encode(key).decode('utf-8'),
-                "nonce": base64.b64encode(nonce).decode('utf-8')
-            }
+            "key": ephemeral_key,
+            "nonce": nonce,
+            "tag_size": 16,
+            "metadata": self._ephemeral_metadata(algorithm, ephemeral_key, nonce, encrypted_data[-16:])
         }
     
-    def _decrypt_chacha20_poly1305(self, encrypted_data: bytes, key_id: Optional[str]) -> bytes:
+    def _decrypt_aead(self, encrypted_data: bytes, key: ManagedKey) -> bytes:
+        """Decrypt nonce || ciphertext || tag with a managed key"""
+        view = memoryview(encrypted_data)
+        try:
+            return key.cipher.decrypt(view[:12], view[12:], None)
+        except InvalidTag:
+            raise ValueError("authentication tag mismatch")
+    
+    def _encrypt_aes_256_gcm(self, data: bytes, key: Optional[ManagedKey] = None) -> dict:
+        """Encrypt data using AES-256-GCM"""
+        return self._encrypt_aead("aes-256-gcm", key, data)
+    
+    def _decrypt_aes_256_gcm(self, encrypted_data: bytes, key: ManagedKey) -> bytes:
+        """Decrypt data using AES-256-GCM"""
+        return self._decrypt_aead(encrypted_data, key)
+    
+    def _encrypt_chacha20_poly1305(self, data: bytes, key: Optional[ManagedKey] = None) -> dict:
+        """Encrypt data using ChaCha20-Poly1305"""
+        return self._encrypt_aead("chacha20-poly1305", key, data)
+    
+    def _decrypt_chacha20_poly1305(self, encrypted_data: bytes, key: ManagedKey) -> bytes:
         """Decrypt data using ChaCha20-Poly1305"""
-        # For demo purposes, using hardcoded key
-        key = base64.b64decode("your-hardcoded-chacha20-key")
-        nonce = base64.b64decode("your-hardcoded-chacha20-nonce")
-        
-        # Create cipher
-        cipher = Cipher(algorithms.ChaCha20(key, nonce), modes.Poly1305())
-        decryptor = cipher.decryptor()
-        
-        # Decrypt data
-        decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
-        
-        return decrypted_data
+        return self._decrypt_aead(encrypted_data, key)
     
-    def _encrypt_rsa_4096(self, data: bytes) -> dict:
-        """Encrypt data using RSA-4096"""
-        # Generate RSA key pair
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=4096
+    def _oaep(self) -> padding.OAEP:
+        return padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=None
         )
-        public_key = private_key.public_key()
+    
+    def _encrypt_rsa_4096(self, data: bytes, key: Optional[ManagedKey] = None) -> dict:
+        """Encrypt data using RSA-4096"""
+        if key is not None:
+            public_key = key.cipher.public_key()
+        else:
+            # Take a pre-generated key pair (falls back to inline generation)
+            public_key = rsa_key_pool.acquire().public_key()
         
         # Encrypt data
-        encrypted_data = public_key.encrypt(
-            data,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+        encrypted_data = public_key.encrypt(data, self._oaep())
         
         return {
             "encrypted_data": encrypted_data,
@@ -197,27 +679,205 @@ class CryptoService:
             }
         }
     
-    def _decrypt_rsa_4096(self, encrypted_data: bytes, key_id: Optional[str]) -> bytes:
+    def _rsa_decrypt(self, encrypted_data: Buffer, key: ManagedKey) -> bytes:
+        return key.cipher.decrypt(bytes(encrypted_data), self._oaep())
+    
+    def _decrypt_rsa_4096(self, encrypted_data: bytes, key: ManagedKey) -> bytes:
         """Decrypt data using RSA-4096"""
-        # For demo purposes, this would use the private key from key management
-        raise NotImplementedError("RSA decryption requires private key from key management system")
+        return self._rsa_decrypt(encrypted_data, key)
+    
+    def _siv_cipher(self, key: Optional[ManagedKey], field: str) -> Any:
+        """AES-SIV cipher under the key's subkey for one field"""
+        if key is None:
+            raise ValueError("key_id is required for deterministic encryption")
+        if key.algorithm not in DETERMINISTIC_KEY_CLASSES:
+            raise ValueError(f"Key {key.id} is a {key.algorithm} key; deterministic encryption needs aes-256-siv")
+        return key.derive("siv", field, 64, DETERMINISTIC_KEY_CLASSES[key.algorithm])
     
-    def _encrypt_ed25519(self, data: bytes) -> dict:
-        """Sign data using Ed25519"""
-        # Ed25519 is for signing, not encryption
-        # This is a placeholder for signature functionality
+    def encrypt_deterministic(self, data: Union[str, Buffer], key: Optional[ManagedKey], field: str) -> dict:
+        """Encrypt a field value so that equal values give equal ciphertexts
+        
+        Only equality is revealed: the same value in the same field under the
+        same key always encrypts to the same base64 text, so callers can
+        index and match ciphertexts directly. Use randomized encryption for
+        anything that is never searched.
+        """
+        data_bytes = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        encrypted_data = self._siv_cipher(key, field).encrypt(data_bytes, None)
+        input_digest = AuditDigest()
+        output_digest = AuditDigest()
+        input_digest.update(data_bytes)
+        output_digest.update(encrypted_data)
         return {
-            "encrypted_data": data,  # Not actually encrypted
-            "metadata": {
-                "algorithm": "ed25519-signature",
-                "note": "Ed25519 is for digital signatures, not encryption"
-            }
+            "encrypted_data": base64.b64encode(encrypted_data).decode('ascii'),
+            "algorithm": key.algorithm,
+            "key_id": str(key.id),
+            "field": field,
+            "timestamp": datetime.utcnow().isoformat(),
+            "status": "success",
+            "input_hash": input_digest.hexdigest(),
+            "output_hash": output_digest.hexdigest()
+        }
+    
+    def decrypt_deterministic(self, encrypted_data: str, key: Optional[ManagedKey], field: str) -> dict:
+        """Decrypt a value from encrypt_deterministic"""
+        cipher = self._siv_cipher(key, field)
+        try:
+            encrypted_bytes = base64.b64decode(encrypted_data, validate=True)
+            decrypted_data = cipher.decrypt(encrypted_bytes, None)
+        except (binascii.Error, InvalidTag):
+            raise ValueError("Decryption failed: wrong key or field, or corrupted ciphertext")
+        input_digest = AuditDigest()
+        output_digest = AuditDigest()
+        input_digest.update(encrypted_bytes)
+        output_digest.update(decrypted_data)
+        return {
+            "decrypted_data": str(decrypted_data, 'utf-8'),
+            "algorithm": key.algorithm,
+            "key_id": str(key.id),
+            "field": field,
+            "timestamp": datetime.utcnow().isoformat(),
+            "status": "success",
+            "input_hash": input_digest.hexdigest(),
+            "output_hash": output_digest.hexdigest()
+        }
+    
+    def _index_key(self, key: Optional[ManagedKey], field: str) -> bytes:
+        if key is None:
+            raise ValueError("key_id is required for blind indexes")
+        return key.derive("blind-index", field, 32)
+    
+    def blind_index(self, value: Union[str, Buffer], key: Optional[ManagedKey], field: str) -> str:
+        """Hex HMAC-SHA256 of a value under the key's subkey for one field
+        
+        The index is stored next to the ciphertext and looked up with the
+        index of the search term, so equality search needs no decryption.
+        Values are not normalised: callers decide whether, say, emails are
+        lowercased before both indexing and searching.
+        """
+        value_bytes = value.encode('utf-8') if isinstance(value, str) else bytes(value)
+        return hmac.digest(self._index_key(key, field), value_bytes, "sha256")[:settings.BLIND_INDEX_BYTES].hex()
+    
+    def blind_indexes(self, values: List[str], key: Optional[ManagedKey], field: str) -> List[str]:
+        """blind_index of each value, deriving the field key once"""
+        index_key = self._index_key(key, field)
+        size = settings.BLIND_INDEX_BYTES
+        return [hmac.digest(index_key, value.encode('utf-8'), "sha256")[:size].hex() for value in values]
+    
+    def sign(self, data: Union[str, Buffer], key: Optional[ManagedKey], key_id: Optional[str]) -> dict:
+        """Sign data using a managed Ed25519 key"""
+        if key is None:
+            raise ValueError("key_id is required for signing")
+        self._check_key("ed25519", key)
+        
+        data_bytes = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        signature = key.cipher.sign(data_bytes).signature
+        input_digest = AuditDigest()
+        output_digest = AuditDigest()
+        input_digest.update(data_bytes)
+        output_digest.update(signature)
+        return {
+            "signature": base64.b64encode(signature).decode('ascii'),
+            "public_key": base64.b64encode(key.public_key).decode('ascii'),
+            "algorithm": "ed25519",
+            "key_id": key_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "status": "success",
+            "input_hash": input_digest.hexdigest(),
+            "output_hash": output_digest.hexdigest()
         }
     
-    def _decrypt_ed25519(self, encrypted_data: bytes, key_id: Optional[str]) -> bytes:
-        """Verify Ed25519 signature"""
-        # This would verify the signature
-        return encrypted_data  # Return original data for demo
+    def verify(self, message: Union[str, Buffer], signature: str, public_key: bytes) -> bool:
+        """Check an Ed25519 signature; malformed signatures or keys raise ValueError"""
+        try:
+            signature_bytes = base64.b64decode(signature, validate=True)
+        except binascii.Error:
+            raise ValueError("Signature is not valid base64")
+        message_bytes = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+        try:
+            _verify_key(public_key).verify(message_bytes, signature_bytes)
+        except BadSignatureError:
+            return False
+        return True
+    
+    def public_key_for(self, key: ManagedKey) -> bytes:
+        """Raw public key of a managed Ed25519 key"""
+        self._check_key("ed25519", key)
+        return key.public_key
+    
+    def decode_public_key(self, encoded_key: str) -> bytes:
+        """Decode a base64 Ed25519 public key supplied by a client"""
+        try:
+            public_key = base64.b64decode(encoded_key, validate=True)
+        except binascii.Error:
+            raise ValueError("Public key is not valid base64")
+        if len(public_key) != 32:
+            raise ValueError("Ed25519 public keys must be 32 bytes")
+        return public_key
 
 # Create service instance
 crypto_service = CryptoService()
+
+# Module-level entry points so jobs can be pickled into worker processes
+def _encrypt_job(data: str, algorithm: str, key_id: Optional[str], user_id: str,
+                 key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[dict, float]:
+    return crypto_service._encrypt(data, algorithm, key_id, user_id, key, data_key)
+
+def _decrypt_job(encrypted_data: str, algorithm: str, key_id: Optional[str], user_id: str,
+                 key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[dict, float]:
+    return crypto_service._decrypt(encrypted_data, algorithm, key_id, user_id, key, data_key)
+
+def _encrypt_envelope_job(data: bytes, algorithm: str, key_id: Optional[str], user_id: str,
+                          key: Optional[ManagedKey] = None, data_key: bool = False) -> Tuple[bytes, Optional[bytes]]:
+    return crypto_service.encrypt_envelope(data, algorithm, key_id, user_id, key, data_key)
+
+def _warm_job():
+    """Executor warm-up: imports this module in the worker and initialises OpenSSL"""
+    crypto_service.encrypt_data(b"warm-up", "aes-256-gcm", None, "warm-up")
+
+def _decrypt_envelope_job(data: bytes, key: Union[bytes, ManagedKey, None], user_id: str) -> Tuple[bytes, str, Optional[str]]:
+    return crypto_service.decrypt_envelope(data, key, user_id)
+
+def _run_batch_items(operation, items: List[BatchItem], user_id: str) -> Tuple[List[dict], float]:
+    """Run each item independently so one failure does not fail the chunk"""
+    results = []
+    digest_seconds = 0.0
+    for payload, algorithm, key_id, key in items:
+        try:
+            if isinstance(key, Exception):
+                raise key
+            result, seconds = operation(payload, algorithm, key_id, user_id, key)
+            results.append({"status": "success", "result": result})
+            digest_seconds += seconds
+        except Exception as e:
+            results.append({"status": "error", "error": str(e)})
+    return results, digest_seconds
+
+def _verify_batch_job(items: List[VerifyItem]) -> List[dict]:
+    """Verify each item independently; a malformed item is reported, not raised"""
+    results = []
+    for message, signature, public_key in items:
+        try:
+            if isinstance(public_key, Exception):
+                raise public_key
+            results.append({"status": "success", "valid": crypto_service.verify(message, signature, public_key)})
+        except Exception as e:
+            results.append({"status": "error", "valid": False, "error": str(e)})
+    return results
+
+def _rewrap_batch_job(rows: List[Tuple[Any, Union[str, bytes]]], old_key: ManagedKey,
+                      new_key: ManagedKey) -> List[Tuple[Any, Union[str, bytes, None], Optional[str]]]:
+    """Rewrap (row id, ciphertext) pairs; a row that fails carries its error instead"""
+    results = []
+    for row_id, encrypted_data in rows:
+        try:
+            results.append((row_id, crypto_service.rewrap(encrypted_data, old_key, new_key), None))
+        except Exception as e:
+            results.append((row_id, None, str(e) or type(e).__name__))
+    return results
+
+def _encrypt_batch_job(items: List[BatchItem], user_id: str) -> Tuple[List[dict], float]:
+    return _run_batch_items(crypto_service._encrypt, items, user_id)
+
+def _decrypt_batch_job(items: List[BatchItem], user_id: str) -> Tuple[List[dict], float]:
+    return _run_batch_items(crypto_service._decrypt, items, user_id)
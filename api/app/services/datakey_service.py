@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple, Union
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from .key_service import AEAD_KEY_CLASSES, ManagedKey
+from ..utils.cache import TTLCache
+from ..utils.config import settings
+from ..utils.envelope import Buffer
+
+DATA_KEY_SIZE = 32
+WRAP_NONCE_SIZE = 12
+
+
+class DataKey:
+    """A cached data key: its cipher, its wrapped form and how much it has sealed"""
+
+    __slots__ = ("cipher", "wrapped", "messages", "bytes", "expires_at")
+
+    def __init__(self, cipher: Any, wrapped: bytes):
+        self.cipher = cipher
+        self.wrapped = wrapped
+        self.messages = 0
+        self.bytes = 0
+        self.expires_at = time.monotonic() + settings.DATA_KEY_MAX_AGE_SECONDS
+
+    def admits(self, size: int) -> bool:
+        return (
+            self.messages < settings.DATA_KEY_MAX_MESSAGES
+            and self.bytes + size <= settings.DATA_KEY_MAX_BYTES
+            and time.monotonic() < self.expires_at
+        )
+
+
+class DataKeyService:
+    """Data keys for envelope encryption under managed master keys
+
+    Encryption reuses one data key per (owner, master key, algorithm) until it
+    has sealed DATA_KEY_MAX_MESSAGES messages or DATA_KEY_MAX_BYTES bytes, or
+    is DATA_KEY_MAX_AGE_SECONDS old, so the master key wraps a new data key
+    only that often. Decryption keeps unwrapped data keys in an LRU keyed by
+    the wrapped bytes, so a run of messages under one data key costs one
+    unwrap. Both caches are per process and hold cipher objects, not raw keys.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encrypt_keys = TTLCache(maxsize=settings.DATA_KEY_CACHE_SIZE, ttl=settings.DATA_KEY_MAX_AGE_SECONDS)
+        self._decrypt_keys = TTLCache(maxsize=settings.DATA_KEY_CACHE_SIZE, ttl=settings.DATA_KEY_CACHE_TTL_SECONDS)
+
+        # Master-key operation metrics
+        self.wraps = 0
+        self.unwraps = 0
+        self.retired = 0
+
+    def _aad(self, master: ManagedKey, algorithm: str) -> bytes:
+        # Binds a wrapped key to its master and to the one algorithm it may be used with
+        return f"ciphercanary-data-key:{master.id}:{algorithm}".encode('utf-8')
+
+    def _wrap(self, master: ManagedKey, algorithm: str, data_key: bytes) -> bytes:
+        if master.algorithm in AEAD_KEY_CLASSES:
+            nonce = os.urandom(WRAP_NONCE_SIZE)
+            return nonce + master.cipher.encrypt(nonce, data_key, self._aad(master, algorithm))
+        if master.algorithm == "rsa-4096":
+            return master.cipher.public_key().encrypt(data_key, self._oaep(master, algorithm))
+        raise ValueError(f"{master.algorithm} keys cannot wrap data keys")
+
+    def _unwrap(self, master: ManagedKey, algorithm: str, wrapped: bytes) -> bytes:
+        try:
+            if master.algorithm in AEAD_KEY_CLASSES:
+                return master.cipher.decrypt(
+                    wrapped[:WRAP_NONCE_SIZE], wrapped[WRAP_NONCE_SIZE:], self._aad(master, algorithm)
+                )
+            if master.algorithm == "rsa-4096":
+                return master.cipher.decrypt(wrapped, self._oaep(master, algorithm))
+        except (InvalidTag, ValueError):
+            raise ValueError("Data key could not be unwrapped with this key")
+        raise ValueError(f"{master.algorithm} keys cannot wrap data keys")
+
+    def _oaep(self, master: ManagedKey, algorithm: str) -> padding.OAEP:
+        return padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA256()),
+            algorithm=hashes.SHA256(),
+            label=self._aad(master, algorithm)
+        )
+
+    def _check(self, algorithm: str):
+        if algorithm not in AEAD_KEY_CLASSES:
+            raise ValueError(f"Data keys are only used with AEAD algorithms, not {algorithm}")
+
+    def encryption_key(self, master: ManagedKey, algorithm: str, size: int) -> Tuple[Any, bytes]:
+        """Cipher and wrapped key of the data key to seal ``size`` more bytes with"""
+        self._check(algorithm)
+        cache_key = (master.owner_id, master.id, algorithm)
+        with self._lock:
+            data_key = self._encrypt_keys.get(cache_key)
+            if data_key is not None and data_key.admits(size):
+                data_key.messages += 1
+                data_key.bytes += size
+                return data_key.cipher, data_key.wrapped
+            if data_key is not None:
+                self.retired += 1
+
+        raw_key = os.urandom(DATA_KEY_SIZE)
+        data_key = DataKey(AEAD_KEY_CLASSES[algorithm](raw_key), self._wrap(master, algorithm, raw_key))
+        data_key.messages, data_key.bytes = 1, size
+        with self._lock:
+            self.wraps += 1
+            self._encrypt_keys.set(cache_key, data_key)
+        # The unwrapped form is already known, so decrypting our own messages skips the master key
+        self._decrypt_keys.set((master.id, algorithm, data_key.wrapped), data_key.cipher)
+        return data_key.cipher, data_key.wrapped
+
+    def decryption_key(self, master: ManagedKey, algorithm: str, wrapped: Buffer) -> Any:
+        """Cipher for a wrapped data key, unwrapping it with the master key on a cache miss"""
+        self._check(algorithm)
+        cache_key = (master.id, algorithm, bytes(wrapped))
+        cipher = self._decrypt_keys.get(cache_key)
+        if cipher is None:
+            cipher = AEAD_KEY_CLASSES[algorithm](self._unwrap(master, algorithm, cache_key[2]))
+            with self._lock:
+                self.unwraps += 1
+            self._decrypt_keys.set(cache_key, cipher)
+        return cipher
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        encrypt_keys = self._encrypt_keys.stats()
+        decrypt_keys = self._decrypt_keys.stats()
+        return {
+            "wraps": self.wraps,
+            "unwraps": self.unwraps,
+            "retired": self.retired,
+            "encrypt_keys": encrypt_keys["size"],
+            "decrypt_keys": decrypt_keys["size"],
+            "decrypt_hit_ratio": decrypt_keys["hit_ratio"]
+        }
+
+# Create service instance
+datakey_service = DataKeyService()
@@ -0,0 +1,275 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from ..utils.config import settings
+
+
+def idle(seconds: float = 0.01):
+    """Warm-up job; sleeps so each submission lands on a separate worker"""
+    time.sleep(seconds)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a pool's bounded queue is full"""
+
+    def __init__(self, pool_name: str, retry_after: int = 1):
+        super().__init__(f"Executor pool '{pool_name}' is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class ExecutorPool:
+    """Bounded executor that rejects work instead of queueing without limit
+
+    With ``wait_timeout``, ``run`` also gives up on work that has not
+    finished within that many seconds, so queued callers fail fast
+    instead of piling up behind a burst. ``nice`` lowers the scheduling
+    priority of a process pool's workers. A process pool broken by a
+    crashed worker is replaced on the next submission.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int,
+                 wait_timeout: Optional[float] = None, nice: int = 0):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self.nice = nice
+        self._executor: Executor = None
+        self._lock = threading.Lock()
+
+        # Saturation counters
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+        self.queue_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _create(self) -> Executor:
+        if self.kind == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(settings.EXECUTOR_START_METHOD),
+                initializer=os.nice if self.nice else None,
+                initargs=(self.nice,) if self.nice else ()
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"ciphercanary-{self.name}"
+        )
+
+    @property
+    def executor(self) -> Executor:
+        """Create the underlying executor on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._create()
+        return self._executor
+
+    def _restart(self, broken: Executor) -> Executor:
+        """Replace a process pool that lost a worker; its pending work has already failed"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = self._create()
+                self.restarts += 1
+            executor = self._executor
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _admit(self):
+        """Reserve a slot or raise if workers and queue are both full"""
+        with self._lock:
+            if self.inflight >= self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturatedError(self.name)
+            self.inflight += 1
+            self.submitted += 1
+            if self.inflight > self.peak_inflight:
+                self.peak_inflight = self.inflight
+
+    def _release(self, future: Future, submitted_at: float):
+        with self._lock:
+            self.inflight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            if self.kind == "process":
+                # Queue wait is not observable inside the child, so the
+                # whole round trip is counted as run time
+                self.run_seconds += time.perf_counter() - submitted_at
+
+    def _timed(self, func: Callable, submitted_at: float, *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.queue_wait_seconds += started - submitted_at
+                self.run_seconds += finished - started
+
+    def submit(self, func: Callable, *args: Any) -> Future:
+        """Submit func(*args), raising ExecutorSaturatedError when full"""
+        self._admit()
+        submitted_at = time.perf_counter()
+        try:
+            if self.kind == "process":
+                executor = self.executor
+                try:
+                    future = executor.submit(func, *args)
+                except BrokenProcessPool:
+                    future = self._restart(executor).submit(func, *args)
+            else:
+                future = self.executor.submit(self._timed, func, submitted_at, *args)
+        except BaseException:
+            with self._lock:
+                self.inflight -= 1
+            raise
+        future.add_done_callback(lambda f: self._release(f, submitted_at))
+        return future
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run func(*args) on this pool and await the result"""
+        future = asyncio.wrap_future(self.submit(func, *args))
+        if self.wait_timeout is None:
+            return await future
+        try:
+            # Cancels the work if it is still queued
+            return await asyncio.wait_for(future, self.wait_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise ExecutorSaturatedError(self.name)
+
+    async def warm(self, func: Callable = idle, *args: Any):
+        """Start every worker now instead of on the first requests
+
+        Process pools should be given a job from the module their real work
+        lives in, so each child also imports it during warm-up.
+        """
+        await asyncio.gather(*(
+            asyncio.wrap_future(self.submit(func, *args)) for _ in range(self.max_workers)
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool saturation metrics"""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": min(self.inflight, self.max_workers),
+                "queued": max(self.inflight - self.max_workers, 0),
+                "peak_inflight": self.peak_inflight,
+                "saturation": round(self.inflight / self.capacity, 3) if self.capacity else 0.0,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "restarts": self.restarts,
+                "queue_wait_seconds": round(self.queue_wait_seconds, 6),
+                "run_seconds": round(self.run_seconds, 6)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the underlying executor"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+class ExecutorService:
+    """Thread and process pools that keep blocking work off the event loop"""
+
+    def __init__(self):
+        self.pools = {
+            # Blocking DB and auth calls
+            "io": ExecutorPool(
+                "io", "thread", settings.IO_THREAD_WORKERS, settings.IO_MAX_QUEUE_DEPTH
+            ),
+            # Per-request crypto on small and medium payloads
+            "crypto": ExecutorPool(
+                "crypto", "thread", settings.CRYPTO_THREAD_WORKERS, settings.CRYPTO_MAX_QUEUE_DEPTH
+            ),
+            # CPU-bound crypto (key generation, large payloads)
+            "cpu": ExecutorPool(
+                "cpu", "process", settings.CRYPTO_PROCESS_WORKERS, settings.CRYPTO_MAX_QUEUE_DEPTH
+            ),
+            # bcrypt, isolated so a login burst cannot starve crypto requests
+            "password": ExecutorPool(
+                "password", "process", settings.PASSWORD_WORKERS, settings.PASSWORD_MAX_QUEUE_DEPTH,
+                wait_timeout=settings.PASSWORD_QUEUE_TIMEOUT_SECONDS
+            ),
+            # Bulk re-encryption for key rotation; started on first use, at low priority,
+            # with room for one batch of chunks
+            "rotation": ExecutorPool(
+                "rotation", "process", settings.ROTATION_WORKERS,
+                -(-settings.ROTATION_BATCH_SIZE // max(1, settings.ROTATION_CHUNK_SIZE)),
+                nice=settings.ROTATION_WORKER_NICE
+            ),
+            # Whole-file sealing for the file endpoints; started on first use and at low
+            # priority, so a large upload cannot hold every worker that serves requests
+            "file": ExecutorPool(
+                "file", "process", settings.FILE_WORKERS, settings.FILE_MAX_QUEUE_DEPTH,
+                nice=settings.FILE_WORKER_NICE
+            )
+        }
+
+    @property
+    def io(self) -> ExecutorPool:
+        return self.pools["io"]
+
+    @property
+    def crypto(self) -> ExecutorPool:
+        return self.pools["crypto"]
+
+    @property
+    def cpu(self) -> ExecutorPool:
+        return self.pools["cpu"]
+
+    @property
+    def password(self) -> ExecutorPool:
+        return self.pools["password"]
+
+    @property
+    def rotation(self) -> ExecutorPool:
+        return self.pools["rotation"]
+
+    @property
+    def file(self) -> ExecutorPool:
+        return self.pools["file"]
+
+    async def run_io(self, func: Callable, *args: Any) -> Any:
+        """Run blocking I/O on the io pool"""
+        return await self.io.run(func, *args)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Saturation metrics for every pool"""
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop all pools"""
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+# Create service instance
+executor_service = ExecutorService()
@@ -0,0 +1,337 @@
+"""Parallel encryption of files in the segmented stream format
+
+Files are sealed in the format /api/v1/encrypt/stream produces, so either
+side can open what the other wrote. Run as a module to encrypt or decrypt a
+file on this machine with every core:
+
+    python -m app.services.file_service encrypt backup.tar backup.tar.ccs --key-file backup.key
+    python -m app.services.file_service decrypt backup.tar.ccs backup.tar --key-file backup.key
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+
+from .executor_service import executor_service
+from .stream_service import (
+    HEADER_SIZE, NONCE_PREFIX_SIZE, STREAM_ALGORITHMS, TAG_SIZE, StreamDecryptor, StreamEncryptor, StreamError,
+    segment_nonce
+)
+from ..utils.config import settings
+from ..utils.metrics import crypto_metrics
+
+logger = logging.getLogger(__name__)
+
+# (job function, arguments) for one run of consecutive segments
+Job = Tuple[Callable[..., int], tuple]
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a request body exceeds FILE_MAX_BYTES"""
+
+
+def sealed_size(size: int, segment_size: int) -> int:
+    """Length of the stream that ``size`` plaintext bytes seal into"""
+    return HEADER_SIZE + size + _segment_count(size, segment_size) * TAG_SIZE
+
+
+def _segment_count(size: int, segment_size: int) -> int:
+    # An empty input still gets one (empty) final segment
+    return max(1, -(-size // segment_size))
+
+
+def _preallocate(path: str, size: int):
+    """Create ``path`` at its final length so workers can map and fill it"""
+    with open(path, "wb") as target:
+        if size and hasattr(os, "posix_fallocate"):
+            # Reserve the blocks now: running out of space mid-way would
+            # otherwise surface as SIGBUS inside a worker's mapping
+            os.posix_fallocate(target.fileno(), 0, size)
+        else:
+            target.truncate(size)
+
+
+def _seal_segments(source: str, target: str, algorithm: str, key: bytes, header: bytes, segment_size: int,
+                   size: int, first: int, count: int) -> int:
+    """Seal segments ``first`` .. ``first + count - 1`` of ``source`` into their slots in ``target``"""
+    aead = STREAM_ALGORITHMS[algorithm][1](key)
+    nonce_prefix = header[-NONCE_PREFIX_SIZE:]
+    last_segment = _segment_count(size, segment_size) - 1
+    sealed_segment = segment_size + TAG_SIZE
+    sealed = 0
+    with open(source, "rb") as src, open(target, "r+b") as dst, \
+            mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as in_map, \
+            mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map:
+        with memoryview(in_map) as plaintext, memoryview(out_map) as output:
+            for index in range(first, first + count):
+                start = index * segment_size
+                end = min(start + segment_size, size)
+                offset = HEADER_SIZE + index * sealed_segment
+                nonce = segment_nonce(nonce_prefix, index, index == last_segment)
+                aead.encrypt_into(nonce, plaintext[start:end], header, output[offset:offset + end - start + TAG_SIZE])
+                sealed += end - start
+    return sealed
+
+
+def _open_segments(source: str, target: str, algorithm: str, key: bytes, header: bytes, segment_size: int,
+                   size: int, first: int, count: int) -> int:
+    """Authenticate and decrypt segments ``first`` .. ``first + count - 1`` into their slots in ``target``"""
+    aead = STREAM_ALGORITHMS[algorithm][1](key)
+    nonce_prefix = header[-NONCE_PREFIX_SIZE:]
+    sealed_segment = segment_size + TAG_SIZE
+    last_segment = (size - HEADER_SIZE - 1) // sealed_segment
+    opened = 0
+    with open(source, "rb") as src, open(target, "r+b") as dst, \
+            mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as in_map, \
+            mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map:
+        with memoryview(in_map) as ciphertext, memoryview(out_map) as output:
+            for index in range(first, first + count):
+                start = HEADER_SIZE + index * sealed_segment
+                end = min(start + sealed_segment, size)
+                offset = index * segment_size
+                nonce = segment_nonce(nonce_prefix, index, index == last_segment)
+                try:
+                    aead.decrypt_into(nonce, ciphertext[start:end], header,
+                                      output[offset:offset + end - start - TAG_SIZE])
+                except InvalidTag:
+                    raise StreamError(f"Segment {index} failed authentication")
+                opened += end - start - TAG_SIZE
+    return opened
+
+
+class FileService:
+    """Seals and opens whole files with every segment handled independently
+
+    A segment's nonce is fixed by its index and whether it is the last one,
+    and its offsets in both files follow from the file size, so runs of
+    segments go to worker processes in any order. Each worker maps the input
+    and the preallocated output and encrypts from one mapping straight into
+    the other; no segment data is pickled between processes. Throughput
+    grows with the number of workers until memory bandwidth or storage runs
+    out.
+    """
+
+    def __init__(self):
+        self.segment_size = settings.FILE_SEGMENT_SIZE
+
+    def temp_path(self) -> str:
+        """A new empty file in FILE_SPOOL_DIR"""
+        descriptor, path = tempfile.mkstemp(prefix="ciphercanary-", dir=settings.FILE_SPOOL_DIR)
+        os.close(descriptor)
+        return path
+
+    def remove(self, *paths: Optional[str]):
+        for path in paths:
+            if path is not None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    async def spool(self, chunks: AsyncIterator[bytes]) -> str:
+        """Stage a request body in a temporary file, writing a segment's worth at a time off the event loop"""
+        path = self.temp_path()
+        try:
+            with open(path, "wb") as target:
+                buffer = bytearray()
+                size = 0
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > settings.FILE_MAX_BYTES:
+                        raise FileTooLargeError(f"Body exceeds the maximum of {settings.FILE_MAX_BYTES} bytes")
+                    buffer += chunk
+                    if len(buffer) >= self.segment_size:
+                        full, buffer = buffer, bytearray()
+                        await executor_service.run_io(target.write, full)
+                if buffer:
+                    await executor_service.run_io(target.write, buffer)
+        except BaseException:
+            self.remove(path)
+            raise
+        return path
+
+    def _plan(self, job: Callable[..., int], arguments: tuple, segments: int, workers: int) -> Iterator[Job]:
+        """Split segments into runs: one per worker for small files, FILE_SEGMENTS_PER_JOB at most"""
+        per_job = max(1, min(settings.FILE_SEGMENTS_PER_JOB, -(-segments // max(1, workers))))
+        for first in range(0, segments, per_job):
+            yield job, arguments + (first, min(per_job, segments - first))
+
+    def prepare_encrypt(self, source: str, target: str, algorithm: str, key: bytes, workers: int,
+                        segment_size: Optional[int] = None) -> Tuple[List[Job], int]:
+        """Write the header into a preallocated ``target`` and plan the segment jobs
+
+        An empty file is sealed here and needs no jobs.
+        """
+        encryptor = StreamEncryptor(algorithm, key, segment_size or self.segment_size)
+        size = os.path.getsize(source)
+        _preallocate(target, sealed_size(size, encryptor.segment_size))
+        with open(target, "r+b") as output:
+            output.write(encryptor.header)
+            if size == 0:
+                output.write(encryptor.seal(b"", True))
+                return [], 0
+        arguments = (source, target, algorithm, key, encryptor.header, encryptor.segment_size, size)
+        segments = _segment_count(size, encryptor.segment_size)
+        return list(self._plan(_seal_segments, arguments, segments, workers)), size
+
+    def prepare_decrypt(self, source: str, target: str, key: bytes, workers: int) -> Tuple[List[Job], str]:
+        """Check the stream header, preallocate ``target`` and plan the segment jobs"""
+        size = os.path.getsize(source)
+        with open(source, "rb") as stream:
+            decryptor = StreamDecryptor(stream.read(HEADER_SIZE), key)
+        sealed_segment = decryptor.sealed_segment_size
+        body = size - HEADER_SIZE
+        segments = -(-body // sealed_segment)
+        if segments == 0 or body - (segments - 1) * sealed_segment < TAG_SIZE:
+            raise StreamError("Stream truncated before final segment")
+        _preallocate(target, body - segments * TAG_SIZE)
+        if body == TAG_SIZE:
+            # An empty plaintext: open its one segment here, as there is nothing to map
+            with open(source, "rb") as stream:
+                stream.seek(HEADER_SIZE)
+                decryptor.open(stream.read(), True)
+            return [], decryptor.algorithm
+        arguments = (source, target, decryptor.algorithm, key, decryptor.header, decryptor.segment_size, size)
+        return list(self._plan(_open_segments, arguments, segments, workers)), decryptor.algorithm
+
+    def run(self, jobs: List[Job], executor: Executor, window: int) -> int:
+        """Run jobs on a concurrent.futures executor, at most ``window`` at a time"""
+        done_bytes = 0
+        pending = set()
+        try:
+            for job, arguments in jobs:
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    done_bytes += sum(future.result() for future in done)
+                pending.add(executor.submit(job, *arguments))
+            done, pending = wait(pending)
+            return done_bytes + sum(future.result() for future in done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def run_async(self, jobs: List[Job]) -> int:
+        """Run jobs on the file process pool without holding more than it can queue"""
+        pool = executor_service.file
+        window = max(1, min(2 * pool.max_workers, pool.capacity))
+        done_bytes = 0
+        pending = set()
+        try:
+            for job, arguments in jobs:
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    done_bytes += sum(future.result() for future in done)
+                pending.add(asyncio.wrap_future(pool.submit(job, *arguments)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                done_bytes += sum(future.result() for future in done)
+            return done_bytes
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def encrypt_file_async(self, source: str, target: str, algorithm: str, key: bytes) -> int:
+        """Seal ``source`` into ``target`` on the file process pool; returns the plaintext size"""
+        started = time.perf_counter()
+        jobs, size = await executor_service.run_io(
+            self.prepare_encrypt, source, target, algorithm, key, executor_service.file.max_workers
+        )
+        await self.run_async(jobs)
+        crypto_metrics.observe(
+            "encrypt_stream", algorithm, time.perf_counter() - started, size, sealed_size(size, self.segment_size)
+        )
+        return size
+
+    async def decrypt_file_async(self, source: str, target: str, key: bytes) -> Tuple[int, str]:
+        """Open ``source`` into ``target`` on the file process pool; returns the plaintext size and algorithm"""
+        started = time.perf_counter()
+        jobs, algorithm = await executor_service.run_io(
+            self.prepare_decrypt, source, target, key, executor_service.file.max_workers
+        )
+        size = await self.run_async(jobs)
+        crypto_metrics.observe(
+            "decrypt_stream", algorithm, time.perf_counter() - started, os.path.getsize(source), size
+        )
+        return size, algorithm
+
+# Create service instance
+file_service = FileService()
+
+
+def process_executor(workers: int) -> ProcessPoolExecutor:
+    """Worker pool for command-line use, outside the API's executor pools"""
+    # A command-line process has started no threads, so forking is safe and
+    # spares every worker a fresh import of the app
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else settings.EXECUTOR_START_METHOD
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+
+
+def _read_key(path: str, generate: bool) -> bytes:
+    """Base64 key from a key file, creating one readable only by its owner if allowed"""
+    if generate and not os.path.exists(path):
+        key = os.urandom(32)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as key_file:
+            key_file.write(base64.b64encode(key).decode("ascii") + "\n")
+        logger.info("Wrote a new key to %s", path)
+        return key
+    with open(path) as key_file:
+        try:
+            key = base64.b64decode(key_file.read().strip(), validate=True)
+        except binascii.Error:
+            raise SystemExit(f"{path} does not hold a base64 key")
+    if len(key) != 32:
+        raise SystemExit(f"{path} must hold a 32-byte key")
+    return key
+
+
+def main(args: argparse.Namespace) -> Dict[str, Any]:
+    key = _read_key(args.key_file, generate=args.command == "encrypt")
+    started = time.perf_counter()
+    executor = process_executor(args.workers)
+    try:
+        if args.command == "encrypt":
+            jobs, size = file_service.prepare_encrypt(
+                args.source, args.target, args.algorithm, key, args.workers, args.segment_size
+            )
+            file_service.run(jobs, executor, 2 * args.workers)
+        else:
+            jobs, _ = file_service.prepare_decrypt(args.source, args.target, key, args.workers)
+            size = file_service.run(jobs, executor, 2 * args.workers)
+    except BaseException:
+        # Never leave a partial output, least of all unauthenticated plaintext
+        if os.path.exists(args.target):
+            os.remove(args.target)
+        raise
+    finally:
+        executor.shutdown(cancel_futures=True)
+    seconds = time.perf_counter() - started
+    return {"bytes": size, "seconds": seconds, "mib_per_second": size / seconds / (1024 * 1024)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt a file in parallel in the stream format")
+    parser.add_argument("command", choices=["encrypt", "decrypt"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--key-file", required=True,
+                        help="base64 key; encrypt creates it with a fresh key if it does not exist")
+    parser.add_argument("--algorithm", default="aes-256-gcm", choices=sorted(STREAM_ALGORITHMS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segment-size", type=int, help=f"plaintext bytes per segment "
+                                                          f"(default {settings.FILE_SEGMENT_SIZE})")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = main(args)
+    logger.info("%sed %d bytes in %.2fs (%.1f MiB/s)", args.command, result["bytes"], result["seconds"],
+                result["mib_per_second"])
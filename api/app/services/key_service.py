@@ -0,0 +1,373 @@
+import base64
+import binascii
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, AESSIV, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from nacl.signing import SigningKey
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache_service import NEGATIVE, cache_service
+from .executor_service import executor_service
+from .keypool_service import rsa_key_pool
+from ..models import EncryptionKey
+from ..schemas import KeyCreate
+from ..utils.cache import TTLCache
+from ..utils.config import settings
+
+# Algorithms the key store can generate, with their key type and size in bits
+KEY_ALGORITHMS = {
+    "aes-256-gcm": ("symmetric", 256),
+    "chacha20-poly1305": ("symmetric", 256),
+    "aes-256-siv": ("symmetric", 512),
+    "rsa-4096": ("asymmetric", 4096),
+    "ed25519": ("asymmetric", 256),
+}
+AEAD_KEY_CLASSES = {
+    "aes-256-gcm": AESGCM,
+    "chacha20-poly1305": ChaCha20Poly1305,
+}
+# Deterministic (nonce-misuse-resistant) AEADs, used for searchable ciphertexts
+DETERMINISTIC_KEY_CLASSES = {
+    "aes-256-siv": AESSIV,
+}
+WRAP_NONCE_SIZE = 12
+
+
+def _build_cipher(algorithm: str, material: Union[bytes, bytearray]) -> Any:
+    """Parse key material once into the object used on the hot path"""
+    if algorithm in AEAD_KEY_CLASSES:
+        return AEAD_KEY_CLASSES[algorithm](bytes(material))
+    if algorithm in DETERMINISTIC_KEY_CLASSES:
+        return DETERMINISTIC_KEY_CLASSES[algorithm](bytes(material))
+    if algorithm == "rsa-4096":
+        return serialization.load_der_private_key(bytes(material), password=None)
+    if algorithm == "ed25519":
+        return SigningKey(bytes(material))
+    raise ValueError(f"Unsupported key algorithm: {algorithm}")
+
+
+def _restore_managed_key(key_id, owner_id, algorithm, expires_at, material):
+    return ManagedKey(key_id, owner_id, algorithm, expires_at, bytearray(material))
+
+
+class ManagedKey:
+    """Unwrapped key material plus its ready-to-use cipher object
+
+    The material is zeroized when the last reference goes away, not when the
+    key cache drops the entry, so requests still holding the key finish with
+    the real key. Read it through copy_material(), which refuses a zeroized key.
+    """
+
+    __slots__ = ("id", "owner_id", "algorithm", "expires_at", "material", "cipher", "public_key", "derived",
+                 "zeroized")
+
+    def __init__(self, key_id: uuid.UUID, owner_id: uuid.UUID, algorithm: str,
+                 expires_at: Optional[datetime], material: bytearray):
+        self.zeroized = False
+        self.id = key_id
+        self.owner_id = owner_id
+        self.algorithm = algorithm
+        self.expires_at = expires_at
+        self.material = material
+        self.cipher = _build_cipher(algorithm, material)
+        # Ed25519 keys are also used to verify, so derive the public half once
+        self.public_key = bytes(self.cipher.verify_key) if algorithm == "ed25519" else None
+        self.derived: Dict[Any, Any] = {}
+
+    def copy_material(self) -> bytes:
+        """Immutable copy of the key material, for ciphers built outside this object"""
+        material = bytes(self.material)
+        # Checked after the copy: zeroize() sets the flag before it overwrites
+        if self.zeroized:
+            raise ValueError("Key material has been zeroized")
+        return material
+
+    def derive(self, purpose: str, field: str, length: int, build: Callable[[bytes], Any] = bytes) -> Any:
+        """Subkey of this key for one purpose and field, derived with HKDF and kept with the key
+
+        Distinct purposes and fields get independent keys, so equal values in
+        two fields, or under two uses of one key, cannot be matched up.
+        """
+        cache_key = (purpose, field, length)
+        derived = self.derived.get(cache_key)
+        if derived is not None:
+            return derived
+        if self.algorithm not in AEAD_KEY_CLASSES and self.algorithm not in DETERMINISTIC_KEY_CLASSES:
+            raise ValueError(f"{self.algorithm} keys cannot derive field keys; use a symmetric key")
+        subkey = HKDF(
+            algorithm=hashes.SHA256(),
+            length=length,
+            salt=None,
+            info=f"ciphercanary-{purpose}:{field}".encode('utf-8')
+        ).derive(self.copy_material())
+        if len(self.derived) >= settings.FIELD_KEY_CACHE_SIZE:
+            self.derived.clear()
+        derived = self.derived[cache_key] = build(subkey)
+        return derived
+
+    def zeroize(self):
+        """Overwrite the Python-side copy of the key material
+
+        The cipher object keeps its own copy inside OpenSSL; it is released
+        with the object.
+        """
+        self.zeroized = True
+        self.material[:] = bytes(len(self.material))
+
+    def __del__(self):
+        if not self.zeroized:
+            self.zeroize()
+
+    def __reduce__(self):
+        # Cipher objects cannot be pickled; rebuild them in the worker process
+        return (_restore_managed_key, (self.id, self.owner_id, self.algorithm,
+                                       self.expires_at, self.copy_material()))
+
+
+class KeyService:
+    def __init__(self):
+        self.kek = self._derive_kek()
+        # L1 holds unwrapped keys; the shared L2 only ever sees wrapped key_material.
+        # Evicted keys are zeroized once the last request using them lets go.
+        self.key_cache = cache_service.tier(
+            "key",
+            TTLCache(maxsize=settings.KEY_CACHE_SIZE, ttl=settings.KEY_CACHE_TTL_SECONDS),
+            ttl=settings.KEY_CACHE_TTL_SECONDS,
+            loads=self._load_cached_row
+        )
+
+    def _derive_kek(self) -> AESGCM:
+        """Key-encryption key used to wrap key_material at rest"""
+        if settings.KEY_ENCRYPTION_KEY:
+            kek = base64.b64decode(settings.KEY_ENCRYPTION_KEY)
+        else:
+            kek = HKDF(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=None,
+                info=b"ciphercanary-key-encryption-key"
+            ).derive(settings.SECRET_KEY.encode('utf-8'))
+        return AESGCM(kek)
+
+    def wrap_material(self, key_id: uuid.UUID, material: bytes) -> str:
+        """Encrypt key material under the KEK, bound to its key ID"""
+        nonce = os.urandom(WRAP_NONCE_SIZE)
+        wrapped = self.kek.encrypt(nonce, material, str(key_id).encode('utf-8'))
+        return base64.b64encode(nonce + wrapped).decode('utf-8')
+
+    def unwrap_material(self, key_id: uuid.UUID, key_material: str) -> bytearray:
+        """Decrypt stored key material into a zeroizable buffer"""
+        try:
+            blob = base64.b64decode(key_material, validate=True)
+            material = self.kek.decrypt(
+                blob[:WRAP_NONCE_SIZE], blob[WRAP_NONCE_SIZE:], str(key_id).encode('utf-8')
+            )
+        except (binascii.Error, InvalidTag, ValueError):
+            raise ValueError("Key material could not be unwrapped")
+        return bytearray(material)
+
+    def parse_key_id(self, key_id: Union[str, uuid.UUID]) -> uuid.UUID:
+        """Validate a key ID supplied by a client"""
+        if isinstance(key_id, uuid.UUID):
+            return key_id
+        try:
+            return uuid.UUID(key_id)
+        except (ValueError, AttributeError, TypeError):
+            raise ValueError(f"Invalid key_id: {key_id}")
+
+    def generate_material(self, algorithm: str) -> bytes:
+        """Generate fresh key material for an algorithm"""
+        if algorithm in AEAD_KEY_CLASSES or algorithm == "ed25519":
+            # An Ed25519 private key is its 32-byte seed
+            return os.urandom(32)
+        if algorithm in DETERMINISTIC_KEY_CLASSES:
+            # AES-SIV keys are two AES-256 keys: one for the synthetic IV, one for CTR
+            return os.urandom(64)
+        if algorithm == "rsa-4096":
+            return rsa_key_pool.acquire().private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+        raise ValueError(f"Unsupported key algorithm: {algorithm}")
+
+    async def create_key(self, db: AsyncSession, owner_id: uuid.UUID, key_data: KeyCreate) -> EncryptionKey:
+        """Generate, wrap and store a new key"""
+        if key_data.algorithm not in KEY_ALGORITHMS:
+            raise ValueError(f"Unsupported key algorithm: {key_data.algorithm}")
+        key_type, key_size = KEY_ALGORITHMS[key_data.algorithm]
+        if key_data.key_size != key_size:
+            raise ValueError(f"{key_data.algorithm} keys must be {key_size} bits")
+
+        key_id = uuid.uuid4()
+        # RSA generation can fall back to an inline keygen when the pool is empty
+        material = await executor_service.run_io(self.generate_material, key_data.algorithm)
+        db_key = EncryptionKey(
+            id=key_id,
+            name=key_data.name,
+            key_type=key_type,
+            key_material=self.wrap_material(key_id, material),
+            algorithm=key_data.algorithm,
+            key_size=key_size,
+            expires_at=key_data.expires_at,
+            owner_id=owner_id
+        )
+        db.add(db_key)
+        await db.commit()
+        await db.refresh(db_key)
+        return db_key
+
+    async def list_keys(self, db: AsyncSession, owner_id: uuid.UUID,
+                        include_inactive: bool = False) -> List[EncryptionKey]:
+        """List a user's keys, newest first"""
+        query = select(EncryptionKey).where(EncryptionKey.owner_id == owner_id)
+        if not include_inactive:
+            query = query.where(EncryptionKey.is_active == True)  # noqa: E712
+        result = await db.scalars(query.order_by(EncryptionKey.created_at.desc()))
+        return list(result)
+
+    async def deactivate_key(self, db: AsyncSession, key_id: Union[str, uuid.UUID],
+                             owner_id: uuid.UUID) -> EncryptionKey:
+        """Deactivate a key and evict it from the cache"""
+        key_id = self.parse_key_id(key_id)
+        db_key = await db.scalar(select(EncryptionKey).where(
+            EncryptionKey.id == key_id,
+            EncryptionKey.owner_id == owner_id
+        ))
+        if db_key is None:
+            raise ValueError("Key not found")
+        db_key.is_active = False
+        await db.commit()
+        await db.refresh(db_key)
+        await self.evict(key_id, owner_id)
+        return db_key
+
+    def _cache_key(self, key_id: uuid.UUID, owner_id: uuid.UUID) -> str:
+        return f"{owner_id}:{key_id}"
+
+    def _cached_row(self, db_key: EncryptionKey) -> Dict[str, Any]:
+        """Shareable L2 form of a key: metadata plus still-wrapped material"""
+        return {
+            "id": str(db_key.id),
+            "owner_id": str(db_key.owner_id),
+            "algorithm": db_key.algorithm,
+            "expires_at": db_key.expires_at.isoformat() if db_key.expires_at else None,
+            "key_material": db_key.key_material
+        }
+
+    def _load_cached_row(self, row: Dict[str, Any]) -> ManagedKey:
+        key_id = uuid.UUID(row["id"])
+        expires_at = datetime.fromisoformat(row["expires_at"]) if row["expires_at"] else None
+        return ManagedKey(
+            key_id, uuid.UUID(row["owner_id"]), row["algorithm"], expires_at,
+            self.unwrap_material(key_id, row["key_material"])
+        )
+
+    async def evict(self, key_id: uuid.UUID, owner_id: uuid.UUID):
+        """Drop a key from every worker's cache; its material is zeroized once no request holds it"""
+        await self.key_cache.invalidate(self._cache_key(key_id, owner_id))
+
+    async def load_keys(self, db: AsyncSession, key_ids: List[uuid.UUID],
+                        owner_id: uuid.UUID) -> Dict[uuid.UUID, ManagedKey]:
+        """Look up active, unexpired keys owned by the user in one query and cache them"""
+        now = datetime.now(timezone.utc)
+        db_keys = await db.scalars(select(EncryptionKey).where(
+            EncryptionKey.id.in_(key_ids),
+            EncryptionKey.owner_id == owner_id,
+            EncryptionKey.is_active == True,  # noqa: E712
+            or_(EncryptionKey.expires_at.is_(None), EncryptionKey.expires_at > now)
+        ))
+
+        loaded = {}
+        for db_key in db_keys:
+            managed_key = ManagedKey(
+                db_key.id, db_key.owner_id, db_key.algorithm, db_key.expires_at,
+                self.unwrap_material(db_key.id, db_key.key_material)
+            )
+            ttl = None
+            if managed_key.expires_at is not None:
+                expires_at = managed_key.expires_at
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                ttl = (expires_at - now).total_seconds()
+            await self.key_cache.set(
+                self._cache_key(db_key.id, owner_id), managed_key, self._cached_row(db_key), ttl=ttl
+            )
+            loaded[db_key.id] = managed_key
+
+        for key_id in key_ids:
+            if key_id not in loaded:
+                await self.key_cache.set_negative(self._cache_key(key_id, owner_id))
+        return loaded
+
+    async def load_for_rotation(self, db: AsyncSession, key_id: Union[str, uuid.UUID],
+                                owner_id: uuid.UUID) -> ManagedKey:
+        """Load a key even if it is inactive or expired, bypassing the cache
+
+        Only key rotation uses this: retired keys must still decrypt the data
+        being moved off them.
+        """
+        key_id = self.parse_key_id(key_id)
+        db_key = await db.scalar(select(EncryptionKey).where(
+            EncryptionKey.id == key_id,
+            EncryptionKey.owner_id == owner_id
+        ))
+        if db_key is None:
+            raise ValueError("Key not found")
+        return ManagedKey(
+            db_key.id, db_key.owner_id, db_key.algorithm, db_key.expires_at,
+            self.unwrap_material(db_key.id, db_key.key_material)
+        )
+
+    async def resolve_async(self, db: AsyncSession, key_id: Optional[str],
+                            owner_id: uuid.UUID) -> Optional[ManagedKey]:
+        """Resolve a key from the cache, falling back to the database"""
+        if not key_id:
+            return None
+        managed_key = (await self.resolve_many_async(db, [key_id], owner_id))[key_id]
+        if isinstance(managed_key, Exception):
+            raise managed_key
+        return managed_key
+
+    async def resolve_many_async(self, db: AsyncSession, key_ids: Iterable[Optional[str]],
+                                 owner_id: uuid.UUID) -> Dict[str, Union[ManagedKey, Exception]]:
+        """Resolve each distinct key ID once; failures are returned, not raised
+
+        L1 misses go to L2 in one pipeline and L2 misses to the database in one query.
+        """
+        resolved = {}
+        parsed = {}
+        for key_id in set(filter(None, key_ids)):
+            try:
+                parsed[key_id] = self.parse_key_id(key_id)
+            except ValueError as e:
+                resolved[key_id] = e
+
+        cached = await self.key_cache.get_many(
+            self._cache_key(key_uuid, owner_id) for key_uuid in parsed.values()
+        )
+        missing = []
+        for key_id, key_uuid in parsed.items():
+            managed_key = cached[self._cache_key(key_uuid, owner_id)]
+            if managed_key is NEGATIVE:
+                resolved[key_id] = ValueError("Key not found, inactive or expired")
+            elif managed_key is None:
+                missing.append(key_id)
+            else:
+                resolved[key_id] = managed_key
+
+        if missing:
+            loaded = await self.load_keys(db, [parsed[key_id] for key_id in missing], owner_id)
+            for key_id in missing:
+                resolved[key_id] = loaded.get(parsed[key_id]) or ValueError("Key not found, inactive or expired")
+        return resolved
+
+# Create service instance
+key_service = KeyService()
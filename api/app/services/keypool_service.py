@@ -0,0 +1,145 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ..utils.config import settings
+
+
+def _generate_rsa_key_der(key_size: int) -> bytes:
+    """Generate an RSA private key in a worker process and return it as DER"""
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=key_size
+    )
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+
+class RSAKeyPool:
+    """Pool of pre-generated RSA key pairs refilled by a background process"""
+
+    def __init__(self, key_size: int, low_watermark: int, high_watermark: int, workers: int):
+        self.key_size = key_size
+        self.low_watermark = low_watermark
+        self.high_watermark = max(high_watermark, low_watermark)
+        self.workers = workers
+        self._keys = deque()
+        self._pending = 0
+        self._executor: ProcessPoolExecutor = None
+        self._lock = threading.Lock()
+        self._running = False
+
+        # Pool metrics
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+
+    def start(self):
+        """Start the background generator and fill up to the high watermark"""
+        with self._lock:
+            if self._running:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(settings.EXECUTOR_START_METHOD)
+            )
+            self._running = True
+        self._refill(force=True)
+
+    def stop(self):
+        """Stop the background generator and drop pooled keys"""
+        with self._lock:
+            self._running = False
+            executor, self._executor = self._executor, None
+            self._keys.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def acquire(self) -> rsa.RSAPrivateKey:
+        """Take a key from the pool, generating inline if it is empty"""
+        started = time.perf_counter()
+        try:
+            private_key = self._keys.popleft()
+            hit = True
+        except IndexError:
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=self.key_size
+            )
+            hit = False
+        waited = time.perf_counter() - started
+
+        with self._lock:
+            self.wait_seconds += waited
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._refill()
+        return private_key
+
+    def _refill(self, force: bool = False):
+        """Schedule generation jobs once the pool drops below the low watermark"""
+        with self._lock:
+            if not self._running:
+                return
+            available = len(self._keys) + self._pending
+            if not force and available >= self.low_watermark:
+                return
+            needed = self.high_watermark - available
+            for _ in range(needed):
+                future = self._executor.submit(_generate_rsa_key_der, self.key_size)
+                future.add_done_callback(self._on_generated)
+                self._pending += 1
+
+    def _on_generated(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.errors += 1
+                return
+        private_key = serialization.load_der_private_key(future.result(), password=None)
+        with self._lock:
+            if self._running:
+                self._keys.append(private_key)
+                self.generated += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool depth and wait-time metrics"""
+        with self._lock:
+            acquired = self.hits + self.misses
+            return {
+                "key_size": self.key_size,
+                "running": self._running,
+                "depth": len(self._keys),
+                "pending": self._pending,
+                "low_watermark": self.low_watermark,
+                "high_watermark": self.high_watermark,
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated,
+                "errors": self.errors,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "avg_wait_seconds": round(self.wait_seconds / acquired, 6) if acquired else 0.0
+            }
+
+# Create pool instance
+rsa_key_pool = RSAKeyPool(
+    key_size=4096,
+    low_watermark=settings.RSA_KEY_POOL_LOW_WATERMARK,
+    high_watermark=settings.RSA_KEY_POOL_HIGH_WATERMARK,
+    workers=settings.RSA_KEY_POOL_WORKERS
+)
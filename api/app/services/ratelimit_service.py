@@ -0,0 +1,183 @@
+import heapq
+import math
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from .cache_service import cache_service
+from ..utils.config import settings
+
+# Refill and charge one bucket atomically on the Redis server, using its clock
+# so that API workers with skewed clocks share one consistent bucket
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local needed = math.min(cost, burst)
+local retry_after = 0
+if tokens >= needed then
+    tokens = tokens - cost
+else
+    retry_after = (needed - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+# Share of RATE_LIMIT_MAX_TRACKED_USERS a prune leaves, so one prune makes room for many new users
+PRUNE_TARGET = 0.9
+
+
+class RateLimitedError(Exception):
+    """Raised when a user's token bucket cannot cover a request"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimitService:
+    """Per-user token buckets weighted by algorithm and payload size
+
+    Each user's bucket holds up to RATE_LIMIT_BURST units and refills at
+    RATE_LIMIT_RATE units per second. A request costs its algorithm's weight
+    from RATE_LIMIT_COSTS (1 by default) for every started
+    RATE_LIMIT_BYTES_PER_UNIT bytes it carries, so a large payload or an
+    rsa-4096 call drains the bucket faster than a small AES call. A request
+    is admitted when the bucket holds its cost, or is full, so calls dearer
+    than the burst still run and leave the bucket in debt.
+
+    With RATE_LIMIT_BACKEND=redis the buckets live in the cache Redis and are
+    shared by every API worker; a Redis outage falls back to the
+    per-process buckets until it recovers.
+    """
+
+    def __init__(self):
+        self.enabled = settings.RATE_LIMIT_ENABLED
+        self.shared = settings.RATE_LIMIT_BACKEND == "redis"
+        self.rate = settings.RATE_LIMIT_RATE
+        self.burst = settings.RATE_LIMIT_BURST
+        self.costs = {str(name): float(cost) for name, cost in settings.RATE_LIMIT_COSTS.items()}
+        # user id -> (tokens, monotonic time of the last update); only touched from the event loop
+        self._buckets: Dict[Any, Tuple[float, float]] = {}
+        self._script = None
+        self._script_client = None
+
+        # Limiter metrics
+        self.admitted = 0
+        self.limited = 0
+        self.evicted = 0
+        self.redis_errors = 0
+
+    def weight(self, algorithm: Optional[str], operation: Optional[str] = None) -> float:
+        """Units charged per payload unit for an algorithm, or for one operation with it"""
+        if operation is not None:
+            cost = self.costs.get(f"{operation}:{algorithm}")
+            if cost is not None:
+                return cost
+        return self.costs.get(algorithm, 1.0)
+
+    def units(self, size: int) -> int:
+        """Started RATE_LIMIT_BYTES_PER_UNIT blocks in ``size`` bytes, at least one"""
+        return max(1, -(-size // settings.RATE_LIMIT_BYTES_PER_UNIT))
+
+    def cost(self, algorithm: Optional[str], size: int = 0, operation: Optional[str] = None) -> float:
+        """Units charged for a request carrying ``size`` bytes"""
+        return self.weight(algorithm, operation) * self.units(size)
+
+    def check_local(self, user_id: Any, cost: float) -> float:
+        """Charge a per-process bucket; 0.0 if admitted, else seconds until it would be"""
+        now = time.monotonic()
+        state = self._buckets.get(user_id)
+        if state is None:
+            tokens = self.burst
+            if len(self._buckets) >= settings.RATE_LIMIT_MAX_TRACKED_USERS:
+                self._prune(now)
+        else:
+            tokens = min(self.burst, state[0] + (now - state[1]) * self.rate)
+        needed = min(cost, self.burst)
+        if tokens < needed:
+            self._buckets[user_id] = (tokens, now)
+            return (needed - tokens) / self.rate
+        self._buckets[user_id] = (tokens - cost, now)
+        return 0.0
+
+    def _prune(self, now: float):
+        """Forget buckets that have refilled, then the least recently charged ones if still too many
+
+        A full bucket is the same as no bucket. Evicting a refilling one
+        forgives what it still owed, the price of bounding memory.
+        """
+        buckets = {
+            user_id: state for user_id, state in self._buckets.items()
+            if state[0] + (now - state[1]) * self.rate < self.burst
+        }
+        keep = int(settings.RATE_LIMIT_MAX_TRACKED_USERS * PRUNE_TARGET)
+        if len(buckets) > keep:
+            self.evicted += len(buckets) - keep
+            buckets = dict(heapq.nlargest(keep, buckets.items(), key=lambda item: item[1][1]))
+        self._buckets = buckets
+
+    async def check_shared(self, user_id: Any, cost: float) -> float:
+        redis = cache_service.redis
+        if redis is None:
+            return self.check_local(user_id, cost)
+        if self._script_client is not redis:
+            # Script objects run EVALSHA and reload the script after a Redis restart
+            self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+            self._script_client = redis
+        try:
+            retry_after = await self._script(
+                keys=[f"{settings.CACHE_KEY_PREFIX}:ratelimit:{user_id}"],
+                args=[self.rate, self.burst, cost]
+            )
+        except (RedisError, OSError):
+            self.redis_errors += 1
+            cache_service._failed("rate limit")
+            return self.check_local(user_id, cost)
+        return float(retry_after)
+
+    async def charge(self, user_id: Any, cost: float):
+        """Take ``cost`` units from a user's bucket or raise RateLimitedError"""
+        if not self.enabled or cost <= 0:
+            return
+        if self.shared:
+            retry_after = await self.check_shared(user_id, cost)
+        else:
+            retry_after = self.check_local(user_id, cost)
+        if retry_after > 0:
+            self.limited += 1
+            raise RateLimitedError(retry_after)
+        self.admitted += 1
+
+    async def surcharge(self, user_id: Any, items: Iterable[Tuple[str, int]], charged: float,
+                        operation: Optional[str] = None):
+        """Charge what (algorithm, size) items cost beyond the ``charged`` base cost
+
+        The base cost is charged before the body is parsed, at weight 1 unless
+        the query string names the algorithm; endpoints that learn algorithms
+        from the body call this once they have them. Each item is priced per
+        unit of its own size, as a single call carrying it would be, and the
+        request pays the larger of that total and its base cost.
+        """
+        total = sum(self.weight(algorithm, operation) * self.units(size) for algorithm, size in items)
+        await self.charge(user_id, max(0.0, total - charged))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "limited": self.limited,
+            "evicted": self.evicted,
+            "redis_errors": self.redis_errors,
+            "tracked_users": len(self._buckets)
+        }
+
+# Create service instance
+rate_limit_service = RateLimitService()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal
+from ..models import TokenRevocation
+from ..utils.bloom import BloomFilter
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _epoch(value: datetime) -> float:
+    """Seconds since the epoch for a stored timestamp; naive values are UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationService:
+    """In-memory view of revoked tokens, kept in sync with the token_revocations table
+
+    Single-token revocations go into a Bloom filter, so a token that was
+    never revoked - the common case - is answered without I/O; a filter hit
+    is confirmed against the database. Per-user revocations ("every token
+    issued before T") are rare and kept exactly. Rows written by other
+    workers are picked up within REVOCATION_SYNC_SECONDS.
+    """
+
+    def __init__(self):
+        self._bloom = self._new_bloom(0)
+        self._users: Dict[str, float] = {}  # user ID -> revoked_at
+        self._confirmed: Dict[str, float] = {}  # jti -> exp, for filter hits found in the database
+        self._synced_from: Optional[datetime] = None
+        self._rebuilt_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._loaded: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.filter_hits = 0
+        self.false_positives = 0
+        self.syncs = 0
+        self.sync_errors = 0
+
+    def _new_bloom(self, entries: int) -> BloomFilter:
+        return BloomFilter(
+            max(settings.REVOCATION_BLOOM_CAPACITY, entries * 2), settings.REVOCATION_BLOOM_ERROR_RATE
+        )
+
+    def check(self, claims: Dict[str, Any]) -> Optional[bool]:
+        """True if revoked, False if not, None when a filter hit needs confirming"""
+        revoked_at = self._users.get(claims.get("uid"))
+        if revoked_at is not None and claims.get("iat", 0) < revoked_at:
+            return True
+        jti = claims.get("jti")
+        if jti is None:
+            return False
+        if jti in self._confirmed:
+            return True
+        if jti.encode('ascii') not in self._bloom:
+            return False
+        return None
+
+    async def is_revoked(self, db: AsyncSession, claims: Dict[str, Any]) -> bool:
+        """Full check, confirming Bloom filter hits against the database"""
+        revoked = self.check(claims)
+        if revoked is not None:
+            return revoked
+        self.filter_hits += 1
+        found = await db.scalar(
+            select(TokenRevocation.id).where(TokenRevocation.jti == claims["jti"]).limit(1)
+        )
+        if found is None:
+            self.false_positives += 1
+            return False
+        self._confirmed[claims["jti"]] = claims.get("exp", 0)
+        return True
+
+    async def revoke_token(self, db: AsyncSession, claims: Dict[str, Any]):
+        """Revoke one token until it expires"""
+        jti = claims.get("jti")
+        if jti is None:
+            return
+        now = _utcnow()
+        expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc) if "exp" in claims else (
+            now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        await db.execute(insert(TokenRevocation).values(jti=jti, revoked_at=now, expires_at=expires_at))
+        await db.commit()
+        self._add_token(jti)
+
+    async def revoke_user(self, db: AsyncSession, user_id: uuid.UUID):
+        """Revoke every access and refresh token issued to a user so far"""
+        now = _utcnow()
+        await db.execute(insert(TokenRevocation).values(
+            user_id=user_id, revoked_at=now,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        await db.commit()
+        self._add_user(str(user_id), _epoch(now))
+
+    def _add_token(self, jti: str):
+        self._bloom.add(jti.encode('ascii'))
+
+    def _add_user(self, user_id: str, revoked_at: float):
+        if revoked_at > self._users.get(user_id, 0.0):
+            self._users[user_id] = revoked_at
+
+    def _apply(self, rows):
+        for jti, user_id, revoked_at in rows:
+            if jti is not None:
+                self._add_token(jti)
+            if user_id is not None:
+                self._add_user(str(user_id), _epoch(revoked_at))
+
+    def start(self):
+        """Load current revocations in the background and keep them in sync"""
+        if self._task is None:
+            self._loaded = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def wait_loaded(self):
+        """Wait for the first full load; until then unseen revocations are not enforced"""
+        if self._loaded is not None:
+            await self._loaded.wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _load(self):
+        """First rebuild, retried with backoff so an unreachable database does not stop the worker"""
+        delay = min(0.5, settings.REVOCATION_SYNC_SECONDS)
+        while True:
+            try:
+                await self._rebuild()
+                break
+            except Exception:
+                self.sync_errors += 1
+                logger.warning("Loading token revocations failed; retrying in %ss", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.REVOCATION_SYNC_SECONDS)
+        self._loaded.set()
+
+    async def _run(self):
+        await self._load()
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                rebuild_due = time.monotonic() - self._rebuilt_at >= settings.REVOCATION_REBUILD_SECONDS
+                if rebuild_due or self._bloom.full:
+                    await self._rebuild()
+                else:
+                    await self._sync()
+            except Exception:
+                self.sync_errors += 1
+                logger.warning("Token revocation sync failed", exc_info=True)
+
+    async def _sync(self):
+        """Apply rows written since the last sync"""
+        started = _utcnow()
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(TokenRevocation.jti, TokenRevocation.user_id, TokenRevocation.revoked_at)
+                .where(TokenRevocation.revoked_at >= self._synced_from)
+            )
+            self._apply(result.all())
+        # Overlap by one interval so rows committed late or stamped by a skewed clock are not missed
+        self._synced_from = started - timedelta(seconds=settings.REVOCATION_SYNC_SECONDS)
+        self.syncs += 1
+
+    async def _rebuild(self):
+        """Purge expired rows and reload everything into a fresh filter"""
+        started = _utcnow()
+        async with SessionLocal() as db:
+            await db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at < started))
+            await db.commit()
+            result = await db.execute(
+                select(TokenRevocation.jti, TokenRevocation.user_id, TokenRevocation.revoked_at)
+            )
+            rows = result.all()
+
+        previous_users = self._users
+        self._bloom = self._new_bloom(len(rows))
+        self._users = {}
+        now = time.time()
+        self._confirmed = {jti: exp for jti, exp in self._confirmed.items() if exp > now}
+        self._apply(rows)
+        # Keep revocations made locally while the query ran, unless they have outlived every token
+        oldest = now - settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+        for user_id, revoked_at in previous_users.items():
+            if revoked_at > oldest:
+                self._add_user(user_id, revoked_at)
+        self._synced_from = started - timedelta(seconds=settings.REVOCATION_SYNC_SECONDS)
+        self._rebuilt_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{f"filter_{key}": value for key, value in self._bloom.stats().items()},
+            "loaded": self._loaded is not None and self._loaded.is_set(),
+            "revoked_users": len(self._users),
+            "confirmed_tokens": len(self._confirmed),
+            "filter_hits": self.filter_hits,
+            "false_positives": self.false_positives,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors
+        }
+
+# Create service instance
+revocation_service = RevocationService()
@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import MetaData, Table, Uuid, and_, bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .crypto_service import _rewrap_batch_job, crypto_service
+from .executor_service import executor_service
+from .key_service import ManagedKey, key_service
+from ..database import SessionLocal, engine
+from ..models import KeyRotation
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("pending", "running")
+# Longest a batch waits for busy request pools before going ahead anyway
+BUSY_WAIT_SECONDS = 0.25
+
+
+class RotationTarget(NamedTuple):
+    table: str
+    id_column: str
+    data_column: str
+    key_column: Optional[str] = None
+
+
+class _LeaseLost(Exception):
+    """The job was cancelled or taken over by another worker mid-batch"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def parse_target(entry: str) -> RotationTarget:
+    parts = entry.split(":")
+    if len(parts) not in (3, 4) or not all(parts):
+        raise ValueError(f"Invalid rotation target {entry!r}; expected table:id_column:data_column[:key_id_column]")
+    return RotationTarget(*parts)
+
+
+class RotationService:
+    """Background runner for key-rotation jobs (rows in key_rotations)
+
+    A job re-encrypts one ROTATION_TARGETS column from an old key to a new
+    one. Rows are read in id order, ROTATION_BATCH_SIZE at a time, rewrapped
+    on the low-priority rotation process pool and written back with one
+    executemany. The rows and the job's checkpoint are committed together,
+    so after a crash the job resumes at the first unwritten row.
+
+    Every API worker runs a runner. Jobs are claimed with a lease renewed at
+    each checkpoint; a job whose lease lapses is picked up by the next poll.
+    """
+
+    def __init__(self):
+        self.enabled = settings.ROTATION_ENABLED
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.targets = {entry: parse_target(entry) for entry in settings.ROTATION_TARGETS}
+        self._task: Optional[asyncio.Task] = None
+        self._job_id: Optional[uuid.UUID] = None
+        self._wake = asyncio.Event()
+
+        # Runner metrics
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.batches = 0
+        self.rows_rewrapped = 0
+        self.rows_failed = 0
+        self.throttled_seconds = 0.0
+        self.busy_waits = 0
+
+    async def create(self, db: AsyncSession, user_id: uuid.UUID, old_key_id: str, new_key_id: str,
+                     target: str, reason: Optional[str] = None) -> KeyRotation:
+        """Queue a rotation of the caller's old key to their new key over a configured target"""
+        if target not in self.targets:
+            raise ValueError(f"Unknown rotation target: {target}")
+        old_key = await key_service.load_for_rotation(db, old_key_id, user_id)
+        new_key = await key_service.resolve_async(db, new_key_id, user_id)
+        for key in (old_key, new_key):
+            if key.algorithm not in crypto_service.decrypt_algorithms:
+                raise ValueError(f"{key.algorithm} keys cannot be rotated")
+        if old_key.id == new_key.id:
+            raise ValueError("old_key_id and new_key_id must differ")
+        running = await db.scalar(select(KeyRotation.id).where(
+            KeyRotation.old_key_id == old_key.id,
+            KeyRotation.target == target,
+            KeyRotation.status.in_(ACTIVE_STATUSES)
+        ))
+        if running is not None:
+            raise ValueError(f"Rotation {running} is already moving this key off {target}")
+
+        job = KeyRotation(
+            old_key_id=old_key.id,
+            new_key_id=new_key.id,
+            rotation_reason=reason,
+            rotated_by=user_id,
+            target=target,
+            status="pending"
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        self._wake.set()
+        return job
+
+    async def get(self, db: AsyncSession, job_id: uuid.UUID, user_id: uuid.UUID) -> KeyRotation:
+        job = await db.scalar(select(KeyRotation).where(
+            KeyRotation.id == job_id, KeyRotation.rotated_by == user_id
+        ))
+        if job is None:
+            raise ValueError("Rotation not found")
+        return job
+
+    async def list_jobs(self, db: AsyncSession, user_id: uuid.UUID) -> List[KeyRotation]:
+        """A user's rotations, newest first"""
+        result = await db.scalars(select(KeyRotation).where(
+            KeyRotation.rotated_by == user_id
+        ).order_by(KeyRotation.rotated_at.desc()))
+        return list(result)
+
+    async def cancel(self, db: AsyncSession, job_id: uuid.UUID, user_id: uuid.UUID) -> KeyRotation:
+        """Stop a job; batches already written stay rewrapped"""
+        job = await self.get(db, job_id, user_id)
+        if job.status not in ACTIVE_STATUSES:
+            raise ValueError(f"Rotation is already {job.status}")
+        job.status = "cancelled"
+        job.completed_at = _utcnow()
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    def progress(self, job: KeyRotation) -> Dict[str, Any]:
+        """A job's row plus completion percentage, throughput and ETA"""
+        processed = job.rows_done + job.rows_skipped + job.rows_failed
+        percent = eta = rate = None
+        if job.rows_total:
+            percent = round(min(100.0, 100.0 * processed / job.rows_total), 2)
+        started_at, heartbeat_at = _aware(job.started_at), _aware(job.heartbeat_at)
+        if started_at is not None and heartbeat_at is not None and heartbeat_at > started_at:
+            rate = processed / (heartbeat_at - started_at).total_seconds()
+            if job.status == "running" and job.rows_total and rate > 0:
+                eta = round(max(job.rows_total - processed, 0) / rate, 1)
+        return {
+            **{column.name: getattr(job, column.name) for column in KeyRotation.__table__.columns
+               if column.name not in ("worker", "last_id")},
+            "rows_processed": processed,
+            "percent_complete": percent,
+            "rows_per_second": round(rate, 1) if rate is not None else None,
+            "eta_seconds": eta
+        }
+
+    def start(self):
+        """Poll for claimable jobs every ROTATION_POLL_SECONDS"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._job_id is not None:
+            # Hand the job back so another worker resumes it without waiting out the lease
+            async with engine.begin() as connection:
+                await connection.execute(update(KeyRotation).where(
+                    KeyRotation.id == self._job_id,
+                    KeyRotation.worker == self.worker_id,
+                    KeyRotation.status == "running"
+                ).values(status="pending", worker=None))
+            self._job_id = None
+
+    async def _run(self):
+        while True:
+            try:
+                job_id = await self._claim()
+                if job_id is not None:
+                    await self._execute(job_id)
+                    continue
+            except Exception:
+                logger.warning("Key rotation runner failed", exc_info=True)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.ROTATION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claimable(self, now: datetime):
+        stale = now - timedelta(seconds=settings.ROTATION_LEASE_SECONDS)
+        return or_(
+            KeyRotation.status == "pending",
+            and_(KeyRotation.status == "running", KeyRotation.heartbeat_at < stale)
+        )
+
+    async def _claim(self) -> Optional[uuid.UUID]:
+        """Take the oldest pending (or abandoned) job; the conditional UPDATE settles races between workers"""
+        now = _utcnow()
+        async with engine.begin() as connection:
+            candidates = (await connection.scalars(
+                select(KeyRotation.id).where(self._claimable(now)).order_by(KeyRotation.rotated_at).limit(5)
+            )).all()
+            for job_id in candidates:
+                result = await connection.execute(
+                    update(KeyRotation).where(KeyRotation.id == job_id, self._claimable(now)).values(
+                        status="running",
+                        worker=self.worker_id,
+                        heartbeat_at=now,
+                        started_at=func.coalesce(KeyRotation.started_at, now)
+                    )
+                )
+                if result.rowcount == 1:
+                    return job_id
+        return None
+
+    async def _execute(self, job_id: uuid.UUID):
+        self._job_id = job_id
+        cancelled = False
+        try:
+            async with SessionLocal() as db:
+                job = await db.get(KeyRotation, job_id)
+                old_key = await key_service.load_for_rotation(db, job.old_key_id, job.rotated_by)
+                new_key = await key_service.load_for_rotation(db, job.new_key_id, job.rotated_by)
+            await self._rotate(job, old_key, new_key)
+        except _LeaseLost:
+            logger.info("Rotation %s was cancelled or taken over", job_id)
+        except asyncio.CancelledError:
+            # stop() hands the job back
+            cancelled = True
+            raise
+        except Exception as e:
+            self.jobs_failed += 1
+            logger.exception("Rotation %s failed", job_id)
+            await self._finish(job_id, "failed", error=str(e) or type(e).__name__)
+        finally:
+            if not cancelled:
+                self._job_id = None
+
+    async def _rotate(self, job: KeyRotation, old_key: ManagedKey, new_key: ManagedKey):
+        if job.target not in self.targets:
+            raise ValueError(f"Rotation target {job.target} is no longer configured")
+        target = self.targets[job.target]
+        async with engine.connect() as connection:
+            table = await connection.run_sync(
+                lambda sync_connection: Table(target.table, MetaData(), autoload_with=sync_connection)
+            )
+        id_column, data_column = table.c[target.id_column], table.c[target.data_column]
+        key_column = table.c[target.key_column] if target.key_column else None
+
+        query = select(id_column, data_column).where(data_column.is_not(None))
+        old_key_value = new_key_value = None
+        if key_column is not None:
+            # Key ID columns hold either native UUIDs or the strings the API hands out
+            native = isinstance(key_column.type, Uuid)
+            old_key_value = old_key.id if native else str(old_key.id)
+            new_key_value = new_key.id if native else str(new_key.id)
+            query = query.where(key_column == old_key_value)
+
+        if job.rows_total is None:
+            async with engine.connect() as connection:
+                job.rows_total = await connection.scalar(select(func.count()).select_from(query.subquery()))
+
+        values = {target.data_column: bindparam("b_data")}
+        if key_column is not None:
+            values[target.key_column] = new_key_value
+        write = update(table).where(
+            id_column == bindparam("b_id"),
+            # Compare-and-set: a row rewritten since it was read is left alone
+            data_column == bindparam("b_old")
+        ).values(values)
+
+        last_id = self._cursor_value(id_column, job.last_id)
+        chunk_size = max(1, settings.ROTATION_CHUNK_SIZE)
+        while True:
+            batch_started = time.perf_counter()
+            await self._yield_to_requests()
+            batch_query = query if last_id is None else query.where(id_column > last_id)
+            async with engine.connect() as connection:
+                rows = [tuple(row) for row in (await connection.execute(
+                    batch_query.order_by(id_column).limit(settings.ROTATION_BATCH_SIZE)
+                )).all()]
+            if not rows:
+                await self._finish(job.id, "completed", rows_total=job.rows_total)
+                self.jobs_completed += 1
+                logger.info("Rotation %s completed: %d rows rewrapped", job.id, job.rows_done)
+                return
+
+            futures = crypto_service._submit_all(
+                (executor_service.rotation, _rewrap_batch_job, rows[start:start + chunk_size], old_key, new_key)
+                for start in range(0, len(rows), chunk_size)
+            )
+            chunks = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+            originals = dict(rows)
+            writes, failed, first_error = [], 0, None
+            for chunk in chunks:
+                for row_id, rewrapped, error in chunk:
+                    if error is None:
+                        writes.append({"b_id": row_id, "b_old": originals[row_id], "b_data": rewrapped})
+                    else:
+                        failed += 1
+                        first_error = first_error or error
+            # Without a key column, rows under other keys are expected and only skipped
+            skipped = failed if key_column is None else 0
+            failed -= skipped
+
+            last_id = rows[-1][0]
+            job.rows_done += len(writes)
+            job.rows_skipped += skipped
+            job.rows_failed += failed
+            async with engine.begin() as connection:
+                checkpoint = await connection.execute(update(KeyRotation).where(
+                    KeyRotation.id == job.id,
+                    KeyRotation.worker == self.worker_id,
+                    KeyRotation.status == "running"
+                ).values(
+                    last_id=str(last_id),
+                    rows_total=job.rows_total,
+                    rows_done=job.rows_done,
+                    rows_skipped=job.rows_skipped,
+                    rows_failed=job.rows_failed,
+                    error=first_error if failed else KeyRotation.error,
+                    heartbeat_at=_utcnow()
+                ))
+                if checkpoint.rowcount != 1:
+                    raise _LeaseLost()
+                if writes:
+                    await connection.execute(write, writes)
+            self.batches += 1
+            self.rows_rewrapped += len(writes)
+            self.rows_failed += failed
+            await self._throttle(len(rows), time.perf_counter() - batch_started)
+
+    def _cursor_value(self, column, value: Optional[str]) -> Any:
+        """Turn a stored checkpoint back into a value comparable with the id column"""
+        if value is None:
+            return None
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
+        if python_type is int:
+            return int(value)
+        if python_type is uuid.UUID:
+            return uuid.UUID(value)
+        return value
+
+    async def _yield_to_requests(self):
+        """Hold a batch back while request traffic is queueing on the crypto pools"""
+        waited = 0.0
+        while waited < settings.ROTATION_LEASE_SECONDS / 2 and any(
+            pool.inflight > pool.max_workers for pool in (executor_service.crypto, executor_service.cpu)
+        ):
+            await asyncio.sleep(BUSY_WAIT_SECONDS)
+            waited += BUSY_WAIT_SECONDS
+        if waited:
+            self.busy_waits += 1
+            self.throttled_seconds += waited
+
+    async def _throttle(self, rows: int, elapsed: float):
+        """Sleep off the rest of the batch's ROTATION_MAX_ROWS_PER_SECOND budget"""
+        if settings.ROTATION_MAX_ROWS_PER_SECOND <= 0:
+            return
+        delay = rows / settings.ROTATION_MAX_ROWS_PER_SECOND - elapsed
+        if delay > 0:
+            self.throttled_seconds += delay
+            await asyncio.sleep(delay)
+
+    async def _finish(self, job_id: uuid.UUID, status: str, **values):
+        now = _utcnow()
+        async with engine.begin() as connection:
+            await connection.execute(update(KeyRotation).where(
+                KeyRotation.id == job_id,
+                KeyRotation.worker == self.worker_id,
+                KeyRotation.status == "running"
+            ).values(status=status, completed_at=now, heartbeat_at=now, **values))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "targets": len(self.targets),
+            "active": 1 if self._job_id is not None else 0,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "batches": self.batches,
+            "rows_rewrapped": self.rows_rewrapped,
+            "rows_failed": self.rows_failed,
+            "busy_waits": self.busy_waits,
+            "throttled_seconds": round(self.throttled_seconds, 6)
+        }
+
+# Create service instance
+rotation_service = RotationService()
@@ -0,0 +1,205 @@
+import os
+import struct
+from typing import AsyncIterator, Callable, Optional
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from fastapi.responses import StreamingResponse
+
+from .crypto_service import crypto_service
+from .executor_service import executor_service
+from ..utils.config import settings
+from ..utils.metrics import crypto_metrics
+
+# Stream header: magic, version, algorithm id, plaintext segment size, nonce prefix
+STREAM_MAGIC = b"CCS"
+STREAM_VERSION = 1
+HEADER_FORMAT = ">3sBBI7s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+MAX_SEGMENTS = 2 ** 32
+MAX_SEGMENT_SIZE = 16 * 1024 * 1024
+
+STREAM_ALGORITHMS = {
+    "aes-256-gcm": (1, AESGCM),
+    "chacha20-poly1305": (2, ChaCha20Poly1305),
+}
+ALGORITHM_IDS = {algorithm_id: name for name, (algorithm_id, _) in STREAM_ALGORITHMS.items()}
+
+
+class StreamError(ValueError):
+    """Raised when a stream is malformed, truncated or fails authentication"""
+
+
+def segment_nonce(nonce_prefix: bytes, counter: int, last: bool) -> bytes:
+    """Nonce for one segment: prefix || 32-bit counter || final-segment flag"""
+    return nonce_prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+
+class StreamEncryptor:
+    """Seals a plaintext stream as independently authenticated segments
+
+    Follows the STREAM construction: every segment nonce carries its index and
+    a final-segment flag, and the header is bound into each segment as
+    associated data, so segments cannot be reordered, dropped or truncated
+    without failing authentication.
+    """
+
+    def __init__(self, algorithm: str, key: bytes, segment_size: int,
+                 nonce_prefix: Optional[bytes] = None):
+        if algorithm not in STREAM_ALGORITHMS:
+            raise StreamError(f"Unsupported streaming algorithm: {algorithm}")
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise StreamError(f"Invalid stream segment size: {segment_size}")
+        algorithm_id, aead_class = STREAM_ALGORITHMS[algorithm]
+        self.algorithm = algorithm
+        self.segment_size = segment_size
+        self.nonce_prefix = nonce_prefix or os.urandom(NONCE_PREFIX_SIZE)
+        self.header = struct.pack(
+            HEADER_FORMAT, STREAM_MAGIC, STREAM_VERSION, algorithm_id, segment_size, self.nonce_prefix
+        )
+        self._aead = aead_class(key)
+        self._counter = 0
+        self._finished = False
+
+    def seal(self, plaintext: bytes, last: bool = False) -> bytes:
+        """Encrypt the next segment"""
+        if self._finished:
+            raise StreamError("Stream already finalized")
+        if self._counter >= MAX_SEGMENTS:
+            raise StreamError("Stream exceeds maximum segment count")
+        nonce = segment_nonce(self.nonce_prefix, self._counter, last)
+        self._counter += 1
+        self._finished = last
+        return self._aead.encrypt(nonce, plaintext, self.header)
+
+
+class StreamDecryptor:
+    """Opens segments produced by StreamEncryptor in order"""
+
+    def __init__(self, header: bytes, key: bytes):
+        if len(header) != HEADER_SIZE:
+            raise StreamError("Truncated stream header")
+        magic, version, algorithm_id, segment_size, nonce_prefix = struct.unpack(HEADER_FORMAT, header)
+        if magic != STREAM_MAGIC or version != STREAM_VERSION:
+            raise StreamError("Not a CipherCanary stream")
+        if algorithm_id not in ALGORITHM_IDS:
+            raise StreamError(f"Unknown stream algorithm id: {algorithm_id}")
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            # Bounds the decrypt buffer regardless of what the header claims
+            raise StreamError(f"Invalid stream segment size: {segment_size}")
+        self.algorithm = ALGORITHM_IDS[algorithm_id]
+        self.segment_size = segment_size
+        self.nonce_prefix = nonce_prefix
+        self.header = header
+        self._aead = STREAM_ALGORITHMS[self.algorithm][1](key)
+        self._counter = 0
+        self._finished = False
+
+    @property
+    def sealed_segment_size(self) -> int:
+        return self.segment_size + TAG_SIZE
+
+    def open(self, ciphertext: bytes, last: bool = False) -> bytes:
+        """Decrypt and authenticate the next segment"""
+        if self._finished:
+            raise StreamError("Data after final segment")
+        nonce = segment_nonce(self.nonce_prefix, self._counter, last)
+        self._counter += 1
+        self._finished = last
+        try:
+            return self._aead.decrypt(nonce, ciphertext, self.header)
+        except Exception:
+            raise StreamError(f"Segment {self._counter - 1} failed authentication")
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves receive() to the request body reader
+
+    The stock response listens for client disconnects on receive(), which
+    swallows body chunks when the response itself is produced from
+    request.stream(). A disconnect still surfaces as ClientDisconnect from
+    the body iterator.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class StreamService:
+    """Constant-memory streaming encryption over async byte iterators"""
+
+    def __init__(self):
+        self.segment_size = settings.STREAM_SEGMENT_SIZE
+
+    def resolve_key(self, encoded_key: Optional[str], generate: bool = True) -> bytes:
+        """Decode a base64 stream key, generating a fresh one if none was given"""
+        if not encoded_key:
+            if not generate:
+                raise StreamError("Stream key is required")
+            return os.urandom(32)
+        try:
+            return crypto_service.decode_key(encoded_key)
+        except ValueError as e:
+            raise StreamError(str(e))
+
+    def managed_key_material(self, managed_key, algorithm: Optional[str] = None) -> bytes:
+        """Raw material of a stored symmetric key for segment sealing"""
+        if managed_key.algorithm not in STREAM_ALGORITHMS:
+            raise StreamError(f"Key {managed_key.id} is not a streaming-capable symmetric key")
+        if algorithm is not None and managed_key.algorithm != algorithm:
+            raise StreamError(f"Key {managed_key.id} is a {managed_key.algorithm} key, not {algorithm}")
+        return managed_key.copy_material()
+
+    async def encrypt_stream(self, chunks: AsyncIterator[bytes], encryptor: StreamEncryptor) -> AsyncIterator[bytes]:
+        """Yield the header and then one sealed segment per full plaintext segment"""
+        yield encryptor.header
+        segment_size = encryptor.segment_size
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            # Keep at least one byte back so the final segment is known
+            while len(buffer) > segment_size:
+                segment = bytes(buffer[:segment_size])
+                del buffer[:segment_size]
+                sealed = await executor_service.crypto.run(encryptor.seal, segment, False)
+                crypto_metrics.count_bytes("encrypt_stream", encryptor.algorithm, len(segment), len(sealed))
+                yield sealed
+        sealed = await executor_service.crypto.run(encryptor.seal, bytes(buffer), True)
+        crypto_metrics.count_bytes("encrypt_stream", encryptor.algorithm, len(buffer), len(sealed))
+        yield sealed
+
+    async def decrypt_stream(self, chunks: AsyncIterator[bytes], key: bytes,
+                             on_header: Optional[Callable[[StreamDecryptor], None]] = None) -> AsyncIterator[bytes]:
+        """Authenticate and yield plaintext segment by segment"""
+        buffer = bytearray()
+        decryptor = None
+        async for chunk in chunks:
+            buffer += chunk
+            if decryptor is None:
+                if len(buffer) < HEADER_SIZE:
+                    continue
+                decryptor = StreamDecryptor(bytes(buffer[:HEADER_SIZE]), key)
+                del buffer[:HEADER_SIZE]
+                if on_header is not None:
+                    on_header(decryptor)
+            sealed_size = decryptor.sealed_segment_size
+            while len(buffer) > sealed_size:
+                segment = bytes(buffer[:sealed_size])
+                del buffer[:sealed_size]
+                plaintext = await executor_service.crypto.run(decryptor.open, segment, False)
+                crypto_metrics.count_bytes("decrypt_stream", decryptor.algorithm, len(segment), len(plaintext))
+                yield plaintext
+
+        if decryptor is None:
+            raise StreamError("Truncated stream header")
+        if len(buffer) < TAG_SIZE:
+            raise StreamError("Stream truncated before final segment")
+        plaintext = await executor_service.crypto.run(decryptor.open, bytes(buffer), True)
+        crypto_metrics.count_bytes("decrypt_stream", decryptor.algorithm, len(buffer), len(plaintext))
+        yield plaintext
+
+# Create service instance
+stream_service = StreamService()
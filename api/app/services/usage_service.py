@@ -0,0 +1,189 @@
+"""Per-day usage rollups over encryption_operations
+
+Run as a module to backfill rollups from existing operations:
+
+    python -m app.services.usage_service [--since 2026-01-01] [--until 2026-10-18]
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..database import engine
+from ..models import EncryptionOperation, UsageRollup
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ("user_id", "day", "algorithm", "operation_type")
+COUNTERS = ("operations", "failed", "bytes_in", "bytes_out")
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+RollupKey = Tuple[Any, date, str, str]
+
+
+def _day(value: datetime) -> date:
+    """UTC calendar day of a timestamp; naive values are UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+class UsageService:
+    """Keeps usage_rollups in step with encryption_operations and answers stats queries
+
+    The audit writer calls apply() with every flushed batch of operations, in
+    the same transaction that writes them, so the rollups never drift from
+    the rows they summarise. Reads touch one rollup row per (user, day,
+    algorithm, operation), however long the history is.
+    """
+
+    def __init__(self):
+        self.enabled = settings.USAGE_ROLLUPS_ENABLED
+
+    def aggregate(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fold encryption_operations rows into rollup increments"""
+        totals: Dict[RollupKey, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["user_id"], _day(row["created_at"]), row["algorithm"], row["operation_type"])
+            counters = totals.get(key)
+            if counters is None:
+                counters = totals[key] = dict(zip(ROLLUP_KEY, key), operations=0, failed=0, bytes_in=0, bytes_out=0)
+            counters["operations"] += 1
+            if row.get("status") == "failed":
+                counters["failed"] += 1
+            counters["bytes_in"] += row.get("bytes_in") or 0
+            counters["bytes_out"] += row.get("bytes_out") or 0
+        return list(totals.values())
+
+    async def apply(self, connection: AsyncConnection, rows: List[Dict[str, Any]]):
+        """Add a batch of operations to the rollups with one upsert"""
+        if not self.enabled or not rows:
+            return
+        dialect_insert = DIALECT_INSERTS.get(connection.dialect.name)
+        if dialect_insert is None:
+            raise ValueError(f"Usage rollups are not supported on {connection.dialect.name}")
+        statement = dialect_insert(UsageRollup.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={name: UsageRollup.__table__.c[name] + statement.excluded[name] for name in COUNTERS}
+        )
+        await connection.execute(statement, self.aggregate(rows))
+
+    async def usage(self, db: AsyncSession, since: date, until: date,
+                    user_id: Optional[uuid.UUID] = None, algorithm: Optional[str] = None) -> Dict[str, Any]:
+        """Daily counters for ``since``..``until`` inclusive, for one user or everyone"""
+        if until < since:
+            raise ValueError("until must not be before since")
+        if (until - since).days >= settings.USAGE_STATS_MAX_DAYS:
+            raise ValueError(f"At most {settings.USAGE_STATS_MAX_DAYS} days can be requested")
+
+        query = select(
+            UsageRollup.day, UsageRollup.algorithm, UsageRollup.operation_type,
+            *(func.sum(getattr(UsageRollup, name)).label(name) for name in COUNTERS)
+        ).where(UsageRollup.day >= since, UsageRollup.day <= until)
+        if user_id is not None:
+            query = query.where(UsageRollup.user_id == user_id)
+        if algorithm is not None:
+            query = query.where(UsageRollup.algorithm == algorithm)
+        query = query.group_by(UsageRollup.day, UsageRollup.algorithm, UsageRollup.operation_type)
+        days = [row._asdict() for row in (await db.execute(
+            query.order_by(UsageRollup.day, UsageRollup.algorithm, UsageRollup.operation_type)
+        )).all()]
+
+        totals = dict.fromkeys(COUNTERS, 0)
+        by_algorithm: Dict[str, Dict[str, int]] = {}
+        for row in days:
+            per_algorithm = by_algorithm.setdefault(row["algorithm"], dict.fromkeys(COUNTERS, 0))
+            for name in COUNTERS:
+                row[name] = int(row[name] or 0)
+                totals[name] += row[name]
+                per_algorithm[name] += row[name]
+        return {
+            "since": since,
+            "until": until,
+            "user_id": user_id,
+            "days": days,
+            "by_algorithm": by_algorithm,
+            "totals": totals
+        }
+
+    async def backfill(self, since: Optional[date] = None, until: Optional[date] = None) -> int:
+        """Rebuild rollups from encryption_operations for days in [since, until)
+
+        Each day is recomputed in its own transaction. On PostgreSQL the
+        rollup table is locked for that transaction, so audit flushes wait
+        instead of racing the rebuild; they resume a moment later.
+        """
+        if since is None:
+            async with engine.connect() as connection:
+                first = await connection.scalar(select(func.min(EncryptionOperation.created_at)))
+            if first is None:
+                return 0
+            since = _day(first)
+        if until is None:
+            until = datetime.now(timezone.utc).date() + timedelta(days=1)
+
+        rebuilt = 0
+        day = since
+        while day < until:
+            start = _day_start(day)
+            operations = select(
+                EncryptionOperation.user_id,
+                literal(day, UsageRollup.day.type),
+                EncryptionOperation.algorithm,
+                EncryptionOperation.operation_type,
+                func.count(),
+                func.sum(case((EncryptionOperation.status == "failed", 1), else_=0)),
+                func.coalesce(func.sum(EncryptionOperation.bytes_in), 0),
+                func.coalesce(func.sum(EncryptionOperation.bytes_out), 0)
+            ).where(
+                EncryptionOperation.created_at >= start,
+                EncryptionOperation.created_at < start + timedelta(days=1),
+                EncryptionOperation.user_id.is_not(None)
+            ).group_by(
+                EncryptionOperation.user_id, EncryptionOperation.algorithm, EncryptionOperation.operation_type
+            )
+            async with engine.begin() as connection:
+                if connection.dialect.name == "postgresql":
+                    await connection.execute(text("LOCK TABLE usage_rollups IN EXCLUSIVE MODE"))
+                await connection.execute(delete(UsageRollup).where(UsageRollup.day == day))
+                result = await connection.execute(
+                    insert(UsageRollup).from_select(list(ROLLUP_KEY) + list(COUNTERS), operations)
+                )
+            rebuilt += max(result.rowcount, 0)
+            day += timedelta(days=1)
+        return rebuilt
+
+# Create service instance
+usage_service = UsageService()
+
+
+async def _backfill(since: Optional[date], until: Optional[date]):
+    try:
+        rows = await usage_service.backfill(since, until)
+    finally:
+        await engine.dispose()
+    logger.info("Rebuilt %d usage rollup rows", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild usage_rollups from encryption_operations")
+    parser.add_argument("--since", type=date.fromisoformat, help="first UTC day (default: oldest operation)")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last one (default: tomorrow)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_backfill(args.since, args.until))
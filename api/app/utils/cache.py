@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe size-bounded LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Cache metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry and mark it recently used"""
+        evicted = None
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                evicted = value
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+        self._notify(key, evicted)
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Insert an entry, evicting the least recently used when full"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        evicted = []
+        with self._lock:
+            # Replacing an entry is not counted as an eviction, but the old value is still let go
+            entry = self._data.pop(key, _MISSING)
+            if entry is not _MISSING and entry[0] is not value:
+                evicted.append((key, entry[0]))
+            self._data[key] = (value, time.monotonic() + ttl)
+            while len(self._data) > self.maxsize:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._notify(old_key, old_value)
+
+    def pop(self, key: Hashable) -> Any:
+        """Explicitly invalidate an entry"""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            if entry is _MISSING:
+                return None
+            self.invalidations += 1
+        self._notify(key, entry[0])
+        return entry[0]
+
+    def clear(self):
+        """Invalidate every entry"""
+        with self._lock:
+            entries = list(self._data.items())
+            self._data.clear()
+            self.invalidations += len(entries)
+        for key, (value, _) in entries:
+            self._notify(key, value)
+
+    def _notify(self, key: Hashable, value: Any):
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
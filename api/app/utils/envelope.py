@@ -0,0 +1,114 @@
+"""Compact binary envelope for application/octet-stream encrypt/decrypt
+
+Layout (all lengths in bytes)::
+
+    magic "CCE" (3) | version (1) | algorithm id (1) | key id length (1)
+    | nonce length (1) | tag length (1) | key id | nonce | ciphertext | tag
+
+Version 2 envelopes are sealed under a data key rather than the key named
+by key id, which is the master key that wrapped it. They add the wrapped
+data key::
+
+    ... | tag length (1) | wrapped key length (2) | key id | wrapped key | nonce | ...
+
+The tag is stored last so that ``ciphertext || tag`` is one contiguous slice,
+which is exactly what the one-shot AEAD APIs take; parsing hands out
+memoryview slices of the request body and never copies the payload.
+"""
+import struct
+from typing import NamedTuple, Optional, Union
+
+ENVELOPE_MAGIC = b"CCE"
+ENVELOPE_VERSION = 1
+DATA_KEY_ENVELOPE_VERSION = 2
+HEADER_FORMAT = ">3sBBBBB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+WRAPPED_KEY_LENGTH_FORMAT = ">H"
+WRAPPED_KEY_LENGTH_SIZE = struct.calcsize(WRAPPED_KEY_LENGTH_FORMAT)
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+ALGORITHM_IDS = {
+    "aes-256-gcm": 1,
+    "chacha20-poly1305": 2,
+    "rsa-4096": 3,
+    "ed25519": 4,
+}
+ALGORITHM_NAMES = {algorithm_id: name for name, algorithm_id in ALGORITHM_IDS.items()}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class EnvelopeError(ValueError):
+    """Raised when an envelope is malformed"""
+
+
+class Envelope(NamedTuple):
+    algorithm: str
+    key_id: Optional[str]
+    nonce: memoryview
+    ciphertext: memoryview
+    tag: memoryview
+    sealed: memoryview  # ciphertext || tag
+    wrapped_key: Optional[memoryview] = None  # data key under the key_id master key (version 2)
+
+
+def pack_envelope(algorithm: str, key_id: Optional[str], nonce: Buffer, sealed: Buffer, tag_size: int,
+                  wrapped_key: Optional[Buffer] = None) -> bytes:
+    """Build an envelope from a nonce and ``ciphertext || tag``, with the wrapped data key if one was used"""
+    if algorithm not in ALGORITHM_IDS:
+        raise EnvelopeError(f"Unsupported algorithm: {algorithm}")
+    key_id_bytes = key_id.encode('utf-8') if key_id else b""
+    if len(key_id_bytes) > 255 or len(nonce) > 255 or tag_size > 255:
+        raise EnvelopeError("Envelope field too long")
+    if tag_size > len(sealed):
+        raise EnvelopeError("Tag longer than sealed data")
+    header = struct.pack(
+        HEADER_FORMAT, ENVELOPE_MAGIC, ENVELOPE_VERSION if wrapped_key is None else DATA_KEY_ENVELOPE_VERSION,
+        ALGORITHM_IDS[algorithm], len(key_id_bytes), len(nonce), tag_size
+    )
+    if wrapped_key is None:
+        return b"".join((header, key_id_bytes, nonce, sealed))
+    if not key_id_bytes or len(wrapped_key) > 0xFFFF:
+        raise EnvelopeError("Data-key envelopes need a key id and a wrapped key of at most 65535 bytes")
+    wrapped_key_size = struct.pack(WRAPPED_KEY_LENGTH_FORMAT, len(wrapped_key))
+    return b"".join((header, wrapped_key_size, key_id_bytes, wrapped_key, nonce, sealed))
+
+
+def parse_envelope(data: Buffer) -> Envelope:
+    """Parse an envelope into zero-copy memoryview slices"""
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        raise EnvelopeError("Truncated envelope header")
+    magic, version, algorithm_id, key_id_size, nonce_size, tag_size = struct.unpack_from(HEADER_FORMAT, view)
+    if magic != ENVELOPE_MAGIC:
+        raise EnvelopeError("Not a CipherCanary envelope")
+    if version not in (ENVELOPE_VERSION, DATA_KEY_ENVELOPE_VERSION):
+        raise EnvelopeError(f"Unsupported envelope version: {version}")
+    if algorithm_id not in ALGORITHM_NAMES:
+        raise EnvelopeError(f"Unknown algorithm id: {algorithm_id}")
+
+    key_id_start = HEADER_SIZE
+    wrapped_key_size = 0
+    if version == DATA_KEY_ENVELOPE_VERSION:
+        if len(view) < HEADER_SIZE + WRAPPED_KEY_LENGTH_SIZE:
+            raise EnvelopeError("Truncated envelope header")
+        wrapped_key_size, = struct.unpack_from(WRAPPED_KEY_LENGTH_FORMAT, view, HEADER_SIZE)
+        key_id_start += WRAPPED_KEY_LENGTH_SIZE
+    key_id_end = key_id_start + key_id_size
+    wrapped_key_end = key_id_end + wrapped_key_size
+    nonce_end = wrapped_key_end + nonce_size
+    if len(view) < nonce_end + tag_size:
+        raise EnvelopeError("Truncated envelope body")
+
+    sealed = view[nonce_end:]
+    tag_start = len(view) - tag_size
+    key_id = bytes(view[key_id_start:key_id_end]).decode('utf-8') if key_id_size else None
+    return Envelope(
+        algorithm=ALGORITHM_NAMES[algorithm_id],
+        key_id=key_id,
+        nonce=view[wrapped_key_end:nonce_end],
+        ciphertext=view[nonce_end:tag_start],
+        tag=view[tag_start:],
+        sealed=sealed,
+        wrapped_key=view[key_id_end:wrapped_key_end] if version == DATA_KEY_ENVELOPE_VERSION else None
+    )
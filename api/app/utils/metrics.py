@@ -0,0 +1,221 @@
+"""Prometheus metrics for the API
+
+Every label combination is bound on first sight and kept in plain dicts, so
+recording a sample is a couple of dict lookups plus the metric update
+itself, and /metrics only carries series that have been observed.
+Client-supplied algorithm names outside ALGORITHMS share the ``other``
+label, which keeps the label set bounded. Pool, queue and cache
+state is not recorded per request at all: it is read from the services'
+``stats()`` snapshots when /metrics is scraped.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from .config import settings
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ALGORITHMS = ("aes-256-gcm", "chacha20-poly1305", "aes-256-siv", "rsa-4096", "ed25519", "hmac-sha256")
+MIXED = "mixed"
+OTHER = "other"
+DEFAULT = "default"
+_CRYPTO_ALGORITHM_LABELS = frozenset(ALGORITHMS + (MIXED,))
+
+REQUEST_LATENCY = Histogram(
+    "ciphercanary_request_duration_seconds", "HTTP request latency",
+    ["route", "method", "algorithm"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+AUTH_LATENCY = Histogram(
+    "ciphercanary_auth_duration_seconds", "Time to resolve the authenticated principal",
+    ["cache"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+CRYPTO_LATENCY = Histogram(
+    "ciphercanary_crypto_duration_seconds", "Time spent in CryptoService, including executor queueing",
+    ["operation", "algorithm"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+CRYPTO_BYTES = Counter(
+    "ciphercanary_crypto_bytes", "Bytes processed by CryptoService",
+    ["operation", "algorithm", "direction"], registry=REGISTRY
+)
+DIGEST_LATENCY = Histogram(
+    "ciphercanary_digest_duration_seconds", "Time spent computing audit digests per operation",
+    ["algorithm"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+ERRORS = Counter(
+    "ciphercanary_errors", "Errors by source and exception type",
+    ["source", "exception"], registry=REGISTRY
+)
+
+AUTH_CACHE_HIT = AUTH_LATENCY.labels("hit")
+AUTH_CACHE_MISS = AUTH_LATENCY.labels("miss")
+DIGEST_DURATION = DIGEST_LATENCY.labels(settings.AUDIT_DIGEST_ALGORITHM)
+
+
+class _CryptoChildren:
+    __slots__ = ("latency", "bytes_in", "bytes_out")
+
+    def __init__(self, operation: str, algorithm: str):
+        self.latency = CRYPTO_LATENCY.labels(operation, algorithm)
+        self.bytes_in = CRYPTO_BYTES.labels(operation, algorithm, "in")
+        self.bytes_out = CRYPTO_BYTES.labels(operation, algorithm, "out")
+
+
+class CryptoMetrics:
+    """Latency and byte counters per crypto operation and algorithm"""
+
+    OPERATIONS = ("encrypt", "decrypt", "encrypt_batch", "decrypt_batch", "encrypt_stream", "decrypt_stream",
+                  "sign", "verify", "verify_batch", "blind_index", "blind_index_batch")
+
+    def __init__(self):
+        self._children: Dict[str, Dict[str, _CryptoChildren]] = {operation: {} for operation in self.OPERATIONS}
+
+    def _children_for(self, operation: str, algorithm: str) -> _CryptoChildren:
+        by_algorithm = self._children[operation]
+        children = by_algorithm.get(algorithm)
+        if children is None:
+            label = algorithm if algorithm in _CRYPTO_ALGORITHM_LABELS else OTHER
+            children = by_algorithm.get(label)
+            if children is None:
+                children = by_algorithm.setdefault(label, _CryptoChildren(operation, label))
+        return children
+
+    def observe(self, operation: str, algorithm: str, seconds: float, bytes_in: int, bytes_out: int):
+        children = self._children_for(operation, algorithm)
+        children.latency.observe(seconds)
+        children.bytes_in.inc(bytes_in)
+        children.bytes_out.inc(bytes_out)
+
+    def count_bytes(self, operation: str, algorithm: str, bytes_in: int, bytes_out: int):
+        """Byte counters only, for work that is timed elsewhere (stream segments)"""
+        children = self._children_for(operation, algorithm)
+        children.bytes_in.inc(bytes_in)
+        children.bytes_out.inc(bytes_out)
+
+
+class ErrorMetrics:
+    """Error counters keyed by source and exception class"""
+
+    def __init__(self):
+        self._children: Dict[str, Dict[type, Any]] = {}
+
+    def observe(self, source: str, exc: BaseException):
+        by_type = self._children.get(source)
+        if by_type is None:
+            by_type = self._children.setdefault(source, {})
+        child = by_type.get(type(exc))
+        if child is None:
+            child = by_type.setdefault(type(exc), ERRORS.labels(source, type(exc).__name__))
+        child.inc()
+
+
+def _query_algorithm(query_string: bytes) -> str:
+    """Label for the ``algorithm`` query parameter without decoding the query string"""
+    start = query_string.find(b"algorithm=")
+    while start > 0 and query_string[start - 1:start] != b"&":
+        start = query_string.find(b"algorithm=", start + 1)
+    if start < 0:
+        return DEFAULT
+    start += len(b"algorithm=")
+    end = query_string.find(b"&", start)
+    return _ALGORITHM_LABELS.get(query_string[start:end if end >= 0 else None], OTHER)
+
+_ALGORITHM_LABELS = {algorithm.encode('ascii'): algorithm for algorithm in ALGORITHMS}
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template, method and algorithm
+
+    Routes are indexed the first time the app serves a request, once every
+    route has been registered; each (route, method, algorithm) child is bound
+    the first time it is observed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Any, Dict[str, Any]]] = None
+        self._unmatched = REQUEST_LATENCY.labels("unmatched", "", "")
+
+    def _bind(self, routes: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        bound = {}
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            methods = getattr(route, "methods", None)
+            if endpoint is None or not methods:
+                continue
+            dependant = getattr(route, "dependant", None)
+            takes_algorithm = dependant is not None and any(
+                param.name == "algorithm" for param in dependant.query_params
+            )
+            bound[endpoint] = {method: (route.path, takes_algorithm, {}) for method in methods}
+        return bound
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._routes is None:
+            self._routes = self._bind(scope["app"].routes)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except Exception as e:
+            error_metrics.observe("unhandled", e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            methods = self._routes.get(scope.get("endpoint"))
+            bound = methods.get(scope["method"]) if methods is not None else None
+            if bound is None:
+                self._unmatched.observe(elapsed)
+            else:
+                path, takes_algorithm, children = bound
+                algorithm = _query_algorithm(scope["query_string"]) if takes_algorithm else ""
+                child = children.get(algorithm)
+                if child is None:
+                    child = children.setdefault(algorithm, REQUEST_LATENCY.labels(path, scope["method"], algorithm))
+                child.observe(elapsed)
+
+
+class StatsCollector:
+    """Exposes service ``stats()`` snapshots as gauges at scrape time"""
+
+    def __init__(self):
+        self._sources = []
+
+    def register(self, name: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+        """Add a stats source; with ``label``, stats() returns {label value: {metric: value}}"""
+        self._sources.append((name, stats, label))
+
+    def collect(self):
+        for name, stats, label in self._sources:
+            snapshot = stats()
+            groups = snapshot.items() if label else [(None, snapshot)]
+            families: Dict[str, GaugeMetricFamily] = {}
+            for label_value, values in groups:
+                for key, value in values.items():
+                    if not isinstance(value, (int, float)):
+                        continue
+                    family = families.get(key)
+                    if family is None:
+                        family = families[key] = GaugeMetricFamily(
+                            f"ciphercanary_{name}_{key}", f"{name} {key.replace('_', ' ')}",
+                            labels=[label] if label else None
+                        )
+                    family.add_metric([label_value] if label else [], float(value))
+            yield from families.values()
+
+
+def render_metrics() -> bytes:
+    return generate_latest(REGISTRY)
+
+# Create metric recorders
+crypto_metrics = CryptoMetrics()
+error_metrics = ErrorMetrics()
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
@@ -0,0 +1,45 @@
+"""bcrypt helpers run inside the password worker processes
+
+Kept free of app imports so a freshly spawned worker only loads passlib,
+and passlib itself is imported on first use so the API process, which
+only calls needs_update, does not load its bcrypt backend at startup.
+"""
+import math
+import time
+
+
+def hash_password(password: str, rounds: int) -> str:
+    from passlib.hash import bcrypt
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    from passlib.hash import bcrypt
+    try:
+        return bcrypt.verify(password, hashed_password)
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+
+def needs_update(hashed_password: str, rounds: int) -> bool:
+    """Whether a stored hash is below the current cost and should be replaced"""
+    from passlib.hash import bcrypt
+    try:
+        return bcrypt.from_string(hashed_password).rounds < rounds
+    except ValueError:
+        return False
+
+
+def calibrate_rounds(target_seconds: float, min_rounds: int, max_rounds: int) -> int:
+    """Highest cost whose verify time stays within target, measured on this machine"""
+    from passlib.hash import bcrypt
+    hashed_password = hash_password("calibration", min_rounds)
+    elapsed = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.verify("calibration", hashed_password)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    # Each extra round doubles the work
+    extra = math.floor(math.log2(target_seconds / elapsed)) if elapsed < target_seconds else 0
+    return max(min_rounds, min(max_rounds, min_rounds + extra))
@@ -0,0 +1,105 @@
+"""End-to-end latency benchmark for the API hot paths against SQLite.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_api --output api.json
+    python -m benchmarks.bench_api --requests 500 --baseline api.json
+
+Drives register, login, encrypt and decrypt through the FastAPI app in-process
+(``TestClient``, no sockets) with a throwaway SQLite database, so it needs no
+PostgreSQL, Redis or network. Everything else - JWT verification, principal
+and key caches, executor pools, the audit writer - runs as in production.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def _timed(func, count: int):
+    samples = []
+    for index in range(count):
+        started = time.perf_counter()
+        response = func(index)
+        samples.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text}")
+    return samples
+
+
+def _result(name: str, samples, percentiles):
+    total = sum(samples)
+    return {"name": name, "requests": len(samples), "ops_per_sec": round(len(samples) / total, 2),
+            **percentiles(samples)}
+
+
+def main(args) -> int:
+    workdir = tempfile.mkdtemp(prefix="ciphercanary-bench-")
+    # Configure the app before it is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("CACHE_L2_ENABLED", "false")
+    os.environ.setdefault("RSA_KEY_POOL_ENABLED", "false")
+    os.environ.setdefault("DB_AUTO_CREATE", "true")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from benchmarks.harness import finish, percentiles
+
+    password = "benchmark-password"
+    payload = "x" * args.size
+    results = []
+    with TestClient(app) as client:
+        # Measure a warmed-up worker, not the pool spawn
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.01)
+        samples = _timed(lambda i: client.post("/auth/register", json={
+            "username": f"bench{i}", "email": f"bench{i}@example.com", "password": password
+        }), args.users)
+        results.append(_result("register", samples, percentiles))
+
+        samples = _timed(lambda i: client.post("/auth/login", json={
+            "username": f"bench{i % args.users}", "password": password
+        }), args.users)
+        results.append(_result("login", samples, percentiles))
+
+        token = client.post("/auth/login", json={"username": "bench0", "password": password}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        key_id = client.post("/api/v1/keys", headers=headers, json={
+            "name": "benchmark", "algorithm": args.algorithm, "key_size": 256
+        }).json()["id"]
+
+        samples = _timed(lambda i: client.post("/api/v1/encrypt", headers=headers, params={
+            "data": payload, "algorithm": args.algorithm
+        }), args.requests)
+        results.append(_result(f"encrypt/{args.algorithm}/ephemeral-key", samples, percentiles))
+
+        samples = _timed(lambda i: client.post("/api/v1/encrypt", headers=headers, params={
+            "data": payload, "algorithm": args.algorithm, "key_id": key_id
+        }), args.requests)
+        results.append(_result(f"encrypt/{args.algorithm}/managed-key", samples, percentiles))
+
+        encrypted = client.post("/api/v1/encrypt", headers=headers, params={
+            "data": payload, "algorithm": args.algorithm, "key_id": key_id
+        }).json()["encrypted_data"]
+        samples = _timed(lambda i: client.post("/api/v1/decrypt", headers=headers, params={
+            "encrypted_data": encrypted, "algorithm": args.algorithm, "key_id": key_id
+        }), args.requests)
+        results.append(_result(f"decrypt/{args.algorithm}/managed-key", samples, percentiles))
+
+    for result in results:
+        print(f"{result['name']:<40} {result['ops_per_sec']:>10.1f} req/s  p50 {result['p50_ms']:.3f} ms  "
+              f"p99 {result['p99_ms']:.3f} ms", file=sys.stderr)
+    return finish("api", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    from benchmarks.harness import add_output_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="accounts to register and log in (bcrypt-bound)")
+    parser.add_argument("--requests", type=int, default=2000, help="encrypt/decrypt requests per case")
+    parser.add_argument("--size", type=int, default=256, help="plaintext bytes per request")
+    parser.add_argument("--algorithm", default="aes-256-gcm", choices=["aes-256-gcm", "chacha20-poly1305"])
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
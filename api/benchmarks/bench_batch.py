@@ -0,0 +1,85 @@
+"""Compare batch encryption throughput against one call per item.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_batch --items 5000 --size 64
+
+The single-call mode awaits ``encrypt_data_async`` once per item, matching a
+client that issues one ``POST /api/v1/encrypt`` at a time; the batch mode
+hands all items to ``encrypt_batch_async`` in one call. Neither mode pays
+HTTP or JWT costs here, so the real-world gap is larger than reported.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from app.services import crypto_service, executor_service
+from benchmarks.harness import add_output_arguments, finish
+
+
+async def _single(items, user_id):
+    for data, algorithm, key_id, _ in items:
+        await crypto_service.encrypt_data_async(data, algorithm, key_id, user_id)
+
+
+async def _concurrent(items, user_id, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(item):
+        async with semaphore:
+            await crypto_service.encrypt_data_async(item[0], item[1], item[2], user_id)
+
+    await asyncio.gather(*(_one(item) for item in items))
+
+
+async def _batch(items, user_id, batch_size):
+    for start in range(0, len(items), batch_size):
+        await crypto_service.encrypt_batch_async(items[start:start + batch_size], user_id)
+
+
+async def _measure(label, coro_factory, count, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"name": label, "seconds": round(best, 6), "ops_per_sec": round(count / best, 1)}
+
+
+async def main(args):
+    payload = os.urandom(args.size // 2).hex()
+    items = [(payload, args.algorithm, None, None) for _ in range(args.items)]
+    user_id = "benchmark"
+
+    results = [
+        await _measure("single", lambda: _single(items, user_id), len(items), args.repeat),
+        await _measure(
+            f"concurrent-{args.concurrency}",
+            lambda: _concurrent(items, user_id, args.concurrency), len(items), args.repeat
+        ),
+        await _measure(
+            f"batch-{args.batch_size}",
+            lambda: _batch(items, user_id, args.batch_size), len(items), args.repeat
+        ),
+    ]
+    executor_service.shutdown()
+
+    single = results[0]["ops_per_sec"]
+    for result in results:
+        result.update(algorithm=args.algorithm, items=args.items, size=args.size,
+                      speedup=round(result["ops_per_sec"] / single, 2))
+    return finish("batch", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=64, help="plaintext bytes per item")
+    parser.add_argument("--algorithm", default="aes-256-gcm")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    add_output_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
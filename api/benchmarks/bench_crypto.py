@@ -0,0 +1,135 @@
+"""Throughput and allocation benchmark for every CryptoService algorithm.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_crypto --output crypto.json
+    python -m benchmarks.bench_crypto --max-size 1MiB --baseline crypto.json
+
+Each algorithm encrypts and decrypts payloads from 64 B to 64 MiB through the
+synchronous ``encrypt_data``/``decrypt_data`` entry points with an in-memory
+managed key, so the figures cover the cipher plus the base64 and audit-hash
+work every request pays, but no HTTP, database or executor overhead.
+Combinations an algorithm cannot handle (RSA-OAEP is limited to 446 bytes)
+are reported with an ``error`` instead of timings.
+
+``--no-scratch`` turns off the per-thread AEAD output buffer, so running with
+it and then comparing against that run as ``--baseline`` shows what the
+buffer saves per call:
+
+    python -m benchmarks.bench_crypto --max-size 64KiB --no-scratch --output copying.json
+    python -m benchmarks.bench_crypto --max-size 64KiB --baseline copying.json
+"""
+import argparse
+import base64
+import os
+import sys
+import uuid
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services.crypto_service import crypto_service
+from app.services.key_service import ManagedKey
+from app.utils.config import settings
+from benchmarks.harness import add_output_arguments, finish, measure_allocations, time_call
+
+DEFAULT_SIZES = "64,1KiB,64KiB,1MiB,16MiB,64MiB"
+UNITS = {"KiB": 1024, "MiB": 1024 * 1024, "B": 1}
+
+
+def parse_size(text: str) -> int:
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(text[:-len(unit)]) * factor
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit in ("MiB", "KiB"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def build_key(algorithm: str):
+    """In-memory managed key for an algorithm, or None where no key is used"""
+    if algorithm in ("aes-256-gcm", "chacha20-poly1305"):
+        material = os.urandom(32)
+    elif algorithm == "rsa-4096":
+        material = rsa.generate_private_key(public_exponent=65537, key_size=4096).private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+    else:
+        return None
+    return ManagedKey(uuid.uuid4(), uuid.uuid4(), algorithm, None, bytearray(material))
+
+
+def payload(size: int) -> str:
+    """ASCII payload, since decrypt_data returns text"""
+    return base64.b64encode(os.urandom(size))[:size].decode('ascii')
+
+
+def bench_case(algorithm: str, key, size: int, min_time: float, repeat: int, allocations: bool):
+    data = payload(size)
+    label = format_size(size)
+    try:
+        encrypted = crypto_service.encrypt_data(data, algorithm, None, "benchmark", key)
+    except Exception as e:
+        return [{"name": f"{operation}/{algorithm}/{label}", "size": size, "error": str(e)}
+                for operation in ("encrypt", "decrypt")]
+
+    cases = {
+        "encrypt": lambda: crypto_service.encrypt_data(data, algorithm, None, "benchmark", key),
+        "decrypt": lambda: crypto_service.decrypt_data(
+            encrypted["encrypted_data"], algorithm, None, "benchmark", key
+        ),
+    }
+    results = []
+    for operation, func in cases.items():
+        timing = time_call(func, min_time=min_time, repeat=repeat)
+        result = {
+            "name": f"{operation}/{algorithm}/{label}",
+            "operation": operation,
+            "algorithm": algorithm,
+            "size": size,
+            "ops_per_sec": round(timing["ops_per_sec"], 2),
+            "mb_per_sec": round(timing["ops_per_sec"] * size / (1024 * 1024), 2),
+            "seconds_per_op": timing["seconds_per_op"],
+            "iterations": timing["iterations"]
+        }
+        if allocations:
+            result.update(measure_allocations(func))
+        results.append(result)
+        print(f"{result['name']:<40} {result['ops_per_sec']:>12.1f} ops/s {result['mb_per_sec']:>10.1f} MB/s",
+              file=sys.stderr)
+    return results
+
+
+def main(args) -> int:
+    if args.no_scratch:
+        settings.CRYPTO_SCRATCH_BUFFER_BYTES = 0
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    if args.max_size:
+        sizes = [size for size in sizes if size <= parse_size(args.max_size)]
+    algorithms = args.algorithms.split(",") if args.algorithms else list(crypto_service.supported_algorithms)
+
+    results = []
+    for algorithm in algorithms:
+        key = build_key(algorithm)
+        for size in sizes:
+            results.extend(bench_case(algorithm, key, size, args.min_time, args.repeat, not args.no_allocations))
+    return finish("crypto", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated sizes, e.g. 64,1KiB,1MiB")
+    parser.add_argument("--max-size", help="skip sizes above this, e.g. 1MiB")
+    parser.add_argument("--algorithms", help="comma-separated subset of the supported algorithms")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--no-scratch", action="store_true", help="disable the reusable AEAD output buffer")
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""Data-key envelope encryption: a wrap or unwrap per message against cached data keys.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_datakey --size 1KiB --output datakey.json
+    python -m benchmarks.bench_datakey --masters aes-256-gcm --baseline datakey.json
+
+For each master-key algorithm, messages are sealed with ``encrypt_envelope(...,
+data_key=True)`` twice: once with DATA_KEY_MAX_MESSAGES forced to 1, so every
+message wraps a fresh data key under the master, and once with the configured
+limits, so the cached data key is reused. Decryption is measured the same way
+by clearing the unwrapped-key cache before every message, and then leaving it
+warm. Everything runs in-process against in-memory keys; there is no HTTP,
+database or executor overhead.
+"""
+import argparse
+import os
+import sys
+
+from app.services.crypto_service import crypto_service
+from app.services.datakey_service import datakey_service
+from app.utils.config import settings
+from benchmarks.bench_crypto import build_key, format_size, parse_size
+from benchmarks.harness import add_output_arguments, finish, time_call
+
+
+def bench_master(master_algorithm: str, algorithm: str, size: int, min_time: float, repeat: int):
+    master = build_key(master_algorithm)
+    data = os.urandom(size)
+    label = f"{master_algorithm}/{algorithm}/{format_size(size)}"
+
+    def encrypt():
+        return crypto_service.encrypt_envelope(data, algorithm, None, "benchmark", master, data_key=True)[0]
+
+    def decrypt_cold():
+        datakey_service._decrypt_keys.clear()
+        crypto_service.decrypt_envelope(envelope, master, "benchmark")
+
+    def decrypt_warm():
+        crypto_service.decrypt_envelope(envelope, master, "benchmark")
+
+    configured = settings.DATA_KEY_MAX_MESSAGES
+    settings.DATA_KEY_MAX_MESSAGES = 1
+    try:
+        per_message = time_call(encrypt, min_time, repeat)
+    finally:
+        settings.DATA_KEY_MAX_MESSAGES = configured
+    cached = time_call(encrypt, min_time, repeat)
+    envelope = encrypt()
+    cold = time_call(decrypt_cold, min_time, repeat)
+    warm = time_call(decrypt_warm, min_time, repeat)
+
+    results = []
+    for operation, uncached, hit in (("encrypt", per_message, cached), ("decrypt", cold, warm)):
+        for mode, timing in (("per-message", uncached), ("cached", hit)):
+            results.append({
+                "name": f"{operation}/{mode}/{label}",
+                "size": size,
+                "seconds_per_op": round(timing["seconds_per_op"], 9),
+                "ops_per_sec": round(timing["ops_per_sec"], 1),
+            })
+        results[-1]["speedup"] = round(hit["ops_per_sec"] / uncached["ops_per_sec"], 1)
+    return results
+
+
+def main(args):
+    results = []
+    for master_algorithm in args.masters.split(","):
+        results.extend(bench_master(master_algorithm, args.algorithm, parse_size(args.size),
+                                    args.min_time, args.repeat))
+    for result in results:
+        print(f"{result['name']:<48} {result['ops_per_sec']:>12,.1f} ops/s"
+              + (f"  x{result['speedup']}" if "speedup" in result else ""))
+    return finish("datakey", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--masters", default="aes-256-gcm,rsa-4096", help="master-key algorithms")
+    parser.add_argument("--algorithm", default="aes-256-gcm", help="data-key algorithm")
+    parser.add_argument("--size", default="1KiB", help="message size")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
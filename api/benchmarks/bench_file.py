@@ -0,0 +1,96 @@
+"""Parallel file encryption: throughput of the file engine against worker count.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_file --size 1024MiB --workers 1,2,4,8 --output file.json
+    python -m benchmarks.bench_file --algorithm chacha20-poly1305 --baseline file.json
+
+A file of ``--size`` random bytes is sealed into the stream format and
+opened again with the same engine and CLI pool the command-line tool uses
+(``python -m app.services.file_service``), once per worker count. Every pool
+is started before it is timed, and every measurement is the best of
+``--repeat`` runs, so process start-up and a cold page cache are excluded.
+The speedup is against one worker; it can only grow while there are cores,
+memory bandwidth and page cache to spare, so the file should fit in memory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from app.services.file_service import file_service, process_executor
+from benchmarks.bench_crypto import format_size, parse_size
+from benchmarks.harness import add_output_arguments, finish
+
+
+def _best(func, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_workers(workdir: str, algorithm: str, size: int, workers: int, repeat: int):
+    key = os.urandom(32)
+    plaintext = os.path.join(workdir, "plain")
+    sealed = os.path.join(workdir, "sealed")
+    opened = os.path.join(workdir, "opened")
+    executor = process_executor(workers)
+    try:
+        # Start every worker before timing
+        list(executor.map(abs, range(workers)))
+
+        def encrypt():
+            jobs, _ = file_service.prepare_encrypt(plaintext, sealed, algorithm, key, workers)
+            file_service.run(jobs, executor, 2 * workers)
+
+        def decrypt():
+            jobs, _ = file_service.prepare_decrypt(sealed, opened, key, workers)
+            file_service.run(jobs, executor, 2 * workers)
+
+        return _best(encrypt, repeat), _best(decrypt, repeat)
+    finally:
+        executor.shutdown()
+
+
+def main(args):
+    size = parse_size(args.size)
+    worker_counts = [int(count) for count in args.workers.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ciphercanary-bench-", dir=args.dir) as workdir:
+        with open(os.path.join(workdir, "plain"), "wb") as plaintext:
+            for _ in range(0, size, 1 << 24):
+                plaintext.write(os.urandom(min(1 << 24, size - plaintext.tell())))
+        baseline = {}
+        for workers in worker_counts:
+            timings = bench_workers(workdir, args.algorithm, size, workers, args.repeat)
+            for operation, seconds in zip(("encrypt", "decrypt"), timings):
+                baseline.setdefault(operation, seconds)
+                results.append({
+                    "name": f"{operation}/{args.algorithm}/{format_size(size)}/{workers}-workers",
+                    "size": size,
+                    "workers": workers,
+                    "seconds_per_op": round(seconds, 6),
+                    "ops_per_sec": round(1.0 / seconds, 3),
+                    "mib_per_sec": round(size / seconds / (1 << 20), 1),
+                    "speedup": round(baseline[operation] / seconds, 2),
+                })
+    for result in results:
+        print(f"{result['name']:<48} {result['mib_per_sec']:>10,.1f} MiB/s  x{result['speedup']}")
+    return finish("file", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--algorithm", default="aes-256-gcm", choices=["aes-256-gcm", "chacha20-poly1305"])
+    parser.add_argument("--size", default="256MiB", help="file size")
+    parser.add_argument("--workers", default=",".join(
+        str(count) for count in (1, 2, 4, 8, 16) if count <= (os.cpu_count() or 1)
+    ), help="comma-separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best is kept")
+    parser.add_argument("--dir", help="directory for the test files (default: system temp)")
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""Rate-limiter overhead: the cost of charging one request to a user's token bucket.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_ratelimit --users 10000 --output ratelimit.json
+    python -m benchmarks.bench_ratelimit --redis-url redis://localhost:6379 --baseline ratelimit.json
+
+Each call prices a request (algorithm weight times payload units) and
+charges it with ``rate_limit_service.charge``, cycling over ``--users``
+distinct user ids, the way ``get_current_user`` does once the user is
+resolved. The admitted mode uses a bucket that never runs dry; the limited
+mode uses an empty one, so every call raises RateLimitedError as a 429
+would. With ``--redis-url`` the shared backend is measured as well, which
+adds one round trip for the token-bucket script. No HTTP or JWT costs are
+included.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+
+from app.services.cache_service import cache_service
+from app.services.ratelimit_service import RateLimitedError, rate_limit_service
+from app.utils.config import settings
+from benchmarks.harness import add_output_arguments, finish
+
+
+async def _measure(user_ids, min_time: float, repeat: int) -> float:
+    """Best-of-``repeat`` seconds per charge"""
+    best = None
+    count = len(user_ids)
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            for user_id in user_ids:
+                try:
+                    await rate_limit_service.charge(user_id, rate_limit_service.cost("aes-256-gcm", 100))
+                except RateLimitedError:
+                    pass
+            calls += count
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = elapsed / calls if best is None else min(best, elapsed / calls)
+    return best
+
+
+async def bench(backend: str, users: int, min_time: float, repeat: int):
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    rate_limit_service.enabled = True
+    rate_limit_service.shared = backend == "redis"
+    results = []
+    for mode, rate, burst in (("admitted", 1e12, 1e12), ("limited", 1e-9, 0.5)):
+        rate_limit_service.rate, rate_limit_service.burst = rate, burst
+        rate_limit_service._buckets.clear()
+        await _measure(user_ids, 0, 1)  # create every bucket before timing
+        seconds = await _measure(user_ids, min_time, repeat)
+        results.append({
+            "name": f"{backend}/{mode}/{users}-users",
+            "seconds_per_op": round(seconds, 9),
+            "microseconds_per_op": round(seconds * 1e6, 3),
+            "ops_per_sec": round(1.0 / seconds, 1),
+        })
+    return results
+
+
+async def run(args):
+    backends = ["local"]
+    if args.redis_url:
+        settings.REDIS_URL = args.redis_url
+        cache_service.enabled = True
+        backends.append("redis")
+    results = []
+    for backend in backends:
+        results.extend(await bench(backend, args.users, args.min_time, args.repeat))
+    if args.redis_url:
+        await cache_service.stop()
+    return results
+
+
+def main(args):
+    results = asyncio.run(run(args))
+    for result in results:
+        print(f"{result['name']:<32} {result['microseconds_per_op']:>10,.3f} us/op"
+              f" {result['ops_per_sec']:>14,.1f} ops/s")
+    return finish("ratelimit", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="distinct users charged in turn")
+    parser.add_argument("--redis-url", help="also measure the shared Redis backend")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=3, help="timing rounds, best is kept")
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
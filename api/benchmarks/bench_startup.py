@@ -0,0 +1,80 @@
+"""Cold-start benchmark: import time, lifespan startup and time until /ready.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --runs 10 --baseline startup.json
+
+Every run is a fresh interpreter with a throwaway SQLite database and tables
+created on startup (``DB_AUTO_CREATE``), so the figures are what a new worker
+process pays before it can take traffic. Each phase is reported as the best
+and median of ``--runs``; ``ops_per_sec`` is the inverse of the median so the
+usual ``--baseline`` comparison flags startups that got slower.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in the child interpreter; prints one JSON line with the phase timings
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    running = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+print(json.dumps({"import": imported - started, "startup": running - imported, "ready": ready - started}))
+"""
+
+
+def run_once(workdir: str, index: int, warmup: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, f'startup{index}.db')}",
+        "DB_AUTO_CREATE": "true",
+        "STARTUP_WARMUP": "true" if warmup else "false",
+        "PYTHONPATH": os.getcwd()
+    })
+    env.setdefault("CACHE_L2_ENABLED", "false")
+    env.setdefault("RSA_KEY_POOL_ENABLED", "false")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    from benchmarks.harness import finish
+
+    workdir = tempfile.mkdtemp(prefix="ciphercanary-startup-")
+    runs = [run_once(workdir, index, not args.no_warmup) for index in range(args.runs)]
+    results = []
+    for phase in ("import", "startup", "ready"):
+        samples = [run[phase] for run in runs]
+        median = statistics.median(samples)
+        results.append({
+            "name": f"startup/{phase}",
+            "runs": len(samples),
+            "ops_per_sec": round(1.0 / median, 3),
+            "best_ms": round(min(samples) * 1000, 2),
+            "median_ms": round(median * 1000, 2)
+        })
+        print(f"{phase:<10} best {min(samples) * 1000:>9.1f} ms  median {median * 1000:>9.1f} ms", file=sys.stderr)
+    return finish("startup", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    from benchmarks.harness import add_output_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--no-warmup", action="store_true", help="report ready as soon as startup finishes")
+    add_output_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Ed25519 signature-verification throughput: one call per signature against batches.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_verify --items 10000 --size 512
+    python -m benchmarks.bench_verify --keys 100 --baseline verify.json
+
+The single-call mode awaits ``verify_async`` once per signature, like a
+client issuing one ``POST /api/v1/verify`` at a time; the batch mode hands
+the items to ``verify_batch_async`` in ``--batch-size`` slices, which fan out
+across the crypto thread pool. ``--keys`` spreads the signatures over that
+many signers to exercise the parsed public-key cache. No HTTP or JWT costs
+are included.
+"""
+import argparse
+import asyncio
+import base64
+import os
+import sys
+
+from nacl.signing import SigningKey
+
+from app.services import crypto_service, executor_service
+from benchmarks.bench_batch import _measure
+from benchmarks.harness import add_output_arguments, finish
+
+
+def build_items(count: int, size: int, keys: int):
+    signers = [SigningKey.generate() for _ in range(keys)]
+    items = []
+    for index in range(count):
+        signer = signers[index % keys]
+        message = os.urandom(size // 2).hex()
+        signature = base64.b64encode(signer.sign(message.encode('utf-8')).signature).decode('ascii')
+        items.append((message, signature, bytes(signer.verify_key)))
+    return items
+
+
+async def _single(items):
+    for message, signature, public_key in items:
+        if not await crypto_service.verify_async(message, signature, public_key):
+            raise RuntimeError("signature did not verify")
+
+
+async def _batch(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        results = await crypto_service.verify_batch_async(items[start:start + batch_size])
+        if not all(result["valid"] for result in results):
+            raise RuntimeError("signature did not verify")
+
+
+async def main(args):
+    items = build_items(args.items, args.size, args.keys)
+    results = [
+        await _measure("verify/single", lambda: _single(items), len(items), args.repeat),
+        await _measure(
+            f"verify/batch-{args.batch_size}", lambda: _batch(items, args.batch_size), len(items), args.repeat
+        ),
+    ]
+    executor_service.shutdown()
+
+    single = results[0]["ops_per_sec"]
+    for result in results:
+        result.update(items=args.items, size=args.size, keys=args.keys,
+                      speedup=round(result["ops_per_sec"] / single, 2))
+    return finish("verify", results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=512, help="message bytes per signature")
+    parser.add_argument("--keys", type=int, default=10, help="distinct signing keys")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    add_output_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
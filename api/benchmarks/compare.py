@@ -0,0 +1,31 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage (from the api/ directory):
+    python -m benchmarks.compare baseline.json current.json --threshold 0.1
+
+Exits with status 1 when any benchmark's ops/s dropped by more than the
+threshold, so it can gate a CI job.
+"""
+import argparse
+import sys
+
+from benchmarks.harness import compare_results, load_results, report_comparison
+
+
+def main(args) -> int:
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    if baseline["suite"] != current["suite"]:
+        print(f"Suites differ: {baseline['suite']} vs {current['suite']}", file=sys.stderr)
+        return 2
+    if baseline["environment"].get("platform") != current["environment"].get("platform"):
+        print("Warning: results come from different platforms", file=sys.stderr)
+    return report_comparison(compare_results(baseline, current, args.threshold), args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    sys.exit(main(parser.parse_args()))
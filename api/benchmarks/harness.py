@@ -0,0 +1,137 @@
+"""Shared timing, result-file and baseline-comparison helpers for the benchmarks.
+
+Every benchmark writes a JSON document of the form::
+
+    {"suite": ..., "environment": {...}, "results": [{"name": ..., "ops_per_sec": ..., ...}]}
+
+Results are matched by ``name`` when comparing two runs; ``ops_per_sec`` is
+the figure compared, higher being better.
+"""
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine so results from different boxes are not confused"""
+    import cryptography
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "cryptography": cryptography.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+
+def time_call(func: Callable[[], Any], min_time: float = 0.2, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-``repeat`` seconds per call, each round running for at least ``min_time``"""
+    func()  # warm up caches, lazy imports and pools
+    best = None
+    iterations = 0
+    for _ in range(repeat):
+        count = 0
+        started = time.perf_counter()
+        while True:
+            func()
+            count += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        per_call = elapsed / count
+        iterations += count
+        best = per_call if best is None else min(best, per_call)
+    return {"seconds_per_op": best, "ops_per_sec": 1.0 / best, "iterations": iterations}
+
+
+def measure_allocations(func: Callable[[], Any]) -> Dict[str, int]:
+    """Peak Python-heap bytes allocated by one call (OpenSSL buffers are not traced)"""
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_bytes": peak - baseline, "alloc_retained_bytes": max(current - baseline, 0)}
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of a list of latencies in seconds"""
+    ordered = sorted(samples)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {"p50_ms": round(pick(0.50) * 1000, 4), "p95_ms": round(pick(0.95) * 1000, 4),
+            "p99_ms": round(pick(0.99) * 1000, 4)}
+
+
+def write_results(suite: str, results: List[Dict[str, Any]], output: Optional[str]) -> Dict[str, Any]:
+    """Print the result document and optionally save it"""
+    document = {"suite": suite, "environment": environment(), "results": results}
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    print(text)
+    return document
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-benchmark ops/s ratio against the baseline; ``regression`` marks drops beyond ``threshold``"""
+    previous = {result["name"]: result for result in baseline["results"] if "ops_per_sec" in result}
+    rows = []
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None or "ops_per_sec" not in result:
+            continue
+        ratio = result["ops_per_sec"] / before["ops_per_sec"]
+        rows.append({
+            "name": result["name"],
+            "baseline_ops_per_sec": before["ops_per_sec"],
+            "ops_per_sec": result["ops_per_sec"],
+            "ratio": round(ratio, 3),
+            "regression": ratio < 1.0 - threshold
+        })
+    return rows
+
+
+def report_comparison(rows: List[Dict[str, Any]], threshold: float) -> int:
+    """Print a comparison table to stderr and return a process exit code"""
+    regressions = [row for row in rows if row["regression"]]
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<48} {row['baseline_ops_per_sec']:>14.1f} -> {row['ops_per_sec']:>14.1f} "
+              f"x{row['ratio']:<6} {flag}", file=sys.stderr)
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%} in {len(rows)} compared benchmark(s)",
+          file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def finish(suite: str, results: List[Dict[str, Any]], output: Optional[str],
+           baseline: Optional[str], threshold: float) -> int:
+    """Write results and, when a baseline is given, compare against it"""
+    document = write_results(suite, results, output)
+    if not baseline:
+        return 0
+    return report_comparison(compare_results(load_results(baseline), document, threshold), threshold)
+
+
+def add_output_arguments(parser):
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="compare against a previous JSON result file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag benchmarks slower than the baseline by more than this fraction")
@@ -0,0 +1,119 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 03:03:58.920741
+
+Databases created before migrations existed (db/init.sql or the old
+create_all on startup) already have some of these tables; those are left
+alone, so this revision doubles as a baseline for them.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BIGINT_ID = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def _create_table(name: str, existing: set, *columns, indexes=()):
+    """Create a table and its indexes unless the table is already there"""
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade() -> None:
+    # Offline (--sql) runs cannot inspect the database and emit every table
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    _create_table(
+        'users', existing,
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        indexes=[('ix_users_email', ['email'], True), ('ix_users_username', ['username'], True)]
+    )
+    _create_table(
+        'encryption_keys', existing,
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('key_type', sa.String(length=20), nullable=False),
+        sa.Column('key_material', sa.Text(), nullable=False),
+        sa.Column('algorithm', sa.String(length=50), nullable=False),
+        sa.Column('key_size', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        indexes=[('idx_encryption_keys_owner_active', ['owner_id', 'is_active'], False)]
+    )
+    _create_table(
+        'audit_logs', existing,
+        sa.Column('id', BIGINT_ID, autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('action', sa.String(length=100), nullable=False),
+        sa.Column('resource_type', sa.String(length=50), nullable=True),
+        sa.Column('resource_id', sa.String(length=100), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        indexes=[('ix_audit_logs_timestamp', ['timestamp'], False)]
+    )
+    _create_table(
+        'encryption_operations', existing,
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('operation_type', sa.String(length=20), nullable=False),
+        sa.Column('algorithm', sa.String(length=50), nullable=False),
+        sa.Column('key_id', sa.Uuid(), nullable=True),
+        sa.Column('input_hash', sa.String(length=64), nullable=True),
+        sa.Column('output_hash', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['key_id'], ['encryption_keys.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_table(
+        'token_revocations', existing,
+        sa.Column('id', BIGINT_ID, autoincrement=True, nullable=False),
+        sa.Column('jti', sa.String(length=64), nullable=True),
+        sa.Column('user_id', sa.Uuid(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        indexes=[
+            ('ix_token_revocations_expires_at', ['expires_at'], False),
+            ('ix_token_revocations_jti', ['jti'], False),
+            ('ix_token_revocations_revoked_at', ['revoked_at'], False),
+            ('ix_token_revocations_user_id', ['user_id'], False)
+        ]
+    )
+
+
+def downgrade() -> None:
+    for name in ('token_revocations', 'encryption_operations', 'audit_logs', 'encryption_keys', 'users'):
+        op.drop_table(name)
@@ -0,0 +1,79 @@
+"""audit log query indexes and monthly partitions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 03:20:11.482913
+
+Adds composite indexes for the audit query API on every backend. On
+PostgreSQL, audit_logs also becomes a table range-partitioned by month on
+timestamp. The existing rows are kept as one partition, audit_logs_legacy,
+which covers everything before next month. AuditLogService creates the
+monthly partitions ahead of time and drops them once they pass
+AUDIT_RETENTION_MONTHS.
+
+Attaching the legacy table scans it once to check the bounds and to build
+the new indexes, so on a large table run this in a quiet period.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_audit_logs_user_timestamp', ['user_id', 'timestamp']),
+    ('ix_audit_logs_action_timestamp', ['action', 'timestamp']),
+    ('ix_audit_logs_resource_timestamp', ['resource_type', 'resource_id', 'timestamp']),
+)
+
+# Runs server-side, so it also works for offline (--sql) upgrades. A table
+# that is already partitioned (fresh db/init.sql installs) is left alone.
+PARTITION_AUDIT_LOGS = """
+DO $$
+DECLARE
+    id_sequence text := pg_get_serial_sequence('audit_logs', 'id');
+    legacy_until timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 month';
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'audit_logs'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE audit_logs RENAME TO audit_logs_legacy;
+    ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey;
+    ALTER INDEX IF EXISTS ix_audit_logs_timestamp RENAME TO audit_logs_legacy_timestamp_idx;
+
+    -- Range partition keys cannot be NULL; the column has always defaulted to now()
+    UPDATE audit_logs_legacy SET timestamp = to_timestamp(0) WHERE timestamp IS NULL;
+    ALTER TABLE audit_logs_legacy ALTER COLUMN timestamp SET NOT NULL;
+
+    -- LIKE keeps column types identical (details is JSON or JSONB depending on how the table was created)
+    CREATE TABLE audit_logs (LIKE audit_logs_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp);
+    ALTER TABLE audit_logs ADD PRIMARY KEY (id, timestamp);
+    ALTER TABLE audit_logs ADD FOREIGN KEY (user_id) REFERENCES users(id);
+    EXECUTE 'ALTER SEQUENCE ' || id_sequence || ' OWNED BY audit_logs.id';
+    CREATE INDEX ix_audit_logs_timestamp ON audit_logs (timestamp);
+
+    EXECUTE 'ALTER TABLE audit_logs ATTACH PARTITION audit_logs_legacy FOR VALUES FROM (MINVALUE) TO ('
+        || quote_literal(legacy_until) || ')';
+    -- Catches rows outside every monthly partition until maintenance catches up
+    CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute(PARTITION_AUDIT_LOGS)
+    for name, columns in INDEXES:
+        op.create_index(name, 'audit_logs', columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    # The partitioned layout is kept: unpartitioning means copying every row
+    for name, _ in INDEXES:
+        op.drop_index(name, 'audit_logs', if_exists=True)
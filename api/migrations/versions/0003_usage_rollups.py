@@ -0,0 +1,65 @@
+"""usage rollups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 03:31:47.205316
+
+Existing operations are not rolled up here; run the backfill once after
+upgrading:
+
+    python -m app.services.usage_service
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fresh db/init.sql installs already have these; offline (--sql) runs emit everything
+    if context.is_offline_mode():
+        existing_tables, existing_columns = set(), set()
+    else:
+        inspector = sa.inspect(op.get_bind())
+        existing_tables = set(inspector.get_table_names())
+        existing_columns = {column['name'] for column in inspector.get_columns('encryption_operations')}
+
+    if 'bytes_in' not in existing_columns:
+        with op.batch_alter_table('encryption_operations') as batch_op:
+            batch_op.add_column(sa.Column('bytes_in', sa.BigInteger(), nullable=True))
+            batch_op.add_column(sa.Column('bytes_out', sa.BigInteger(), nullable=True))
+    # The backfill reads encryption_operations one day at a time
+    op.create_index('ix_encryption_operations_created_at', 'encryption_operations', ['created_at'],
+                    if_not_exists=True)
+
+    if 'usage_rollups' in existing_tables:
+        return
+    op.create_table(
+        'usage_rollups',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('algorithm', sa.String(length=50), nullable=False),
+        sa.Column('operation_type', sa.String(length=20), nullable=False),
+        sa.Column('operations', sa.BigInteger(), nullable=False),
+        sa.Column('failed', sa.BigInteger(), nullable=False),
+        sa.Column('bytes_in', sa.BigInteger(), nullable=False),
+        sa.Column('bytes_out', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'algorithm', 'operation_type')
+    )
+    op.create_index('ix_usage_rollups_day', 'usage_rollups', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_table('usage_rollups')
+    op.drop_index('ix_encryption_operations_created_at', 'encryption_operations', if_exists=True)
+    with op.batch_alter_table('encryption_operations') as batch_op:
+        batch_op.drop_column('bytes_out')
+        batch_op.drop_column('bytes_in')
@@ -0,0 +1,54 @@
+"""key rotation jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 04:12:38.550164
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fresh db/init.sql installs already have the table
+    if not context.is_offline_mode() and 'key_rotations' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'key_rotations',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('old_key_id', sa.Uuid(), nullable=False),
+        sa.Column('new_key_id', sa.Uuid(), nullable=False),
+        sa.Column('rotation_reason', sa.String(length=100), nullable=True),
+        sa.Column('rotated_by', sa.Uuid(), nullable=False),
+        sa.Column('rotated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('target', sa.String(length=255), nullable=False),
+        sa.Column('last_id', sa.Text(), nullable=True),
+        sa.Column('rows_total', sa.BigInteger(), nullable=True),
+        sa.Column('rows_done', sa.BigInteger(), nullable=False),
+        sa.Column('rows_skipped', sa.BigInteger(), nullable=False),
+        sa.Column('rows_failed', sa.BigInteger(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('worker', sa.String(length=100), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['new_key_id'], ['encryption_keys.id']),
+        sa.ForeignKeyConstraint(['old_key_id'], ['encryption_keys.id']),
+        sa.ForeignKeyConstraint(['rotated_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_key_rotations_status', 'key_rotations', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_table('key_rotations')
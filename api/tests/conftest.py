@@ -0,0 +1,22 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Settings and the engine are read at import time, so point them at a
+# throwaway SQLite file before any test imports the app
+_DB_DIR = tempfile.mkdtemp(prefix="test-db-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+os.environ.setdefault("CACHE_L2_ENABLED", "false")
+os.environ.setdefault("RSA_KEY_POOL_ENABLED", "false")
+os.environ.setdefault("PASSWORD_CALIBRATE", "false")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
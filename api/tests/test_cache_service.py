@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis import aioredis as fake_aioredis
+
+from app.services.cache_service import NEGATIVE, CacheService
+from app.utils.cache import TTLCache
+from app.utils.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def _service(server: FakeServer) -> CacheService:
+    """A CacheService whose L2 is an in-process fake Redis shared through ``server``"""
+    service = CacheService()
+    service.enabled = True
+    service._redis = fake_aioredis.FakeRedis(server=server)
+    return service
+
+
+def _tier(service: CacheService, ttl: float = 60, negative_ttl: float = 30):
+    return service.tier("user", TTLCache(maxsize=100, ttl=ttl), ttl=ttl, negative_ttl=negative_ttl)
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+async def _wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+async def test_l1_hit_skips_redis(server):
+    service = _service(server)
+    cache = _tier(service)
+    await cache.set("alice", {"role": "admin"})
+
+    assert await cache.get("alice") == {"role": "admin"}
+    stats = cache.stats()
+    assert stats["l1"]["hits"] == 1
+    assert stats["l2_hits"] == stats["l2_misses"] == 0
+
+
+async def test_l2_fills_another_workers_l1(server):
+    writer, reader = _service(server), _service(server)
+    await _tier(writer).set("alice", {"role": "admin"})
+    cache = _tier(reader)
+
+    assert await cache.get("alice") == {"role": "admin"}
+    assert cache.stats()["l2_hits"] == 1
+    # The L2 value now sits in this worker's L1
+    assert await cache.get("alice") == {"role": "admin"}
+    assert cache.stats()["l1"]["hits"] == 1
+    assert cache.stats()["l2_hits"] == 1
+
+
+async def test_loads_turns_l2_documents_into_objects(server):
+    writer, reader = _service(server), _service(server)
+    await _tier(writer).set("alice", "wrapped")
+    cache = reader.tier("user", TTLCache(maxsize=10, ttl=60), ttl=60, loads=str.upper)
+
+    assert await cache.get("alice") == "WRAPPED"
+
+
+async def test_negative_entries_expire_after_negative_ttl(server):
+    service = _service(server)
+    cache = _tier(service, negative_ttl=0.2)
+    await cache.set_negative("ghost")
+
+    assert await cache.get("ghost") is NEGATIVE
+    remaining_ms = await service._redis.pttl(f"{settings.CACHE_KEY_PREFIX}:user:ghost")
+    assert 0 < remaining_ms <= 200
+    # A second worker sees the negative entry through L2
+    assert await _tier(_service(server), negative_ttl=0.2).get("ghost") is NEGATIVE
+
+    await asyncio.sleep(0.3)
+    assert await cache.get("ghost") is None
+
+
+async def test_invalidation_is_broadcast_to_other_workers(server):
+    writer, reader = _service(server), _service(server)
+    writer_cache, reader_cache = _tier(writer), _tier(reader)
+    invalidated = []
+    reader_cache.on_invalidate = invalidated.append
+    reader.start()
+    try:
+        # Subscribing clears L1, so only cache once the listener is attached
+        while (await writer._redis.pubsub_numsub(writer.channel))[0][1] == 0:
+            await asyncio.sleep(0.01)
+
+        await writer_cache.set("alice", {"role": "admin"})
+        assert await reader_cache.get("alice") == {"role": "admin"}
+        await writer_cache.invalidate("alice")
+
+        await _wait_for(lambda: reader.received == 1)
+        assert invalidated == ["alice"]
+        assert reader_cache.l1.get("alice") is None
+        assert await reader_cache.get("alice") is None
+        assert writer.stats()["invalidations_published"] == 1
+    finally:
+        await reader.stop()
+        await writer.stop()
+
+
+async def test_redis_outage_falls_back_to_l1_only(server):
+    service = _service(server)
+    cache = _tier(service)
+    server.connected = False
+
+    await cache.set("alice", {"role": "admin"})
+    assert service.errors == 1
+    assert service.stats()["l2_available"] is False
+    # While L2 is bypassed, requests are served from L1 without touching Redis
+    assert service.redis is None
+    assert await cache.get("alice") == {"role": "admin"}
+    assert await cache.get("bob") is None
+    await cache.invalidate("alice")
+    assert service.errors == 1
+    assert await cache.get("alice") is None
+
+
+async def test_redis_recovers_after_the_retry_interval(server, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_L2_RETRY_SECONDS", 0.05)
+    service = _service(server)
+    cache = _tier(service)
+    server.connected = False
+    await cache.set("alice", {"role": "admin"})
+    assert service.redis is None
+
+    server.connected = True
+    await asyncio.sleep(0.1)
+    await cache.set("bob", {"role": "user"})
+    assert await _tier(_service(server)).get("bob") == {"role": "user"}
+
+
+class _IdleRedis:
+    """Just enough of the Redis protocol to subscribe over a real socket and then stay quiet"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def publish(self, channel: bytes, data: bytes):
+        for writer in self.subscribers:
+            writer.write(self._array([b"message", channel, data]))
+
+    @staticmethod
+    def _array(items) -> bytes:
+        parts = [b"*%d\r\n" % len(items)]
+        for item in items:
+            parts.append(b":%d\r\n" % item if isinstance(item, int) else b"$%d\r\n%s\r\n" % (len(item), item))
+        return b"".join(parts)
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                count = int((await reader.readline())[1:])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                if args[0].upper() == b"SUBSCRIBE":
+                    self.subscribers.append(writer)
+                    writer.write(self._array([b"subscribe", args[1], 1]))
+                else:
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+
+async def test_idle_channel_is_not_an_outage(monkeypatch):
+    fake = _IdleRedis()
+    monkeypatch.setattr(settings, "REDIS_URL", await fake.start())
+    monkeypatch.setattr(settings, "CACHE_L2_TIMEOUT_SECONDS", 0.05)
+    # Client built by the real ``redis`` property, with its short socket timeout
+    service = CacheService()
+    service.enabled = True
+    cache = _tier(service)
+    service.start()
+    try:
+        await _wait_for(lambda: fake.subscribers)
+        await asyncio.sleep(settings.CACHE_L2_TIMEOUT_SECONDS * 6)
+        assert service.errors == 0
+        assert service.stats()["l2_available"] is True
+
+        cache.l1.set("alice", {"role": "admin"})
+        fake.publish(service.channel.encode(), b'{"namespace": "user", "key": "alice"}')
+        await _wait_for(lambda: service.received == 1)
+        assert cache.l1.get("alice") is None
+        assert service.errors == 0
+    finally:
+        await service.stop()
+        await fake.close()
@@ -0,0 +1,105 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.database import SessionLocal, close_db, engine, get_db, init_db, pool_stats
+from app.models import EncryptionKey, User
+from app.schemas import KeyCreate
+from app.services.key_service import key_service
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def schema():
+    await init_db()
+    yield
+    # Pooled aiosqlite connections belong to this test's event loop
+    await close_db()
+
+
+def _user(**fields) -> User:
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    return User(username=name, email=f"{name}@example.com", password_hash="x", **fields)
+
+
+async def test_engine_uses_aiosqlite_and_timed_pool(schema):
+    assert engine.dialect.name == "sqlite"
+    assert engine.dialect.driver == "aiosqlite"
+    assert pool_stats()["pool"] == "TimedQueuePool"
+
+
+async def test_get_db_yields_a_session_and_closes_it(schema):
+    sessions = get_db()
+    db = await sessions.__anext__()
+    await db.execute(select(User).limit(1))
+    assert db.in_transaction()
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+    assert not db.in_transaction()
+    assert pool_stats()["checked_out"] == 0
+
+
+async def test_commit_is_visible_to_other_sessions(schema):
+    user = _user()
+    async with SessionLocal() as db:
+        db.add(user)
+        await db.commit()
+        # expire_on_commit=False keeps attributes usable after the commit
+        assert user.username.startswith("user-")
+
+    async with SessionLocal() as db:
+        stored = await db.get(User, user.id)
+        assert stored is not None
+        assert stored.email == user.email
+        assert stored.is_active is True
+
+
+async def test_rollback_discards_changes(schema):
+    user = _user()
+    async with SessionLocal() as db:
+        db.add(user)
+        await db.flush()
+        assert await db.get(User, user.id) is not None
+        await db.rollback()
+
+    async with SessionLocal() as db:
+        assert await db.get(User, user.id) is None
+
+
+async def test_session_rolls_back_uncommitted_work_on_close(schema):
+    user = _user()
+    async with SessionLocal() as db:
+        db.add(user)
+        await db.flush()
+
+    async with SessionLocal() as db:
+        assert await db.get(User, user.id) is None
+
+
+async def test_key_create_list_deactivate(schema):
+    owner = _user()
+    async with SessionLocal() as db:
+        db.add(owner)
+        await db.commit()
+
+    async with SessionLocal() as db:
+        created = await key_service.create_key(
+            db, owner.id, KeyCreate(name="orders", algorithm="aes-256-gcm", key_size=256)
+        )
+        assert created.key_type == "symmetric"
+        assert [key.id for key in await key_service.list_keys(db, owner.id)] == [created.id]
+
+    async with SessionLocal() as db:
+        loaded = await key_service.load_keys(db, [created.id], owner.id)
+        assert len(loaded[created.id].copy_material()) == 32
+
+        await key_service.deactivate_key(db, created.id, owner.id)
+        assert await key_service.list_keys(db, owner.id) == []
+        assert [key.id for key in await key_service.list_keys(db, owner.id, include_inactive=True)] == [created.id]
+
+    async with SessionLocal() as db:
+        stored = await db.scalar(select(EncryptionKey).where(EncryptionKey.id == created.id))
+        assert stored.is_active is False
+        assert await key_service.load_keys(db, [created.id], owner.id) == {}
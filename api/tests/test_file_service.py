@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.executor_service import executor_service
+from app.services.file_service import file_service, sealed_size
+from app.services.stream_service import HEADER_SIZE, TAG_SIZE, StreamDecryptor, StreamError
+
+KEY = bytes(range(32))
+SEGMENT_SIZE = 64
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        yield executor
+
+
+def _write(path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def _encrypt(tmp_path, executor, plaintext: bytes, algorithm: str = "aes-256-gcm") -> str:
+    source, target = _write(tmp_path / "plain", plaintext), str(tmp_path / "sealed")
+    jobs, size = file_service.prepare_encrypt(source, target, algorithm, KEY, 3, SEGMENT_SIZE)
+    assert size == len(plaintext)
+    assert file_service.run(jobs, executor, 2) == (len(plaintext) if jobs else 0)
+    return target
+
+
+def _decrypt(tmp_path, executor, sealed: str) -> bytes:
+    target = str(tmp_path / "opened")
+    jobs, _ = file_service.prepare_decrypt(sealed, target, KEY, 3)
+    file_service.run(jobs, executor, 2)
+    with open(target, "rb") as opened:
+        return opened.read()
+
+
+@pytest.mark.parametrize("algorithm", ["aes-256-gcm", "chacha20-poly1305"])
+@pytest.mark.parametrize("length", [1, SEGMENT_SIZE - 1, SEGMENT_SIZE, SEGMENT_SIZE + 1, 300 * SEGMENT_SIZE + 5])
+def test_file_round_trip(tmp_path, executor, algorithm, length):
+    plaintext = os.urandom(length)
+    sealed = _encrypt(tmp_path, executor, plaintext, algorithm)
+
+    assert os.path.getsize(sealed) == sealed_size(length, SEGMENT_SIZE)
+    assert _decrypt(tmp_path, executor, sealed) == plaintext
+
+
+def test_file_output_opens_as_a_stream(tmp_path, executor):
+    plaintext = os.urandom(3 * SEGMENT_SIZE + 10)
+    with open(_encrypt(tmp_path, executor, plaintext), "rb") as sealed:
+        data = sealed.read()
+    decryptor = StreamDecryptor(data[:HEADER_SIZE], KEY)
+    body = data[HEADER_SIZE:]
+    sealed_segment = SEGMENT_SIZE + TAG_SIZE
+    segments = [body[start:start + sealed_segment] for start in range(0, len(body), sealed_segment)]
+    opened = [decryptor.open(segment, index == len(segments) - 1) for index, segment in enumerate(segments)]
+
+    assert b"".join(opened) == plaintext
+
+
+def test_empty_file_needs_no_jobs(tmp_path, executor):
+    sealed = _encrypt(tmp_path, executor, b"")
+
+    assert os.path.getsize(sealed) == HEADER_SIZE + TAG_SIZE
+    jobs, algorithm = file_service.prepare_decrypt(sealed, str(tmp_path / "opened"), KEY, 3)
+    assert jobs == [] and algorithm == "aes-256-gcm"
+    assert (tmp_path / "opened").read_bytes() == b""
+
+
+@pytest.mark.parametrize("cut", [1, TAG_SIZE, SEGMENT_SIZE + TAG_SIZE])
+def test_truncated_file_is_rejected(tmp_path, executor, cut):
+    sealed = _encrypt(tmp_path, executor, os.urandom(4 * SEGMENT_SIZE))
+    with open(sealed, "r+b") as stream:
+        stream.truncate(os.path.getsize(sealed) - cut)
+
+    with pytest.raises(StreamError):
+        _decrypt(tmp_path, executor, sealed)
+
+
+def test_header_only_file_is_rejected(tmp_path, executor):
+    sealed = _encrypt(tmp_path, executor, os.urandom(SEGMENT_SIZE))
+    with open(sealed, "r+b") as stream:
+        stream.truncate(HEADER_SIZE)
+
+    with pytest.raises(StreamError, match="truncated"):
+        _decrypt(tmp_path, executor, sealed)
+
+
+@pytest.mark.parametrize("offset", [4, HEADER_SIZE, HEADER_SIZE + 2 * (SEGMENT_SIZE + TAG_SIZE) + 7, -1])
+def test_tampered_file_is_rejected(tmp_path, executor, offset):
+    sealed = _encrypt(tmp_path, executor, os.urandom(4 * SEGMENT_SIZE))
+    with open(sealed, "r+b") as stream:
+        stream.seek(offset, os.SEEK_END if offset < 0 else os.SEEK_SET)
+        byte = stream.read(1)
+        stream.seek(-1, os.SEEK_CUR)
+        stream.write(bytes([byte[0] ^ 1]))
+
+    with pytest.raises(StreamError):
+        _decrypt(tmp_path, executor, sealed)
+
+
+def test_wrong_key_is_rejected(tmp_path, executor):
+    sealed = _encrypt(tmp_path, executor, os.urandom(2 * SEGMENT_SIZE))
+    jobs, _ = file_service.prepare_decrypt(sealed, str(tmp_path / "opened"), bytes(32), 3)
+
+    with pytest.raises(StreamError):
+        file_service.run(jobs, executor, 2)
+
+
+@pytest.mark.anyio
+async def test_file_jobs_run_on_their_own_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_service, "segment_size", SEGMENT_SIZE)
+    plaintext = os.urandom(10 * SEGMENT_SIZE)
+    source, sealed, opened = _write(tmp_path / "plain", plaintext), str(tmp_path / "sealed"), str(tmp_path / "opened")
+    cpu_submitted = executor_service.cpu.stats()["submitted"]
+    try:
+        assert await file_service.encrypt_file_async(source, sealed, "aes-256-gcm", KEY) == len(plaintext)
+        assert await file_service.decrypt_file_async(sealed, opened, KEY) == (len(plaintext), "aes-256-gcm")
+    finally:
+        executor_service.file.shutdown()
+
+    with open(opened, "rb") as result:
+        assert result.read() == plaintext
+    assert executor_service.file.stats()["submitted"] > 0
+    assert executor_service.cpu.stats()["submitted"] == cpu_submitted
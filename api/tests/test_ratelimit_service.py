@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ratelimit_service as ratelimit_module
+from app.services.ratelimit_service import RateLimitedError, RateLimitService
+from app.utils.config import settings
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_BYTES_PER_UNIT", 100)
+    service = RateLimitService()
+    service.enabled = True
+    service.shared = False
+    service.rate = 10.0
+    service.burst = 100.0
+    service.costs = {"rsa-4096": 20.0, "cheap": 0.5, "keygen:rsa-4096": 1000.0}
+    return service
+
+
+def test_check_local_admits_until_the_bucket_is_empty(limiter, clock):
+    assert limiter.check_local("alice", 60) == 0.0
+    assert limiter.check_local("alice", 40) == 0.0
+    # Empty bucket: 5 units short at 10 units per second
+    assert limiter.check_local("alice", 5) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.check_local("alice", 5) == 0.0
+    # Other users have their own buckets
+    assert limiter.check_local("bob", 100) == 0.0
+
+
+def test_check_local_lets_a_full_bucket_go_into_debt(limiter, clock):
+    assert limiter.check_local("alice", 250) == 0.0
+    # 150 units owed plus the 100 the next request needs
+    assert limiter.check_local("alice", 1) == pytest.approx(15.1)
+    clock.now += 25
+    assert limiter.check_local("alice", 250) == 0.0
+
+
+def test_prune_drops_refilled_buckets_first(limiter, clock, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_MAX_TRACKED_USERS", 10)
+    for user in range(5):
+        limiter.check_local(user, 100)
+    clock.now += 20
+    # Users 0-4 have refilled; 5-9 are still draining
+    for user in range(5, 10):
+        limiter.check_local(user, 50)
+    limiter.check_local("new", 1)
+
+    assert set(limiter._buckets) == {5, 6, 7, 8, 9, "new"}
+    assert limiter.stats()["evicted"] == 0
+
+
+def test_prune_evicts_the_least_recently_charged(limiter, clock, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_MAX_TRACKED_USERS", 10)
+    for user in range(10):
+        limiter.check_local(user, 100)
+        clock.now += 0.1
+    limiter.check_local("new", 1)
+
+    # Pruning keeps 90% of the limit, the most recently charged
+    assert set(limiter._buckets) == {1, 2, 3, 4, 5, 6, 7, 8, 9, "new"}
+    assert limiter.stats()["evicted"] == 1
+    assert limiter.stats()["tracked_users"] == 10
+
+
+def _spent(limiter: RateLimitService, user: str) -> float:
+    return limiter.burst - limiter._buckets.get(user, (limiter.burst, 0.0))[0]
+
+
+@pytest.mark.anyio
+async def test_surcharge_prices_a_batch_like_single_calls(limiter, clock):
+    limiter.burst = 10000.0
+    # 1000 one-byte items arrive in one 30 KB body: 300 units at weight 1
+    base = limiter.cost(None, 30000)
+    await limiter.charge("alice", base)
+    await limiter.surcharge("alice", [("aes-256-gcm", 1)] * 1000, base)
+
+    assert _spent(limiter, "alice") == 1000
+
+
+@pytest.mark.anyio
+async def test_surcharge_applies_algorithm_weights_per_item(limiter, clock):
+    limiter.burst = 10000.0
+    base = limiter.cost(None, 450)
+    await limiter.charge("alice", base)
+    await limiter.surcharge("alice", [("rsa-4096", 150), ("aes-256-gcm", 250)], base)
+
+    # 2 units at 20 plus 3 units at 1
+    assert _spent(limiter, "alice") == 43
+
+
+@pytest.mark.anyio
+async def test_surcharge_never_refunds_the_base_cost(limiter, clock):
+    base = limiter.cost(None, 1000)
+    await limiter.charge("alice", base)
+    await limiter.surcharge("alice", [("cheap", 100)] * 4, base)
+
+    assert _spent(limiter, "alice") == 10
+    assert limiter.stats()["admitted"] == 1
+
+
+@pytest.mark.anyio
+async def test_surcharge_uses_operation_weights(limiter, clock):
+    limiter.burst = 1500.0
+    base = limiter.cost(None, 50)
+    await limiter.charge("alice", base)
+    await limiter.surcharge("alice", [("rsa-4096", 0)], base, "keygen")
+    assert _spent(limiter, "alice") == 1000
+
+    with pytest.raises(RateLimitedError) as raised:
+        await limiter.surcharge("alice", [("rsa-4096", 0)], base, "keygen")
+    # 999 units needed, 500 left, at 10 units per second
+    assert raised.value.retry_after == 50
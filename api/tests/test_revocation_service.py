@@ -0,0 +1,58 @@
+import time
+import uuid
+
+import pytest
+
+from app.database import SessionLocal, close_db, init_db
+from app.services import revocation_service as revocation_module
+from app.services.revocation_service import RevocationService
+from app.utils.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def schema():
+    await init_db()
+    yield
+    await close_db()
+
+
+async def test_revocations_survive_a_reload(schema):
+    writer = RevocationService()
+    jti = uuid.uuid4().hex
+    user_id = uuid.uuid4()
+    async with SessionLocal() as db:
+        await writer.revoke_token(db, {"jti": jti, "exp": time.time() + 3600})
+        await writer.revoke_user(db, user_id)
+
+    reader = RevocationService()
+    await reader._rebuild()
+    assert reader.check({"jti": jti}) is None
+    async with SessionLocal() as db:
+        assert await reader.is_revoked(db, {"jti": jti})
+    assert reader.check({"uid": str(user_id), "iat": time.time() - 60}) is True
+    assert reader.check({"jti": uuid.uuid4().hex}) is False
+
+
+async def test_first_load_retries_until_the_database_answers(schema, monkeypatch):
+    monkeypatch.setattr(settings, "REVOCATION_SYNC_SECONDS", 0.05)
+    failures = []
+
+    def flaky_session():
+        if len(failures) < 2:
+            failures.append(1)
+            raise OSError("database unreachable")
+        return SessionLocal()
+
+    monkeypatch.setattr(revocation_module, "SessionLocal", flaky_session)
+    service = RevocationService()
+    # Starting never touches the database, so an outage cannot stop the worker
+    service.start()
+    assert service.stats()["loaded"] is False
+    try:
+        await service.wait_loaded()
+        assert service.stats()["loaded"] is True
+        assert service.sync_errors == 2
+    finally:
+        await service.stop()
@@ -0,0 +1,165 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+
+from app.services.stream_service import (
+    HEADER_SIZE, TAG_SIZE, BodyStreamingResponse, StreamDecryptor, StreamEncryptor, StreamError, stream_service
+)
+
+pytestmark = pytest.mark.anyio
+
+KEY = bytes(range(32))
+SEGMENT_SIZE = 64
+
+
+def _seal(plaintext: bytes, algorithm: str = "aes-256-gcm", segment_size: int = SEGMENT_SIZE):
+    """Header plus sealed segments, sealing the way encrypt_stream does"""
+    encryptor = StreamEncryptor(algorithm, KEY, segment_size)
+    pieces = [plaintext[start:start + segment_size] for start in range(0, len(plaintext), segment_size)] or [b""]
+    segments = [encryptor.seal(piece, index == len(pieces) - 1) for index, piece in enumerate(pieces)]
+    return encryptor.header, segments
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(iterator) -> bytes:
+    return b"".join([chunk async for chunk in iterator])
+
+
+@pytest.mark.parametrize("algorithm", ["aes-256-gcm", "chacha20-poly1305"])
+@pytest.mark.parametrize("length", [0, 1, SEGMENT_SIZE - 1, SEGMENT_SIZE, SEGMENT_SIZE + 1, 5 * SEGMENT_SIZE])
+async def test_stream_round_trip(algorithm, length, monkeypatch):
+    monkeypatch.setattr(stream_service, "segment_size", SEGMENT_SIZE)
+    plaintext = os.urandom(length)
+    encryptor = StreamEncryptor(algorithm, KEY, SEGMENT_SIZE)
+    sealed = await _collect(stream_service.encrypt_stream(_chunks(plaintext, 7), encryptor))
+
+    segments = max(1, -(-length // SEGMENT_SIZE))
+    assert len(sealed) == HEADER_SIZE + length + segments * TAG_SIZE
+    headers = []
+    opened = await _collect(stream_service.decrypt_stream(_chunks(sealed, 13), KEY, on_header=headers.append))
+    assert opened == plaintext
+    assert headers[0].algorithm == algorithm
+
+
+def test_segments_open_in_order():
+    header, segments = _seal(os.urandom(3 * SEGMENT_SIZE - 5))
+    decryptor = StreamDecryptor(header, KEY)
+    opened = [decryptor.open(segment, index == len(segments) - 1) for index, segment in enumerate(segments)]
+    assert [len(piece) for piece in opened] == [SEGMENT_SIZE, SEGMENT_SIZE, SEGMENT_SIZE - 5]
+
+
+def test_reordered_segments_fail():
+    header, segments = _seal(os.urandom(3 * SEGMENT_SIZE - 5))
+    decryptor = StreamDecryptor(header, KEY)
+    with pytest.raises(StreamError, match="Segment 0 failed authentication"):
+        decryptor.open(segments[1])
+
+
+def test_truncated_stream_fails_on_the_final_flag():
+    header, segments = _seal(os.urandom(3 * SEGMENT_SIZE - 5))
+    decryptor = StreamDecryptor(header, KEY)
+    decryptor.open(segments[0])
+    # Dropping the real final segment makes a middle one arrive as the last
+    with pytest.raises(StreamError, match="Segment 1 failed authentication"):
+        decryptor.open(segments[1], last=True)
+
+
+def test_final_segment_cannot_be_opened_as_a_middle_one():
+    header, segments = _seal(os.urandom(SEGMENT_SIZE - 1))
+    with pytest.raises(StreamError, match="failed authentication"):
+        StreamDecryptor(header, KEY).open(segments[0], last=False)
+
+
+def test_data_after_the_final_segment_is_rejected():
+    header, segments = _seal(os.urandom(10))
+    decryptor = StreamDecryptor(header, KEY)
+    decryptor.open(segments[0], last=True)
+    with pytest.raises(StreamError, match="Data after final segment"):
+        decryptor.open(segments[0])
+
+
+def test_sealing_after_the_final_segment_is_rejected():
+    encryptor = StreamEncryptor("aes-256-gcm", KEY, SEGMENT_SIZE)
+    encryptor.seal(b"end", last=True)
+    with pytest.raises(StreamError, match="already finalized"):
+        encryptor.seal(b"more")
+
+
+def test_header_is_authenticated():
+    header, segments = _seal(os.urandom(10))
+    tampered = header[:-1] + bytes([header[-1] ^ 1])
+    with pytest.raises(StreamError, match="failed authentication"):
+        StreamDecryptor(tampered, KEY).open(segments[0], last=True)
+
+
+def test_wrong_key_fails():
+    header, segments = _seal(os.urandom(10))
+    with pytest.raises(StreamError, match="failed authentication"):
+        StreamDecryptor(header, bytes(32)).open(segments[0], last=True)
+
+
+@pytest.mark.parametrize("header", [b"", b"CCS", b"XXX" + bytes(HEADER_SIZE - 3)])
+def test_bad_headers_are_rejected(header):
+    with pytest.raises(StreamError):
+        StreamDecryptor(header, KEY)
+
+
+async def test_decrypt_stream_detects_truncation():
+    header, segments = _seal(os.urandom(3 * SEGMENT_SIZE - 5))
+    with pytest.raises(StreamError, match="failed authentication"):
+        await _collect(stream_service.decrypt_stream(_chunks(header + b"".join(segments[:-1]), 50), KEY))
+    with pytest.raises(StreamError, match="truncated before final segment"):
+        await _collect(stream_service.decrypt_stream(_chunks(header + b"x", 50), KEY))
+    with pytest.raises(StreamError, match="Truncated stream header"):
+        await _collect(stream_service.decrypt_stream(_chunks(header[:-1], 50), KEY))
+
+
+async def _call_asgi(app, body_chunks):
+    """Drive an ASGI app like a server: the body arrives in pieces, then receive() waits for a disconnect"""
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in body_chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    disconnected = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if messages:
+            message = messages.pop(0)
+            await asyncio.sleep(0)
+            return message
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/echo", "raw_path": b"/echo", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/octet-stream")], "server": ("test", 80),
+        "client": ("test", 1234)
+    }
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=2)
+    finally:
+        disconnected.set()
+    return b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+
+
+async def test_body_streaming_response_reads_the_whole_request_body():
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        async def upper():
+            async for chunk in request.stream():
+                yield chunk.upper()
+        return BodyStreamingResponse(upper(), media_type="application/octet-stream")
+
+    chunks = [f"chunk-{index};".encode() for index in range(50)]
+    assert await _call_asgi(app, chunks) == b"".join(chunks).upper()
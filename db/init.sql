@@ -29,9 +29,10 @@ CREATE TABLE IF NOT EXISTS encryption_keys (
     owner_id UUID REFERENCES users(id) ON DELETE CASCADE
 );
 
--- Create audit_logs table
+-- Create audit_logs table, range-partitioned by month; the API creates the
+-- monthly partitions ahead of time and drops them past AUDIT_RETENTION_MONTHS
 CREATE TABLE IF NOT EXISTS audit_logs (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     user_id UUID REFERENCES users(id) ON DELETE SET NULL,
     action VARCHAR(100) NOT NULL,
     resource_type VARCHAR(50),
@@ -39,8 +40,10 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     details JSONB,
     ip_address VARCHAR(45),
     user_agent TEXT,
-    timestamp TIMESTAMPTZ DEFAULT NOW()
-);
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT;
 
 -- Create encryption_operations table
 CREATE TABLE IF NOT EXISTS encryption_operations (
@@ -52,20 +55,74 @@ CREATE TABLE IF NOT EXISTS encryption_operations (
     input_hash VARCHAR(64),
     output_hash VARCHAR(64),
     status VARCHAR(20) NOT NULL DEFAULT 'completed',
+    bytes_in BIGINT,
+    bytes_out BIGINT,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     completed_at TIMESTAMPTZ
 );
 
+-- Create usage_rollups table (per-day counters maintained by the audit writer)
+CREATE TABLE IF NOT EXISTS usage_rollups (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    algorithm VARCHAR(50) NOT NULL,
+    operation_type VARCHAR(20) NOT NULL,
+    operations BIGINT NOT NULL DEFAULT 0,
+    failed BIGINT NOT NULL DEFAULT 0,
+    bytes_in BIGINT NOT NULL DEFAULT 0,
+    bytes_out BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, algorithm, operation_type)
+);
+
+-- Create token_revocations table
+CREATE TABLE IF NOT EXISTS key_rotations (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    old_key_id UUID NOT NULL REFERENCES encryption_keys(id),
+    new_key_id UUID NOT NULL REFERENCES encryption_keys(id),
+    rotation_reason VARCHAR(100),
+    rotated_by UUID NOT NULL REFERENCES users(id),
+    rotated_at TIMESTAMPTZ DEFAULT NOW(),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    target VARCHAR(255) NOT NULL,
+    last_id TEXT,
+    rows_total BIGINT,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    rows_skipped BIGINT NOT NULL DEFAULT 0,
+    rows_failed BIGINT NOT NULL DEFAULT 0,
+    error TEXT,
+    worker VARCHAR(100),
+    heartbeat_at TIMESTAMPTZ,
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS token_revocations (
+    id BIGSERIAL PRIMARY KEY,
+    jti VARCHAR(64),
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    revoked_at TIMESTAMPTZ NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
 -- Create indexes for performance
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active);
 CREATE INDEX IF NOT EXISTS idx_encryption_keys_owner ON encryption_keys(owner_id);
 CREATE INDEX IF NOT EXISTS idx_encryption_keys_algorithm ON encryption_keys(algorithm);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_user ON audit_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_encryption_keys_owner_active ON encryption_keys(owner_id, is_active);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_timestamp ON audit_logs(timestamp);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_user_timestamp ON audit_logs(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_action_timestamp ON audit_logs(action, timestamp);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_resource_timestamp ON audit_logs(resource_type, resource_id, timestamp);
 CREATE INDEX IF NOT EXISTS idx_encryption_operations_user ON encryption_operations(user_id);
-CREATE INDEX IF NOT EXISTS idx_encryption_operations_timestamp ON encryption_operations(created_at);
+CREATE INDEX IF NOT EXISTS ix_encryption_operations_created_at ON encryption_operations(created_at);
+CREATE INDEX IF NOT EXISTS ix_usage_rollups_day ON usage_rollups(day);
+CREATE INDEX IF NOT EXISTS ix_key_rotations_status ON key_rotations(status);
+CREATE INDEX IF NOT EXISTS ix_token_revocations_jti ON token_revocations(jti);
+CREATE INDEX IF NOT EXISTS ix_token_revocations_user_id ON token_revocations(user_id);
+CREATE INDEX IF NOT EXISTS ix_token_revocations_revoked_at ON token_revocations(revoked_at);
+CREATE INDEX IF NOT EXISTS ix_token_revocations_expires_at ON token_revocations(expires_at);
 
 -- Insert default admin user (password: admin123)
 INSERT INTO users (username, email, password_hash, role) 